@@ -0,0 +1,155 @@
+"""
+Client HTTP asynchrone partagé pour l'API ResaSki
+Un seul client par processus : pools de connexions par hôte, keep-alive et HTTP/2 optionnel,
+créé et fermé par le lifespan FastAPI de server.py
+"""
+
+import os
+from dataclasses import dataclass, field
+from logging import getLogger
+
+import httpx
+
+logger = getLogger(__name__)
+
+DEFAULT_HEADERS = {
+    "Accept": "application/json",
+    "ngrok-skip-browser-warning": "true",
+}
+
+# Délais par route (préfixe le plus long gagnant), en secondes
+DEFAULT_ENDPOINT_TIMEOUTS = {
+    "/vendors": 10.0,
+    "/sports": 10.0,
+    "/customers/search-by-phone": 10.0,
+    "/customers/search-by-email": 10.0,
+    "/customers/": 30.0,
+}
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _parse_endpoint_timeouts(value: str | None) -> dict[str, float]:
+    # Format : "/vendors=5,/customers/=20"
+    timeouts = dict(DEFAULT_ENDPOINT_TIMEOUTS)
+    for entry in (value or "").split(","):
+        if "=" in entry:
+            prefix, seconds = entry.split("=", 1)
+            timeouts[prefix.strip()] = float(seconds)
+    return timeouts
+
+
+@dataclass
+class ApiClientSettings:
+    """Réglages du pool de connexions vers le backend ResaSki"""
+
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 60.0
+    http2: bool = False
+    connect_timeout: float = 5.0
+    default_timeout: float = 30.0
+    endpoint_timeouts: dict[str, float] = field(
+        default_factory=lambda: dict(DEFAULT_ENDPOINT_TIMEOUTS)
+    )
+
+    @classmethod
+    def from_env(cls) -> "ApiClientSettings":
+        return cls(
+            max_connections=_env_int("RESASKI_HTTP_MAX_CONNECTIONS", cls.max_connections),
+            max_keepalive_connections=_env_int(
+                "RESASKI_HTTP_MAX_KEEPALIVE", cls.max_keepalive_connections
+            ),
+            keepalive_expiry=_env_float("RESASKI_HTTP_KEEPALIVE_EXPIRY", cls.keepalive_expiry),
+            http2=os.getenv("RESASKI_HTTP2", "").lower() in ("1", "true", "yes"),
+            connect_timeout=_env_float("RESASKI_HTTP_CONNECT_TIMEOUT", cls.connect_timeout),
+            default_timeout=_env_float("RESASKI_HTTP_TIMEOUT", cls.default_timeout),
+            endpoint_timeouts=_parse_endpoint_timeouts(os.getenv("RESASKI_HTTP_TIMEOUTS")),
+        )
+
+    def timeout_for(self, path: str) -> httpx.Timeout:
+        matches = [prefix for prefix in self.endpoint_timeouts if path.startswith(prefix)]
+        seconds = (
+            self.endpoint_timeouts[max(matches, key=len)] if matches else self.default_timeout
+        )
+        return httpx.Timeout(seconds, connect=min(self.connect_timeout, seconds))
+
+
+_settings = ApiClientSettings()
+_client: httpx.AsyncClient | None = None
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _create_client(settings: ApiClientSettings) -> httpx.AsyncClient:
+    http2 = settings.http2
+    if http2 and not _http2_available():
+        logger.warning("RESASKI_HTTP2 demandé mais le paquet 'h2' est absent, repli sur HTTP/1.1")
+        http2 = False
+    # httpx garde un pool de connexions par hôte (origine) dans un même client
+    return httpx.AsyncClient(
+        headers=DEFAULT_HEADERS,
+        timeout=httpx.Timeout(settings.default_timeout, connect=settings.connect_timeout),
+        limits=httpx.Limits(
+            max_connections=settings.max_connections,
+            max_keepalive_connections=settings.max_keepalive_connections,
+            keepalive_expiry=settings.keepalive_expiry,
+        ),
+        http2=http2,
+    )
+
+
+async def startup(settings: ApiClientSettings | None = None) -> httpx.AsyncClient:
+    """Crée le client partagé (appelé depuis le lifespan FastAPI)"""
+    global _client, _settings
+    await shutdown()
+    _settings = settings or ApiClientSettings.from_env()
+    _client = _create_client(_settings)
+    return _client
+
+
+async def shutdown() -> None:
+    """Ferme le client partagé et ses connexions keep-alive"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Retourne le client partagé, créé à la première utilisation hors lifespan (scripts, tests)"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _create_client(_settings)
+    return _client
+
+
+def api_url(path: str) -> str:
+    # Lu à chaque appel : le .env est chargé par server.py après l'import des agents
+    return f"{os.getenv('NEXT_PUBLIC_API_BASE_URL')}{path}"
+
+
+async def api_get(path: str, params: dict | None = None) -> httpx.Response:
+    return await get_client().get(
+        api_url(path), params=params, timeout=_settings.timeout_for(path)
+    )
+
+
+async def api_post(path: str, json: dict | None = None) -> httpx.Response:
+    return await get_client().post(
+        api_url(path), json=json, timeout=_settings.timeout_for(path)
+    )
@@ -0,0 +1,95 @@
+"""
+Accumulateur audio par session pour le mode "commit"
+Les morceaux PCM16 sont copiés une seule fois dans une zone int16 préallouée qui grandit
+par doublement, puis convertis en float32 une seule fois au moment du commit
+"""
+
+import binascii
+import time
+from logging import getLogger
+
+import numpy as np
+from agents.voice import AudioInput
+
+logger = getLogger(__name__)
+
+SAMPLE_RATE = 24000
+
+
+class AudioAccumulator:
+    """Tampon int16 réutilisé d'un tour à l'autre
+
+    - `initial_seconds` : capacité allouée au départ
+    - `max_seconds` : durée maximale d'un énoncé, l'audio au-delà est ignoré
+    """
+
+    def __init__(
+        self,
+        initial_seconds: float = 5.0,
+        max_seconds: float = 60.0,
+        sample_rate: int = SAMPLE_RATE,
+    ):
+        self.sample_rate = sample_rate
+        self.max_samples = int(max_seconds * sample_rate)
+        self._buffer = np.empty(
+            min(int(initial_seconds * sample_rate), self.max_samples), dtype=np.int16
+        )
+        self._length = 0
+        self.truncated = False
+        self.started_at: float | None = None
+
+    def __len__(self) -> int:
+        return self._length
+
+    @property
+    def duration(self) -> float:
+        return self._length / self.sample_rate
+
+    def _reserve(self, samples: int) -> int:
+        """Agrandit le tampon si besoin et retourne le nombre d'échantillons acceptés"""
+        accepted = min(samples, self.max_samples - self._length)
+        if accepted < samples and not self.truncated:
+            self.truncated = True
+            logger.warning(
+                "Énoncé tronqué à %.1fs", self.max_samples / self.sample_rate
+            )
+        needed = self._length + accepted
+        if needed > len(self._buffer):
+            capacity = min(max(needed, 2 * len(self._buffer)), self.max_samples)
+            grown = np.empty(capacity, dtype=np.int16)
+            grown[: self._length] = self._buffer[: self._length]
+            self._buffer = grown
+        return accepted
+
+    def extend(self, pcm16: np.ndarray):
+        if self.started_at is None:
+            self.started_at = time.perf_counter()
+        accepted = self._reserve(len(pcm16))
+        self._buffer[self._length : self._length + accepted] = pcm16[:accepted]
+        self._length += accepted
+
+    def extend_base64(self, delta: str):
+        decoded = binascii.a2b_base64(delta)
+        # Vue sans copie sur les octets décodés, copiés directement dans la zone réservée
+        self.extend(np.frombuffer(decoded, dtype=np.int16, count=len(decoded) // 2))
+
+    def add_chunk(self, message: dict):
+        """Ajoute un message `input_audio_buffer.append`, JSON ou trame binaire"""
+        if "pcm16" in message:
+            self.extend(message["pcm16"])
+        else:
+            self.extend_base64(message["delta"])
+
+    def to_audio_input(self) -> AudioInput:
+        """Convertit l'énoncé en float32 pour le pipeline et vide le tampon"""
+        audio = np.multiply(
+            self._buffer[: self._length], 1 / 32768.0, dtype=np.float32
+        )
+        self.reset()
+        return AudioInput(audio)
+
+    def reset(self):
+        self._length = 0
+        self.truncated = False
+        self.started_at = None
+
@@ -0,0 +1,113 @@
+"""
+Cache asynchrone en mémoire partagé par toutes les sessions du processus
+TTL, borne de taille avec éviction LRU, dédoublonnage des chargements concurrents
+et service des valeurs périmées pendant leur rafraîchissement en arrière-plan
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from logging import getLogger
+from typing import Any, Generic, TypeVar
+
+logger = getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class AsyncTTLCache(Generic[T]):
+    """Cache clé → valeur avec durée de vie
+
+    - `ttl` : durée pendant laquelle une valeur est servie sans rechargement
+    - `stale_ttl` : durée supplémentaire pendant laquelle une valeur périmée est encore servie
+      immédiatement, pendant qu'un seul rafraîchissement tourne en arrière-plan
+    - `maxsize` : nombre maximal d'entrées, la moins récemment utilisée est évincée
+    - `maxweight` / `weigh` : poids total maximal des valeurs (octets…), évincées de même
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        maxsize: int = 128,
+        stale_ttl: float = 0.0,
+        maxweight: float = float("inf"),
+        weigh: Callable[[T], int] | None = None,
+    ):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.maxsize = maxsize
+        self.maxweight = maxweight
+        self.weigh = weigh or (lambda value: 0)
+        self.weight = 0
+        self._entries: OrderedDict[Hashable, tuple[T, float]] = OrderedDict()
+        self._inflight: dict[Hashable, asyncio.Task[T]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> T | None:
+        """Retourne la valeur fraîche en cache, sans jamais charger"""
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[1] >= self.ttl:
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def set(self, key: Hashable, value: T) -> None:
+        self.invalidate(key)
+        self._entries[key] = (value, time.monotonic())
+        self.weight += self.weigh(value)
+        while self._entries and (
+            len(self._entries) > self.maxsize or self.weight > self.maxweight
+        ):
+            _, (evicted, _) = self._entries.popitem(last=False)
+            self.weight -= self.weigh(evicted)
+
+    def invalidate(self, key: Hashable | None = None) -> None:
+        """Supprime une entrée, ou tout le cache si aucune clé n'est donnée"""
+        if key is None:
+            self._entries.clear()
+            self.weight = 0
+        else:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.weight -= self.weigh(entry[0])
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[T]]) -> T:
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, stored_at = entry
+            age = time.monotonic() - stored_at
+            if age < self.ttl:
+                self._entries.move_to_end(key)
+                return value
+            if age < self.ttl + self.stale_ttl:
+                self._entries.move_to_end(key)
+                if key not in self._inflight:
+                    self._start_load(key, loader).add_done_callback(
+                        lambda task: self._log_refresh_error(key, task)
+                    )
+                return value
+
+        task = self._inflight.get(key) or self._start_load(key, loader)
+        # shield : l'annulation d'un appelant n'interrompt pas le chargement des autres
+        return await asyncio.shield(task)
+
+    def _start_load(self, key: Hashable, loader: Callable[[], Awaitable[T]]) -> asyncio.Task[T]:
+        async def load() -> T:
+            try:
+                value = await loader()
+                self.set(key, value)
+                return value
+            finally:
+                self._inflight.pop(key, None)
+
+        task = asyncio.ensure_future(load())
+        self._inflight[key] = task
+        return task
+
+    @staticmethod
+    def _log_refresh_error(key: Hashable, task: asyncio.Task[Any]) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Rafraîchissement du cache échoué pour %r : %s", key, task.exception())
@@ -5,148 +5,74 @@ Gère l'identification et la création de comptes clients
 
 import json
 import os
-import requests
-import phonenumbers
-from phonenumbers import carrier, geocoder
+from logging import getLogger
+import httpx
 from agents import Agent, function_tool
 from agents.extensions.handoff_prompt import RECOMMENDED_PROMPT_PREFIX
+from . import customer_lookup
+from .api_client import api_post
+from .logs import log_payload
+from .phone_normalization import normalize_phone
+from .tool_concurrency import session_limited
+
+logger = getLogger(__name__)
+
+COMMON_CALLING_CODES = {
+    "+33": "France",
+    "+41": "Suisse",
+    "+32": "Belgique",
+    "+39": "Italie",
+    "+49": "Allemagne",
+    "+1": "USA/Canada",
+    "+44": "Royaume-Uni"
+}
 
 @function_tool
 def normalize_phone_number(phone_input: str, country_code: str = None):
     """
     Normalise un numéro de téléphone avec gestion des préfixes internationaux
+    Accepte aussi un numéro dicté en toutes lettres ("zéro six douze...")
     """
     try:
-        # Nettoyer l'input de base
-        clean_input = phone_input.replace(" ", "").replace("-", "").replace(".", "").replace("(", "").replace(")", "")
+        result = normalize_phone(phone_input, country_code)
+        logger.debug("Normalisation : %r → %s", phone_input, result)
         
-        print(f"📱 Processing: '{phone_input}' → '{clean_input}'")
-        
-        # Cas 1: Numéro avec préfixe international explicite (+XX)
-        if clean_input.startswith("+"):
-            try:
-                parsed = phonenumbers.parse(clean_input, None)
-                if phonenumbers.is_valid_number(parsed):
-                    normalized = phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
-                    country = geocoder.description_for_number(parsed, "fr")
-                    
-                    return json.dumps({
-                        "success": True,
-                        "normalized": normalized,
-                        "original": phone_input,
-                        "country": country,
-                        "country_code": f"+{parsed.country_code}",
-                        "message": f"Numéro normalisé: {normalized} ({country})"
-                    })
-                else:
-                    return json.dumps({
-                        "success": False,
-                        "error": "invalid_number",
-                        "message": "Ce numéro de téléphone n'est pas valide."
-                    })
-            except phonenumbers.NumberParseException:
-                return json.dumps({
-                    "success": False,
-                    "error": "parse_error",
-                    "message": "Format de numéro invalide. Exemple: +33 7 81 60 23 52"
-                })
+        if result.success:
+            if result.assumed_country:
+                message = f"Numéro français normalisé: {result.normalized}"
+            else:
+                message = f"Numéro normalisé: {result.normalized} ({result.country})"
+            output = {
+                "success": True,
+                "normalized": result.normalized,
+                "original": phone_input,
+                "country": result.country,
+                "country_code": result.country_code,
+                "message": message
+            }
+            if result.assumed_country:
+                output["assumed_country"] = True
+            return json.dumps(output)
         
-        # Cas 2: Numéro sans préfixe - utiliser le pays fourni ou demander
+        if result.error == "invalid_number":
+            message = "Ce numéro de téléphone n'est pas valide."
+        elif result.error == "parse_error":
+            message = "Format de numéro invalide. Exemple: +33 7 81 60 23 52"
+        elif result.error == "unsupported_country":
+            message = f"Code pays {country_code} non supporté ou invalide."
         else:
-            if country_code:
-                try:
-                    # Convertir le code pays en région (ex: +33 → FR, +41 → CH)
-                    country_code_num = country_code.replace("+", "")
-                    region = None
-                    
-                    # Mapping des codes principaux
-                    country_mapping = {
-                        "33": "FR",  # France
-                        "41": "CH",  # Suisse
-                        "32": "BE",  # Belgique
-                        "39": "IT",  # Italie
-                        "49": "DE",  # Allemagne
-                        "34": "ES",  # Espagne
-                        "1": "US",   # USA/Canada
-                        "44": "GB",  # UK
-                    }
-                    
-                    region = country_mapping.get(country_code_num)
-                    
-                    if region:
-                        # Préfixer avec le code pays si nécessaire
-                        full_number = f"+{country_code_num}{clean_input}"
-                        parsed = phonenumbers.parse(full_number, None)
-                        
-                        if phonenumbers.is_valid_number(parsed):
-                            normalized = phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
-                            country_name = geocoder.description_for_number(parsed, "fr")
-                            
-                            return json.dumps({
-                                "success": True,
-                                "normalized": normalized,
-                                "original": phone_input,
-                                "country": country_name,
-                                "country_code": f"+{parsed.country_code}",
-                                "message": f"Numéro normalisé: {normalized} ({country_name})"
-                            })
-                    
-                    return json.dumps({
-                        "success": False,
-                        "error": "unsupported_country",
-                        "message": f"Code pays {country_code} non supporté ou invalide."
-                    })
-                    
-                except Exception as e:
-                    return json.dumps({
-                        "success": False,
-                        "error": "normalization_error",
-                        "message": f"Erreur lors de la normalisation: {str(e)}"
-                    })
-            else:
-                # Pas de code pays fourni - essayer France par défaut, sinon demander
-                try:
-                    # Essai avec France par défaut
-                    if clean_input.startswith("0"):
-                        # Format français local
-                        full_number = f"+33{clean_input[1:]}"
-                        parsed = phonenumbers.parse(full_number, None)
-                        
-                        if phonenumbers.is_valid_number(parsed):
-                            normalized = phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
-                            
-                            return json.dumps({
-                                "success": True,
-                                "normalized": normalized,
-                                "original": phone_input,
-                                "country": "France",
-                                "country_code": "+33",
-                                "assumed_country": True,
-                                "message": f"Numéro français normalisé: {normalized}"
-                            })
-                    
-                    # Si ça ne marche pas, demander le pays
-                    return json.dumps({
-                        "success": False,
-                        "error": "country_needed",
-                        "message": "Je n'arrive pas à identifier le pays. Quel est votre indicatif pays ? (ex: +33 pour France, +41 pour Suisse)",
-                        "common_codes": {
-                            "+33": "France",
-                            "+41": "Suisse", 
-                            "+32": "Belgique",
-                            "+39": "Italie",
-                            "+49": "Allemagne",
-                            "+1": "USA/Canada",
-                            "+44": "Royaume-Uni"
-                        }
-                    })
-                    
-                except Exception:
-                    return json.dumps({
-                        "success": False,
-                        "error": "country_needed",
-                        "message": "Format non reconnu. Pouvez-vous me donner votre numéro avec l'indicatif pays ? (ex: +33 7 81 60 23 52)"
-                    })
+            # Pas d'indicatif et pas un numéro national reconnu : demander le pays
+            return json.dumps({
+                "success": False,
+                "error": "country_needed",
+                "message": "Je n'arrive pas à identifier le pays. Quel est votre indicatif pays ? (ex: +33 pour France, +41 pour Suisse)",
+                "common_codes": COMMON_CALLING_CODES
+            })
+        return json.dumps({
+            "success": False,
+            "error": result.error,
+            "message": message
+        })
                     
     except Exception as e:
         return json.dumps({
@@ -156,7 +82,8 @@ def normalize_phone_number(phone_input: str, country_code: str = None):
         })
 
 @function_tool
-def search_customers_by_phone(phone_number: str):
+@session_limited
+async def search_customers_by_phone(phone_number: str):
     """Recherche client par numéro de téléphone normalisé"""
     base_url = os.getenv("NEXT_PUBLIC_API_BASE_URL")
     vendor_id = os.getenv("NEXT_PUBLIC_VENDOR_ID")
@@ -175,76 +102,38 @@ def search_customers_by_phone(phone_number: str):
         })
     
     try:
-        print(f"🔍 [DEBUG] Searching for phone: {phone_number}")
-        print(f"🌐 [DEBUG] API URL: {base_url}/customers/search-by-phone")
-        print(f"🏢 [DEBUG] Vendor ID: {vendor_id}")
-        
-        # ✅ Construction de l'URL et des paramètres
-        url = f"{base_url}/customers/search-by-phone"
-        params = {
-            "vendor_id": vendor_id, 
-            "phone": phone_number
-        }
-        
-        print(f"📡 [DEBUG] Full URL before request: {url}")
-        print(f"📊 [DEBUG] Params: {params}")
-        
-        response = requests.get(
-            url,
-            params=params,
-            headers={"ngrok-skip-browser-warning": "true"},
-            timeout=30
-        )
-        
-        print(f"📡 [DEBUG] Actual URL called: {response.url}")
-        print(f"📡 [DEBUG] Response status: {response.status_code}")
-        print(f"📄 [DEBUG] Response headers: {dict(response.headers)}")
-        print(f"📄 [DEBUG] Raw response text: {response.text}")
-        
-        # ✅ Vérification explicite du statut
-        if response.status_code == 404:
-            print("❌ [DEBUG] 404 - No customer found")
-            return json.dumps({
-                "found": False, 
-                "phone_number": phone_number,
-                "message": f"Aucun client trouvé avec le numéro {phone_number} (404)"
-            })
+        logger.debug("search_customers_by_phone vendor_id=%s phone=%s", vendor_id, phone_number)
         
-        if response.status_code != 200:
-            print(f"❌ [DEBUG] Unexpected status code: {response.status_code}")
+        # ✅ Numéro normalisé en clé de cache : une recherche répétée est servie localement
+        try:
+            data = await customer_lookup.search_by_phone(phone_number, vendor_id)
+        except httpx.HTTPStatusError as e:
+            logger.warning("Recherche par téléphone : statut inattendu %s", e.response.status_code)
             return json.dumps({
                 "error": True,
-                "message": f"Erreur API: status {response.status_code}"
+                "message": f"Erreur API: status {e.response.status_code}"
             })
-            
-        # ✅ Parsing de la réponse JSON
-        try:
-            data = response.json()
-            print(f"✅ [DEBUG] JSON parsed successfully: {data}")
         except json.JSONDecodeError as e:
-            print(f"❌ [DEBUG] JSON parsing error: {e}")
+            logger.warning("Recherche par téléphone : JSON invalide (%s)", e)
             return json.dumps({
                 "error": True,
                 "message": f"Erreur parsing JSON: {str(e)}"
             })
         
-        # ✅ Traitement de la réponse
+        log_payload(logger, "Réponse recherche téléphone", data)
+        
+        # ✅ Traitement de la réponse (404 ou liste vide : None)
+        if data is None:
+            return json.dumps({
+                "found": False, 
+                "phone_number": phone_number,
+                "message": f"Aucun client trouvé avec le numéro {phone_number}"
+            })
+        
         if isinstance(data, list):
-            print(f"📋 [DEBUG] Response is a list with {len(data)} items")
-            
-            if len(data) == 0:
-                print("📋 [DEBUG] Empty list - no customers found")
-                return json.dumps({
-                    "found": False, 
-                    "phone_number": phone_number,
-                    "message": f"Aucun client trouvé avec le numéro {phone_number} (liste vide)"
-                })
-            
-            elif len(data) == 1:
+            if len(data) == 1:
                 # ✅ Un seul client trouvé
                 customer = data[0]
-                print(f"👤 [DEBUG] Single customer found: {customer}")
-                
                 return json.dumps({
                     "found": True,
                     "single_match": True,
@@ -260,7 +149,6 @@ def search_customers_by_phone(phone_number: str):
             
             else:
                 # ✅ Plusieurs clients
-                print(f"👥 [DEBUG] Multiple customers found: {len(data)}")
                 customers_list = []
                 for customer in data:
                     customers_list.append({
@@ -281,7 +169,6 @@ def search_customers_by_phone(phone_number: str):
                 })
         
         elif isinstance(data, dict):
-            print(f"📄 [DEBUG] Response is a dict: {data}")
             return json.dumps({
                 "found": True,
                 "single_match": True,
@@ -296,59 +183,49 @@ def search_customers_by_phone(phone_number: str):
             })
         
         else:
-            print(f"❌ [DEBUG] Unexpected data type: {type(data)}")
+            logger.warning("Recherche par téléphone : réponse de type %s", type(data).__name__)
             return json.dumps({
                 "found": False, 
                 "phone_number": phone_number,
                 "message": f"Format de réponse inattendu: {type(data)}"
             })
             
-    except requests.Timeout:
-        print("❌ [DEBUG] Request timeout")
+    except httpx.TimeoutException:
+        logger.warning("Recherche par téléphone : délai dépassé")
         return json.dumps({
             "error": True, 
             "message": "Délai d'attente dépassé. Veuillez réessayer."
         })
-    except requests.RequestException as e:
-        print(f"❌ [DEBUG] Request exception: {e}")
+    except httpx.HTTPError as e:
+        logger.warning("Recherche par téléphone : %s", e)
         return json.dumps({
             "error": True, 
             "message": f"Erreur de connexion: {str(e)}"
         })
     except Exception as e:
-        print(f"❌ [DEBUG] Unexpected exception: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Erreur inattendue dans search_customers_by_phone")
         return json.dumps({
             "error": True, 
             "message": f"Erreur inattendue: {str(e)}"
         })
 
 @function_tool
-def search_customer_by_email(email: str):
+@session_limited
+async def search_customer_by_email(email: str):
     """Recherche client par email validé"""
-    base_url = os.getenv("NEXT_PUBLIC_API_BASE_URL")
     vendor_id = os.getenv("NEXT_PUBLIC_VENDOR_ID")
     
     try:
         clean_email = email.lower().strip()
         
-        response = requests.get(
-            f"{base_url}/customers/search-by-email",
-            params={"vendor_id": vendor_id, "email": clean_email},
-            headers={"ngrok-skip-browser-warning": "true"},
-            timeout=30
-        )
+        customer = await customer_lookup.search_by_email(clean_email, vendor_id)
         
-        if response.status_code == 404:
+        if customer is None:
             return json.dumps({
                 "found": False,
                 "email": clean_email,
                 "message": "Aucun client trouvé avec cet email"
             })
-            
-        response.raise_for_status()
-        customer = response.json()
         
         return json.dumps({
             "found": True,
@@ -362,7 +239,7 @@ def search_customer_by_email(email: str):
             "message": f"Client trouvé: {customer.get('first_name')} {customer.get('last_name')}"
         })
         
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         return json.dumps({"error": True, "message": f"Erreur de connexion: {str(e)}"})
     except Exception as e:
         return json.dumps({"error": True, "message": f"Erreur: {str(e)}"})
@@ -386,10 +263,9 @@ def validate_email_format(email: str):
     })
 
 @function_tool
-def create_customer(vendor_id: str, first_name: str, last_name: str, email: str, phone_number: str, date_of_birth: str):
+@session_limited
+async def create_customer(vendor_id: str, first_name: str, last_name: str, email: str, phone_number: str, date_of_birth: str):
     """Crée un nouveau client avec toutes les informations collectées"""
-    base_url = os.getenv("NEXT_PUBLIC_API_BASE_URL")
-    
     try:
         customer_data = {
             "vendor_id": int(vendor_id),
@@ -400,16 +276,15 @@ def create_customer(vendor_id: str, first_name: str, last_name: str, email: str,
             "date_of_birth": date_of_birth
         }
         
-        response = requests.post(
-            f"{base_url}/customers/",
-            json=customer_data,
-            headers={"ngrok-skip-browser-warning": "true"},
-            timeout=30
-        )
+        response = await api_post("/customers/", json=customer_data)
         
         response.raise_for_status()
         result = response.json()
         
+        customer_lookup.customer_created(
+            result.get("customer"), vendor_id, customer_data["email"], phone_number
+        )
+        
         return json.dumps({
             "success": True,
             "customer_id": result.get("customer", {}).get("id"),
@@ -417,7 +292,7 @@ def create_customer(vendor_id: str, first_name: str, last_name: str, email: str,
             "message": f"Compte créé pour {customer_data['first_name']} {customer_data['last_name']}"
         })
         
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         return json.dumps({"error": True, "message": f"Erreur de création: {str(e)}"})
     except Exception as e:
         return json.dumps({"error": True, "message": f"Erreur: {str(e)}"})
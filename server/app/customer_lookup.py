@@ -0,0 +1,111 @@
+"""
+Recherche des clients avec un cache local en lecture
+Les clés sont normalisées (téléphone E164, email en minuscules) pour qu'un numéro répété ou
+reformulé par l'appelant ne déclenche pas un nouvel appel backend. Les clients trouvés et les
+recherches sans résultat sont gardés avec des durées de vie courtes, les recherches identiques
+en cours sont dédoublonnées, et la création d'un client met le cache à jour
+"""
+
+import os
+from logging import getLogger
+
+from .api_client import api_get
+from .cache import AsyncTTLCache
+from .phone_normalization import normalize_phone
+
+logger = getLogger(__name__)
+
+_customer_cache: AsyncTTLCache | None = None
+_miss_cache: AsyncTTLCache | None = None
+
+
+def customer_cache() -> AsyncTTLCache:
+    # Créé à la première utilisation, après le chargement du .env par server.py
+    global _customer_cache
+    if _customer_cache is None:
+        _customer_cache = AsyncTTLCache(
+            ttl=float(os.getenv("RESASKI_CUSTOMER_CACHE_TTL", "120")),
+            maxsize=int(os.getenv("RESASKI_CUSTOMER_CACHE_SIZE", "1024")),
+        )
+    return _customer_cache
+
+
+def miss_cache() -> AsyncTTLCache:
+    # Les recherches sans résultat expirent plus vite : le client peut être créé entre-temps
+    global _miss_cache
+    if _miss_cache is None:
+        _miss_cache = AsyncTTLCache(
+            ttl=float(os.getenv("RESASKI_CUSTOMER_MISS_TTL", "20")),
+            maxsize=int(os.getenv("RESASKI_CUSTOMER_CACHE_SIZE", "1024")),
+        )
+    return _miss_cache
+
+
+class CustomerNotFound(Exception):
+    """404 ou liste vide du backend, jamais mise dans le cache des clients trouvés"""
+
+
+def phone_key(phone_number: str, vendor_id: str) -> tuple:
+    result = normalize_phone(phone_number)
+    number = result.normalized if result.success else phone_number.strip()
+    return ("phone", str(vendor_id), number)
+
+
+def email_key(email: str, vendor_id: str) -> tuple:
+    return ("email", str(vendor_id), email.lower().strip())
+
+
+async def _load(path: str, params: dict):
+    response = await api_get(path, params=params)
+    if response.status_code == 404:
+        raise CustomerNotFound()
+    # Les autres erreurs HTTP lèvent httpx.HTTPStatusError et ne sont pas mises en cache
+    response.raise_for_status()
+    data = response.json()
+    if data == []:
+        raise CustomerNotFound()
+    return data
+
+
+async def _lookup(key: tuple, path: str, params: dict):
+    if miss_cache().get(key) is not None:
+        logger.debug("Recherche client %r : absent (cache)", key)
+        return None
+    try:
+        return await customer_cache().get_or_load(key, lambda: _load(path, params))
+    except CustomerNotFound:
+        miss_cache().set(key, True)
+        return None
+
+
+async def search_by_phone(phone_number: str, vendor_id: str) -> list | dict | None:
+    """Client(s) enregistrés avec ce numéro, ou None si aucun"""
+    key = phone_key(phone_number, vendor_id)
+    return await _lookup(
+        key, "/customers/search-by-phone", {"vendor_id": vendor_id, "phone": key[2]}
+    )
+
+
+async def search_by_email(email: str, vendor_id: str) -> dict | None:
+    """Client enregistré avec cet email, ou None si aucun"""
+    key = email_key(email, vendor_id)
+    return await _lookup(
+        key, "/customers/search-by-email", {"vendor_id": vendor_id, "email": key[2]}
+    )
+
+
+def customer_created(customer: dict | None, vendor_id: str, email: str, phone_number: str):
+    """Met le cache à jour après `create_customer`
+
+    L'email désigne un seul compte et reçoit le nouveau client ; un numéro peut être partagé
+    par plusieurs comptes, sa recherche est donc seulement invalidée
+    """
+    phone = phone_key(phone_number, vendor_id)
+    email_entry = email_key(email, vendor_id)
+    for key in (phone, email_entry):
+        miss_cache().invalidate(key)
+    customer_cache().invalidate(phone)
+    if customer:
+        customer_cache().set(email_entry, customer)
+    else:
+        customer_cache().invalidate(email_entry)
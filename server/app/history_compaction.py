@@ -0,0 +1,217 @@
+"""
+Compactage de l'historique envoyé au modèle
+L'historique complet reste côté serveur et client ; seul l'input de `Runner.run_streamed` est
+réduit, en trois étapes :
+
+1. les sorties d'outils des tours anciens sont résumées à leur statut, leur `message` et
+   leurs identifiants (`id`, `*_id`)
+2. les appels d'outils antérieurs au dernier transfert d'agent sont retirés, sauf ceux dont
+   la sortie porte un identifiant (client trouvé ou créé) dont l'agent suivant a besoin
+3. les tours les plus anciens sont retirés tant que le budget de tokens de l'agent est dépassé
+"""
+
+import json
+import os
+import re
+from dataclasses import dataclass
+
+# Estimation sans tokenizer : environ 4 caractères par token pour du JSON en français
+CHARS_PER_TOKEN = 4
+# Sortie d'un transfert du SDK (`Handoff.get_transfer_message`) : "{'assistant': '<agent>'}".
+# Le nom de l'appel ne suffit pas : des outils ordinaires s'appellent aussi `transfer_to_…`
+HANDOFF_OUTPUT = re.compile(r"\{'assistant': '.*'\}", re.DOTALL)
+STATUS_KEYS = ("success", "found", "error", "message")
+TOOL_ITEM_TYPES = ("function_call", "function_call_output")
+
+
+def _parse_budgets(value: str | None) -> dict[str, int]:
+    # Format : "Agent d'Information ResaSki=4000;Agent d'Accueil ResaSki=2000"
+    budgets = {}
+    for entry in (value or "").split(";"):
+        if "=" in entry:
+            name, tokens = entry.rsplit("=", 1)
+            budgets[name.strip()] = int(tokens)
+    return budgets
+
+
+@dataclass
+class CompactionSettings:
+    keep_tool_turns: int = 2
+    summary_chars: int = 300
+    default_budget: int = 8000
+    agent_budgets: dict[str, int] | None = None
+
+    @classmethod
+    def from_env(cls) -> "CompactionSettings":
+        return cls(
+            keep_tool_turns=int(os.getenv("HISTORY_KEEP_TOOL_TURNS", cls.keep_tool_turns)),
+            summary_chars=int(os.getenv("HISTORY_TOOL_SUMMARY_CHARS", cls.summary_chars)),
+            default_budget=int(os.getenv("HISTORY_TOKEN_BUDGET", cls.default_budget)),
+            agent_budgets=_parse_budgets(os.getenv("HISTORY_TOKEN_BUDGETS")),
+        )
+
+    def budget_for(self, agent_name: str) -> int:
+        return (self.agent_budgets or {}).get(agent_name, self.default_budget)
+
+
+@dataclass
+class CompactionStats:
+    tokens_before: int
+    tokens_after: int
+    summarized_outputs: int = 0
+    dropped_tool_items: int = 0
+    dropped_turns: int = 0
+
+
+def estimate_tokens(items: list) -> int:
+    return len(json.dumps(items, ensure_ascii=False)) // CHARS_PER_TOKEN
+
+
+def _is_user_message(item: dict) -> bool:
+    return item.get("role") == "user" and item.get("type", "message") == "message"
+
+
+def _turn_starts(items: list) -> list[int]:
+    return [i for i, item in enumerate(items) if _is_user_message(item)]
+
+
+def _identifiers(data: dict) -> dict:
+    """Champs `id` et `*_id`, y compris dans les objets et listes imbriqués"""
+    kept = {}
+    for key, value in data.items():
+        if key == "id" or key.endswith("_id"):
+            kept[key] = value
+        elif isinstance(value, dict):
+            if nested := _identifiers(value):
+                kept[key] = nested
+        elif isinstance(value, list):
+            nested = [_identifiers(v) for v in value if isinstance(v, dict)]
+            if any(nested):
+                kept[key] = nested
+    return kept
+
+
+def _parse_output(output: str) -> dict | None:
+    try:
+        data = json.loads(output)
+    except (TypeError, ValueError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def summarize_tool_output(output: str, max_chars: int) -> str:
+    """Garde le statut, le message lisible et les identifiants des sorties JSON de nos
+    outils, sinon tronque"""
+    data = _parse_output(output)
+    if data is not None and "message" in data:
+        summary = {key: data[key] for key in STATUS_KEYS if key in data}
+        # Jamais tronqué : un identifiant coupé serait pire qu'absent
+        return json.dumps(
+            {**summary, **_identifiers(data), "compacted": True}, ensure_ascii=False
+        )
+    if len(output) > max_chars:
+        output = output[:max_chars] + "…"
+    return output
+
+
+def _summarize_old_outputs(
+    items: list, settings: CompactionSettings, stats: CompactionStats
+) -> list:
+    starts = _turn_starts(items)
+    if len(starts) <= settings.keep_tool_turns:
+        return items
+    cutoff = starts[-settings.keep_tool_turns] if settings.keep_tool_turns else len(items)
+    compacted = []
+    for i, item in enumerate(items):
+        if i < cutoff and item.get("type") == "function_call_output":
+            summary = summarize_tool_output(item.get("output", ""), settings.summary_chars)
+            if summary != item.get("output"):
+                item = {**item, "output": summary}
+                stats.summarized_outputs += 1
+        compacted.append(item)
+    return compacted
+
+
+def _is_handoff_output(item: dict) -> bool:
+    return item.get("type") == "function_call_output" and bool(
+        HANDOFF_OUTPUT.fullmatch(str(item.get("output", "")))
+    )
+
+
+def _drop_tools_before_handoff(
+    items: list, settings: CompactionSettings, stats: CompactionStats
+) -> list:
+    handoff_calls = {item.get("call_id") for item in items if _is_handoff_output(item)}
+    handoffs = [
+        i
+        for i, item in enumerate(items)
+        if item.get("type") == "function_call" and item.get("call_id") in handoff_calls
+    ]
+    if not handoffs:
+        return items
+    last_handoff = handoffs[-1]
+    # Les appels et leurs sorties partent ensemble : l'API refuse une sortie sans appel
+    stale_calls = {
+        item.get("call_id")
+        for item in items[:last_handoff]
+        if item.get("type") == "function_call"
+    }
+    # Les identifiants trouvés avant le transfert (client, compte créé) servent encore
+    identified_calls = {
+        item.get("call_id")
+        for item in items
+        if item.get("type") == "function_call_output"
+        and item.get("call_id") in stale_calls
+        and _identifiers(_parse_output(item.get("output", "")) or {})
+    }
+    stale_calls -= identified_calls
+    kept = []
+    for item in items:
+        if item.get("type") in TOOL_ITEM_TYPES and item.get("call_id") in stale_calls:
+            stats.dropped_tool_items += 1
+            continue
+        if item.get("type") == "function_call_output" and item.get("call_id") in identified_calls:
+            summary = summarize_tool_output(item.get("output", ""), settings.summary_chars)
+            if summary != item.get("output"):
+                item = {**item, "output": summary}
+                stats.summarized_outputs += 1
+        kept.append(item)
+    return kept
+
+
+def _enforce_budget(items: list, budget: int, stats: CompactionStats) -> list:
+    # Retire les tours entiers les plus anciens, le tour en cours est toujours gardé
+    tokens = estimate_tokens(items)
+    starts = _turn_starts(items)
+    first = 0
+    for start in starts[1:]:
+        if tokens <= budget:
+            break
+        tokens -= estimate_tokens(items[first:start])
+        first = start
+        stats.dropped_turns += 1
+    return items[first:]
+
+
+def compact_history(
+    items: list, agent_name: str, settings: CompactionSettings | None = None
+) -> tuple[list, CompactionStats]:
+    """Retourne l'input compacté pour l'agent, l'historique d'origine n'est pas modifié"""
+    settings = settings or _get_settings()
+    stats = CompactionStats(tokens_before=estimate_tokens(items), tokens_after=0)
+    compacted = _summarize_old_outputs(items, settings, stats)
+    compacted = _drop_tools_before_handoff(compacted, settings, stats)
+    compacted = _enforce_budget(compacted, settings.budget_for(agent_name), stats)
+    stats.tokens_after = estimate_tokens(compacted)
+    return compacted, stats
+
+
+_settings: CompactionSettings | None = None
+
+
+def _get_settings() -> CompactionSettings:
+    # Lu à la première utilisation, après le chargement du .env par server.py
+    global _settings
+    if _settings is None:
+        _settings = CompactionSettings.from_env()
+    return _settings
@@ -5,46 +5,40 @@ Renseigne sur l'école, les sports proposés, la météo et les services pratiqu
 
 import json
 import os
-import requests
+from logging import getLogger
+import httpx
 from agents import Agent, function_tool
 from agents.extensions.handoff_prompt import RECOMMENDED_PROMPT_PREFIX
+from . import vendor_data
+from .logs import log_payload
+from .tool_concurrency import PARALLEL_TOOL_CALLS, session_limited
+from .tool_projection import project_tool_result
+
+logger = getLogger(__name__)
 
 STYLE_INSTRUCTIONS = "Ton professionnel mais amical, chaleureux, patient et passionné de sports de montagne. Utiliser des phrases courtes et un rythme modéré."
 
 @function_tool
-def get_vendor_info(vendor_id: int = None):
+@session_limited
+async def get_vendor_info(vendor_id: int = None):
     """Récupère les informations générales du vendor (nom, localisation, zip_code, etc.)"""
     try:
-        base_url = os.getenv("NEXT_PUBLIC_API_BASE_URL")
         vendor_id = vendor_id or int(os.getenv("NEXT_PUBLIC_VENDOR_ID", "4"))
         
-        print(f'🏫 DEBUG - get_vendor_info called for vendor_id: {vendor_id}')
-        
-        url = f"{base_url}/vendors/{vendor_id}"
-        print(f'🌐 URL: {url}')
-        
-        response = requests.get(
-            url,
-            headers={
-                'Accept': 'application/json',
-                'Content-Type': 'application/json',
-                'ngrok-skip-browser-warning': 'true'
-            },
-            timeout=30
-        )
+        logger.debug("get_vendor_info vendor_id=%s", vendor_id)
         
-        print(f'📡 Response status: {response.status_code}')
-        
-        if not response.ok:
+        try:
+            data = await vendor_data.get_vendor(vendor_id)
+        except httpx.HTTPStatusError as e:
+            logger.warning("Backend vendor %s : statut %s", vendor_id, e.response.status_code)
             return json.dumps({
                 "success": False, 
                 "message": "Impossible de récupérer les informations de l'école."
             })
         
-        data = response.json()
-        print(f'📄 Vendor data received: {json.dumps(data, indent=2)}')
+        log_payload(logger, "Réponse vendor", data)
         
-        return json.dumps({
+        return project_tool_result("information_desk.get_vendor_info", {
             "success": True, 
             "vendor": data,
             "message": f"Informations récupérées pour {data.get('name')}" 
@@ -52,51 +46,38 @@ def get_vendor_info(vendor_id: int = None):
  
         
     except Exception as e:
-        print(f'💥 Error in get_vendor_info: {e}')
+        logger.warning("Erreur dans get_vendor_info : %s", e)
         return json.dumps({
             "success": False, 
             "message": f"Erreur lors de la récupération des informations : {str(e)}"
         })
 
 @function_tool
-def get_vendor_sports(vendor_id: int = None):
+@session_limited
+async def get_vendor_sports(vendor_id: int = None):
     """Liste tous les sports proposés par le vendor"""
     try:
-        base_url = os.getenv("NEXT_PUBLIC_API_BASE_URL")
         vendor_id = vendor_id or int(os.getenv("NEXT_PUBLIC_VENDOR_ID", "4"))
         
-        print(f'🎿 DEBUG - get_vendor_sports called for vendor_id: {vendor_id}')
+        logger.debug("get_vendor_sports vendor_id=%s", vendor_id)
         
-        url = f"{base_url}/sports?vendor_id={vendor_id}"
-        print(f'🌐 URL: {url}')
-        
-        response = requests.get(
-            url,
-            headers={
-                'Accept': 'application/json',
-                'Content-Type': 'application/json',
-                'ngrok-skip-browser-warning': 'true'
-            },
-            timeout=30
-        )
-        
-        print(f'📡 Response status: {response.status_code}')
-        
-        if not response.ok:
+        try:
+            data = await vendor_data.get_vendor_sports(vendor_id)
+        except httpx.HTTPStatusError as e:
+            logger.warning("Backend vendor %s : statut %s", vendor_id, e.response.status_code)
             return json.dumps({
                 "success": False, 
                 "message": "Impossible de récupérer la liste des sports."
             })
         
-        data = response.json()
-        print(f'📄 Sports data received: {json.dumps(data, indent=2)}')
+        log_payload(logger, "Réponse sports", data)
         
         # Extraire les noms des sports pour faciliter les recherches
         sport_names = []
         if isinstance(data, list):
             sport_names = [sport.get('name', sport.get('sport_name', '')) for sport in data if sport.get('name') or sport.get('sport_name')]
         
-        return json.dumps({
+        return project_tool_result("information_desk.get_vendor_sports", {
             "success": True, 
             "sports": data,
             "sport_names": sport_names,
@@ -105,7 +86,7 @@ def get_vendor_sports(vendor_id: int = None):
         })
         
     except Exception as e:
-        print(f'💥 Error in get_vendor_sports: {e}')
+        logger.warning("Erreur dans get_vendor_sports : %s", e)
         return json.dumps({
             "success": False, 
             "message": f"Erreur lors de la récupération des sports : {str(e)}"
@@ -125,6 +106,7 @@ def transfer_to_customer_authentification_agent():
 information_desk_agent = Agent(
     name="Agent d'Information ResaSki",
     model="gpt-4o-mini",
+    model_settings=PARALLEL_TOOL_CALLS,
     instructions=f"""
 # Personnalité et Mission
 Vous êtes l'agent d'information ResaSki, chaleureux, patient et passionné de sports de montagne. 
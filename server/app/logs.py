@@ -0,0 +1,151 @@
+"""
+Journalisation structurée et non bloquante
+Les enregistrements passent par une file : un thread dédié les écrit, la boucle asyncio ne fait
+jamais d'E/S sur stdout. Identifiant de session par contexte, échantillonnage et troncature des
+charges utiles, et aucun formatage quand le niveau est désactivé
+"""
+
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+from contextvars import ContextVar
+from typing import Any
+
+# Identifiant de la session websocket courante, hérité par les tâches créées dans la session
+session_id: ContextVar[str] = ContextVar("session_id", default="-")
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s [%(session_id)s] %(name)s: %(message)s"
+
+# Les clients HTTP journalisent chaque URL en INFO, avec le téléphone et l'email des
+# recherches de clients dans la query string : seuls leurs avertissements sont gardés
+QUIET_LOGGERS = ("httpx", "httpcore")
+
+_payload_sample_rate = 1.0
+_payload_max_chars = 500
+_listener: logging.handlers.QueueListener | None = None
+_handler: logging.Handler | None = None
+
+
+class SessionFilter(logging.Filter):
+    """Ajoute `session_id` à l'enregistrement, dans le contexte de l'appelant"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.session_id = session_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+            + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "session": getattr(record, "session_id", "-"),
+            "message": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class SessionQueueHandler(logging.handlers.QueueHandler):
+    """Met l'enregistrement en file avec son message et sa trace d'exception déjà rendus
+
+    `QueueHandler.prepare` colle la trace au message : elle est gardée à part dans
+    `exc_text`, que le format texte ajoute au message et le format JSON met dans `exc`
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record = copy.copy(record)
+        record.message = record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+class Payload:
+    """Charge utile sérialisée seulement si l'enregistrement est émis, puis tronquée"""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    def __str__(self) -> str:
+        text = (
+            self.value
+            if isinstance(self.value, str)
+            else json.dumps(self.value, ensure_ascii=False, default=str)
+        )
+        if len(text) > _payload_max_chars:
+            return f"{text[:_payload_max_chars]}… (+{len(text) - _payload_max_chars} caractères)"
+        return text
+
+
+def log_payload(
+    logger: logging.Logger, message: str, value: Any, level: int = logging.DEBUG
+) -> None:
+    """Journalise une charge utile (réponse d'API, corps brut) pour une fraction des appels"""
+    if not logger.isEnabledFor(level):
+        return
+    if _payload_sample_rate < 1.0 and random.random() >= _payload_sample_rate:
+        return
+    logger.log(level, "%s : %s", message, Payload(value))
+
+
+def configure_logging(level: str | None = None, fmt: str | None = None) -> None:
+    """Remplace les handlers racine par une file lue par un thread d'écriture
+
+    Variables d'environnement : `LOG_LEVEL` (INFO), `LOG_FORMAT` (text ou json),
+    `LOG_PAYLOAD_SAMPLE_RATE` (1.0) et `LOG_PAYLOAD_MAX_CHARS` (500)
+    """
+    global _listener, _handler, _payload_sample_rate, _payload_max_chars
+    shutdown_logging()
+    _payload_sample_rate = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "1.0"))
+    _payload_max_chars = int(os.getenv("LOG_PAYLOAD_MAX_CHARS", "500"))
+
+    output = logging.StreamHandler(sys.stdout)
+    if (fmt or os.getenv("LOG_FORMAT", "text")) == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    records: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    _handler = SessionQueueHandler(records)
+    _handler.addFilter(SessionFilter())
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(_handler)
+    root.setLevel((level or os.getenv("LOG_LEVEL", "INFO")).upper())
+    for name in QUIET_LOGGERS:
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    _listener = logging.handlers.QueueListener(records, output)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Vide la file, arrête le thread d'écriture et rend sa sortie directement à la racine"""
+    global _listener, _handler
+    if _listener is not None:
+        _listener.stop()
+        root = logging.getLogger()
+        root.removeHandler(_handler)
+        # Les enregistrements émis après l'arrêt vont toujours quelque part, sans la file
+        for output in _listener.handlers:
+            output.addFilter(SessionFilter())
+            root.addHandler(output)
+        _listener = _handler = None
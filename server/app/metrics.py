@@ -0,0 +1,156 @@
+"""
+Mesures de latence par tour, exportées au format Prometheus sur /metrics
+Chaque étape d'un tour est aussi ajoutée comme span à la trace "Voice Agent Chat"
+"""
+
+import bisect
+import time
+from typing import Any
+
+from agents import Agent, RunContextWrapper, RunHooks, Tool
+from agents.tracing import custom_span
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Histogramme Prometheus avec étiquettes, sans dépendance externe"""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # étiquettes → (compte par bucket, somme, nombre)
+        self._series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+        REGISTRY.append(self)
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        counts, totals = self._series.setdefault(key, ([0] * len(self.buckets), [0.0, 0]))
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(counts):
+            counts[index] += 1
+        totals[0] += value
+        totals[1] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (counts, (total, count)) in sorted(self._series.items()):
+            labels = [f'{name}="{value}"' for name, value in zip(self.labelnames, key)]
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = ",".join(labels + [f'le="{bound}"'])
+                lines.append(f"{self.name}_bucket{{{le}}} {cumulative}")
+            le = ",".join(labels + ['le="+Inf"'])
+            lines.append(f"{self.name}_bucket{{{le}}} {int(count)}")
+            suffix = "{" + ",".join(labels) + "}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {total}")
+            lines.append(f"{self.name}_count{suffix} {int(count)}")
+        return lines
+
+
+REGISTRY: list[Histogram] = []
+
+turn_stage_seconds = Histogram(
+    "voice_turn_stage_seconds",
+    "Temps écoulé depuis le début du tour jusqu'à chaque étape",
+    ("stage",),
+)
+audio_receive_seconds = Histogram(
+    "voice_audio_receive_seconds",
+    "Durée entre le premier morceau audio reçu et le commit",
+)
+tool_call_seconds = Histogram(
+    "voice_tool_call_seconds", "Durée de chaque appel d'outil", ("tool",)
+)
+websocket_send_seconds = Histogram(
+    "voice_websocket_send_seconds", "Durée d'un envoi sur le websocket", ("kind",)
+)
+tts_first_chunk_seconds = Histogram(
+    "voice_tts_first_chunk_seconds",
+    "Délai jusqu'au premier morceau audio d'un segment, selon sa source (model, memory, disk)",
+    ("source",),
+)
+prompt_tokens = Histogram(
+    "voice_prompt_tokens",
+    "Tokens d'input par tour : estimés avant et après compactage, facturés par l'API",
+    ("agent", "stage"),
+    buckets=(250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000),
+)
+
+tool_tokens_saved = Histogram(
+    "voice_tool_tokens_saved",
+    "Tokens d'input économisés par appel d'outil grâce à la projection des résultats",
+    ("tool",),
+    buckets=(0, 25, 50, 100, 250, 500, 1000, 2500, 5000),
+)
+
+
+def render_metrics() -> str:
+    lines: list[str] = []
+    for histogram in REGISTRY:
+        lines.extend(histogram.render())
+    return "\n".join(lines) + "\n"
+
+
+def record_span(name: str, **data: Any) -> None:
+    # Span instantané rattaché à la trace courante, avec la mesure dans ses données
+    with custom_span(name, data=data):
+        pass
+
+
+class TurnTimer:
+    """Horloge d'un tour : `mark` enregistre le temps écoulé depuis le début du tour
+
+    Étapes : `stt_done`, `llm_first_event`, `handoff`, `tts_first_byte`, `tts_last_byte`
+    """
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.started_at = time.perf_counter()
+        self._marked: set[str] = set()
+
+    def mark(self, stage: str, once: bool = False, **data: Any) -> float:
+        elapsed = time.perf_counter() - self.started_at
+        if once and stage in self._marked:
+            return elapsed
+        self._marked.add(stage)
+        turn_stage_seconds.observe(elapsed, stage=stage)
+        record_span(f"turn.{stage}", kind=self.kind, elapsed_seconds=elapsed, **data)
+        return elapsed
+
+
+class TurnHooks(RunHooks):
+    """Mesure les appels d'outils et les transferts d'agent d'un `Runner.run_streamed`"""
+
+    def __init__(self, turn: TurnTimer):
+        self.turn = turn
+        self._tool_starts: dict[str, list[float]] = {}
+
+    async def on_tool_start(
+        self, context: RunContextWrapper, agent: Agent, tool: Tool
+    ) -> None:
+        self._tool_starts.setdefault(tool.name, []).append(time.perf_counter())
+
+    async def on_tool_end(
+        self, context: RunContextWrapper, agent: Agent, tool: Tool, result: str
+    ) -> None:
+        starts = self._tool_starts.get(tool.name)
+        if not starts:
+            return
+        duration = time.perf_counter() - starts.pop(0)
+        tool_call_seconds.observe(duration, tool=tool.name)
+        record_span(f"tool.{tool.name}", agent=agent.name, duration_seconds=duration)
+
+    async def on_handoff(
+        self, context: RunContextWrapper, from_agent: Agent, to_agent: Agent
+    ) -> None:
+        self.turn.mark("handoff", from_agent=from_agent.name, to_agent=to_agent.name)
@@ -0,0 +1,233 @@
+"""
+Envoi sortant d'une session websocket par une seule tâche
+Les messages JSON (historique, texte) passent toujours avant l'audio. L'audio TTS est
+regroupé en trames d'une durée fixe, envoyé au rythme de la lecture côté client avec une
+avance bornée, et mis en file bornée : quand elle est pleine, le producteur attend, ou
+les trames les plus anciennes sont abandonnées si le client ne suit plus
+"""
+
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass
+from logging import getLogger
+
+import numpy as np
+from fastapi import WebSocket
+
+from .audio_buffer import SAMPLE_RATE
+from .metrics import websocket_send_seconds
+
+logger = getLogger(__name__)
+
+OVERFLOW_POLICIES = ("block", "drop")
+
+
+@dataclass
+class SenderSettings:
+    """Réglages de l'envoi audio
+
+    - `frame_ms` : durée d'une trame audio envoyée
+    - `queue_frames` : nombre de trames gardées en file côté serveur
+    - `max_lead_ms` : avance maximale sur la lecture du client, 0 pour envoyer sans attendre
+    - `overflow` : `block` (le TTS attend de la place) ou `drop` (les trames les plus
+      anciennes sont abandonnées quand un envoi est bloqué par un client trop lent)
+    """
+
+    frame_ms: int = 100
+    queue_frames: int = 50
+    max_lead_ms: int = 1500
+    overflow: str = "block"
+
+    @classmethod
+    def from_env(cls) -> "SenderSettings":
+        overflow = os.getenv("AUDIO_OVERFLOW", cls.overflow)
+        return cls(
+            frame_ms=int(os.getenv("AUDIO_FRAME_MS", cls.frame_ms)),
+            queue_frames=int(os.getenv("AUDIO_QUEUE_FRAMES", cls.queue_frames)),
+            max_lead_ms=int(os.getenv("AUDIO_MAX_LEAD_MS", cls.max_lead_ms)),
+            overflow=overflow if overflow in OVERFLOW_POLICIES else cls.overflow,
+        )
+
+
+class OutboundSender:
+    """File d'envoi d'un websocket, vidée par une tâche démarrée au premier message
+
+    `encode_audio` transforme une trame PCM16 en message (texte JSON ou binaire) ; les
+    marqueurs de fin (`audio.done`) passent par la file audio pour rester après l'audio
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        encode_audio: Callable[[np.ndarray], str | bytes],
+        settings: SenderSettings | None = None,
+        sample_rate: int = SAMPLE_RATE,
+    ):
+        self.websocket = websocket
+        self.encode_audio = encode_audio
+        self.settings = settings or SenderSettings.from_env()
+        self.sample_rate = sample_rate
+        self.frame_samples = self.sample_rate * self.settings.frame_ms // 1000
+        self.dropped_frames = 0
+        self._control: deque[str] = deque()
+        # Trames PCM16 ou messages JSON de fin, dans l'ordre de lecture
+        self._audio: deque[np.ndarray | str] = deque()
+        self._pending: list[np.ndarray] = []
+        self._pending_samples = 0
+        self._playback_ends_at = 0.0
+        self._sent_samples = 0
+        self._sending_audio = False
+        self._wakeup = asyncio.Event()
+        self._space = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._task: asyncio.Task | None = None
+        self._closed = False
+
+    def _notify(self):
+        self._idle.clear()
+        self._wakeup.set()
+        if self._task is None and not self._closed:
+            self._task = asyncio.create_task(self._run())
+
+    def send_json(self, payload: dict):
+        if self._closed:
+            return
+        self._control.append(json.dumps(payload))
+        self._notify()
+
+    async def send_audio(self, samples: np.ndarray):
+        """Ajoute de l'audio ; les trames complètes sont mises en file"""
+        if self._closed:
+            return
+        self._pending.append(samples)
+        self._pending_samples += len(samples)
+        if self._pending_samples < self.frame_samples:
+            return
+        audio = np.concatenate(self._pending)
+        cut = len(audio) - len(audio) % self.frame_samples
+        self._pending = [audio[cut:]] if cut < len(audio) else []
+        self._pending_samples = len(audio) - cut
+        for start in range(0, cut, self.frame_samples):
+            await self._put_audio(audio[start : start + self.frame_samples])
+
+    async def end_audio(self, marker: dict | None = None):
+        """Envoie le reste de l'audio en attente, puis le marqueur de fin éventuel"""
+        if self._pending_samples:
+            audio = np.concatenate(self._pending)
+            self._pending, self._pending_samples = [], 0
+            await self._put_audio(audio)
+        if marker is not None and not self._closed:
+            self._audio.append(json.dumps(marker))
+            self._notify()
+
+    def start_response(self):
+        """Remet à zéro le compte de l'audio lu, au début d'une réponse"""
+        self._sent_samples = 0
+
+    def played_samples(self) -> int:
+        """Échantillons de la réponse déjà lus par le client : envoyés, moins l'avance"""
+        lead = max(0.0, self._playback_ends_at - time.monotonic())
+        return max(0, self._sent_samples - int(lead * self.sample_rate))
+
+    def clear_audio(self):
+        """Abandonne l'audio en attente, le client arrête la lecture (réponse interrompue)"""
+        self._pending, self._pending_samples = [], 0
+        self._audio.clear()
+        self._playback_ends_at = 0.0
+        self._space.set()
+
+    async def _put_audio(self, frame: np.ndarray):
+        while len(self._audio) >= self.settings.queue_frames and not self._closed:
+            if self.settings.overflow == "drop" and self._sending_audio:
+                # Le client ne suit plus : l'audio le plus ancien est déjà en retard
+                self._audio.popleft()
+                self.dropped_frames += 1
+                if self.dropped_frames == 1:
+                    logger.warning("Client trop lent, trames audio abandonnées")
+                break
+            self._space.clear()
+            await self._space.wait()
+        if self._closed:
+            return
+        self._audio.append(frame)
+        self._notify()
+
+    def _pacing_delay(self) -> float:
+        if self.settings.max_lead_ms <= 0:
+            return 0.0
+        lead = self._playback_ends_at - time.monotonic()
+        return max(0.0, lead - self.settings.max_lead_ms / 1000)
+
+    async def _send(self, message: str | bytes, kind: str):
+        start = time.perf_counter()
+        if isinstance(message, bytes):
+            await self.websocket.send_bytes(message)
+        else:
+            await self.websocket.send_text(message)
+        websocket_send_seconds.observe(time.perf_counter() - start, kind=kind)
+
+    async def _send_frame(self, frame: np.ndarray):
+        now = time.monotonic()
+        self._playback_ends_at = max(now, self._playback_ends_at) + len(frame) / self.sample_rate
+        self._sent_samples += len(frame)
+        self._sending_audio = True
+        try:
+            await self._send(self.encode_audio(frame), "audio")
+        finally:
+            self._sending_audio = False
+
+    async def _run(self):
+        try:
+            while True:
+                self._wakeup.clear()
+                if self._control:
+                    await self._send(self._control.popleft(), "json")
+                    continue
+                if self._audio:
+                    delay = self._pacing_delay()
+                    if delay > 0:
+                        # Les messages JSON arrivés pendant l'attente partent aussitôt
+                        try:
+                            await asyncio.wait_for(self._wakeup.wait(), delay)
+                        except asyncio.TimeoutError:
+                            pass
+                        continue
+                    item = self._audio.popleft()
+                    self._space.set()
+                    if isinstance(item, str):
+                        await self._send(item, "json")
+                    else:
+                        await self._send_frame(item)
+                    continue
+                self._idle.set()
+                await self._wakeup.wait()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Websocket fermé : les messages suivants sont ignorés
+            logger.info("Envoi interrompu : %s", e)
+            self._close_queues()
+
+    async def drain(self):
+        """Attend que tout ce qui est en file soit envoyé"""
+        await self._idle.wait()
+
+    def _close_queues(self):
+        self._closed = True
+        self._control.clear()
+        self.clear_audio()
+        self._idle.set()
+
+    async def close(self):
+        self._close_queues()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
@@ -0,0 +1,300 @@
+"""
+Normalisation des numéros de téléphone au format E164, sans appel réseau
+Les tables des indicatifs sont construites une seule fois depuis les métadonnées phonenumbers
+et couvrent tous les indicatifs ; seul `is_valid_number` est appelé, sur un numéro déjà
+découpé, sans repasser par `phonenumbers.parse`. Les transcriptions épelées par le STT
+("zéro six douze…") sont converties en chiffres avant la normalisation
+"""
+
+import os
+import re
+from dataclasses import dataclass, replace
+from functools import lru_cache
+
+import phonenumbers
+from phonenumbers import geocoder
+
+
+@dataclass(frozen=True)
+class CallingCode:
+    """Données d'un indicatif pays, tirées de la région principale"""
+
+    code: int
+    regions: tuple[str, ...]
+    national_prefix: str | None
+    possible_lengths: frozenset[int]
+    # Nom français de chaque région de l'indicatif (+1 : Etats-Unis, Canada…)
+    country_names: dict[str, str]
+
+    def country_name(self, number: phonenumbers.PhoneNumber) -> str:
+        region = self.regions[0]
+        if len(self.regions) > 1:
+            region = phonenumbers.region_code_for_number(number) or region
+        return self.country_names.get(region, "")
+
+
+@dataclass(frozen=True)
+class PhoneResult:
+    success: bool
+    normalized: str | None = None
+    country: str | None = None
+    country_code: str | None = None
+    assumed_country: bool = False
+    # invalid_number, parse_error, unsupported_country, country_needed
+    error: str | None = None
+
+
+NUMBER_TYPES = (
+    "general_desc", "fixed_line", "mobile", "toll_free", "premium_rate", "shared_cost",
+    "personal_number", "voip", "pager", "uan", "voicemail",
+)
+
+
+def _lengths(metadata) -> set[int]:
+    # Certains types (numéros verts…) ont des longueurs absentes de la description générale
+    lengths: set[int] = set()
+    for number_type in NUMBER_TYPES:
+        desc = getattr(metadata, number_type, None)
+        if desc is not None:
+            lengths.update(desc.possible_length or ())
+    return {length for length in lengths if length > 0}
+
+
+def _calling_code(code: int, regions: tuple[str, ...]) -> CallingCode:
+    names: dict[str, str] = {}
+    lengths: set[int] = set()
+    national_prefix = None
+    for region in regions:
+        if region == phonenumbers.REGION_CODE_FOR_NON_GEO_ENTITY:
+            metadata = phonenumbers.PhoneMetadata.metadata_for_nongeo_region(code)
+        else:
+            metadata = phonenumbers.PhoneMetadata.metadata_for_region(region)
+            example = phonenumbers.example_number(region)
+            if example is not None:
+                names[region] = geocoder.country_name_for_number(example, "fr")
+        if metadata is None:
+            continue
+        lengths |= _lengths(metadata)
+        if national_prefix is None:
+            national_prefix = metadata.national_prefix
+    return CallingCode(code, regions, national_prefix, frozenset(lengths), names)
+
+
+@lru_cache(maxsize=1)
+def calling_codes() -> dict[str, CallingCode]:
+    """Indicatif ("33") → données, construit au premier appel (préchauffé au démarrage)"""
+    return {
+        str(code): _calling_code(code, regions)
+        for code, regions in phonenumbers.COUNTRY_CODE_TO_REGION_CODE.items()
+    }
+
+
+# Les indicatifs forment un code préfixe : un seul découpage de 1 à 3 chiffres est possible
+MAX_CALLING_CODE_LENGTH = 3
+
+UNITS = {
+    "zéro": 0, "zero": 0, "un": 1, "une": 1, "deux": 2, "trois": 3, "quatre": 4,
+    "cinq": 5, "six": 6, "sept": 7, "huit": 8, "neuf": 9, "dix": 10, "onze": 11,
+    "douze": 12, "treize": 13, "quatorze": 14, "quinze": 15, "seize": 16,
+}
+# Avec les dizaines de Belgique et de Suisse
+TENS = {
+    "vingt": 20, "vingts": 20, "trente": 30, "quarante": 40, "cinquante": 50,
+    "soixante": 60, "septante": 70, "huitante": 80, "octante": 80, "nonante": 90,
+}
+HUNDREDS = ("cent", "cents")
+REPEATS = {"double": 2, "triple": 3}
+
+_WORD_SPLIT = re.compile(r"[\s\-,;:./()]+")
+_NOT_DIGIT = re.compile(r"[^\d+]")
+_HAS_LETTER = re.compile(r"[^\W\d_]")
+
+
+def _read_number(tokens: list[str], i: int) -> tuple[int | None, int]:
+    """Lit un nombre de 0 à 999 écrit en toutes lettres à partir de tokens[i]
+
+    Les centaines servent aux numéros suisses, dictés "zéro septante-neuf cent vingt-trois…"
+    """
+
+    def unit(at: int) -> int | None:
+        return UNITS.get(tokens[at]) if at < len(tokens) else None
+
+    word = tokens[i]
+    hundreds = None
+    if word in HUNDREDS:
+        hundreds, i = 100, i + 1
+    elif i + 1 < len(tokens) and tokens[i + 1] in HUNDREDS and 2 <= (unit(i) or 0) <= 9:
+        hundreds, i = unit(i) * 100, i + 2
+    if hundreds is not None:
+        if i < len(tokens) and (tokens[i] in TENS or (unit(i) or 0) > 0):
+            rest, i = _read_tens(tokens, i)
+            return hundreds + rest, i
+        return hundreds, i
+    return _read_tens(tokens, i)
+
+
+def _read_tens(tokens: list[str], i: int) -> tuple[int | None, int]:
+    """Lit un nombre de 0 à 99 écrit en toutes lettres à partir de tokens[i]"""
+
+    def unit(at: int) -> int | None:
+        return UNITS.get(tokens[at]) if at < len(tokens) else None
+
+    word = tokens[i]
+    if word == "quatre" and i + 1 < len(tokens) and tokens[i + 1] in ("vingt", "vingts"):
+        value, i = 80, i + 2
+    elif word in TENS:
+        value, i = TENS[word], i + 1
+    elif word in UNITS:
+        value, i = UNITS[word], i + 1
+        # dix-sept, dix-huit, dix-neuf
+        if value == 10 and (unit(i) or 0) in (7, 8, 9):
+            value, i = value + unit(i), i + 1
+        return value, i
+    else:
+        return None, i + 1
+
+    # vingt et un, soixante et onze
+    if i + 1 < len(tokens) and tokens[i] == "et" and unit(i + 1) in (1, 11):
+        i += 1
+    following = unit(i)
+    if following is not None and (1 <= following <= 9 or (value in (60, 80) and following >= 10)):
+        value, i = value + following, i + 1
+        # soixante-dix-huit, quatre-vingt-dix-neuf
+        if following == 10 and (unit(i) or 0) in (7, 8, 9):
+            value, i = value + unit(i), i + 1
+    return value, i
+
+
+def spoken_to_digits(text: str) -> str:
+    """Convertit une transcription ("plus trente-trois six douze…") en chiffres
+
+    Les chiffres déjà présents sont gardés, les mots inconnus ("mon", "numéro"…) ignorés
+    """
+    tokens = [token for token in _WORD_SPLIT.split(text.lower()) if token]
+    parts: list[str] = []
+    repeat = 1
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token == "plus" or token == "+":
+            parts.append("+")
+            i += 1
+            continue
+        if token in REPEATS:
+            repeat = REPEATS[token]
+            i += 1
+            continue
+        if token.lstrip("+").isdigit():
+            digits, i = token, i + 1
+        else:
+            value, i = _read_number(tokens, i)
+            if value is None:
+                continue
+            digits = str(value)
+        parts.append(digits * repeat)
+        repeat = 1
+    return "".join(parts)
+
+
+def clean_number(phone_input: str) -> str:
+    """Garde les chiffres et un "+" initial ; "00" en tête devient "+" """
+    if _HAS_LETTER.search(phone_input):
+        phone_input = spoken_to_digits(phone_input)
+    digits = _NOT_DIGIT.sub("", phone_input)
+    international = digits.startswith("+")
+    digits = digits.replace("+", "")
+    if not international and digits.startswith("00"):
+        international, digits = True, digits[2:]
+    return "+" + digits if international else digits
+
+
+def _split_international(digits: str) -> tuple[CallingCode, str] | None:
+    tables = calling_codes()
+    for length in range(1, MAX_CALLING_CODE_LENGTH + 1):
+        calling_code = tables.get(digits[:length])
+        if calling_code is not None:
+            return calling_code, digits[length:]
+    return None
+
+
+def _validate(calling_code: CallingCode, national: str) -> PhoneResult | None:
+    # Préfixe national composé par habitude après l'indicatif : +33 0 6…
+    prefix = calling_code.national_prefix
+    if (
+        prefix
+        and national.startswith(prefix)
+        and len(national) - len(prefix) in calling_code.possible_lengths
+    ):
+        national = national[len(prefix) :]
+    if not national or len(national) not in calling_code.possible_lengths:
+        return None
+    leading_zeros = len(national) - len(national.lstrip("0"))
+    number = phonenumbers.PhoneNumber(
+        country_code=calling_code.code,
+        national_number=int(national),
+        italian_leading_zero=leading_zeros > 0 or None,
+        number_of_leading_zeros=leading_zeros if leading_zeros > 1 else None,
+    )
+    if not phonenumbers.is_valid_number(number):
+        return None
+    return _result(calling_code, number)
+
+
+def _result(calling_code: CallingCode, number: phonenumbers.PhoneNumber) -> PhoneResult:
+    return PhoneResult(
+        success=True,
+        normalized=phonenumbers.format_number(number, phonenumbers.PhoneNumberFormat.E164),
+        country=calling_code.country_name(number),
+        country_code=f"+{calling_code.code}",
+    )
+
+
+def _parse(text: str, region: str | None = None) -> PhoneResult | None:
+    """Chemin lent, quand le découpage rapide échoue : préfixes nationaux à règles
+    (Biélorussie "8", Argentine "0…15"…) ou numéro réellement invalide"""
+    try:
+        number = phonenumbers.parse(text, region)
+    except phonenumbers.NumberParseException:
+        return None
+    calling_code = calling_codes().get(str(number.country_code))
+    if calling_code is None or not phonenumbers.is_valid_number(number):
+        return None
+    return _result(calling_code, number)
+
+
+def _national(calling_code: CallingCode, digits: str) -> PhoneResult | None:
+    return _validate(calling_code, digits) or _parse(digits, calling_code.regions[0])
+
+
+def default_calling_code() -> str:
+    # Indicatif supposé pour un numéro national sans indicatif (0…)
+    return os.getenv("PHONE_DEFAULT_COUNTRY_CODE", "33")
+
+
+@lru_cache(maxsize=4096)
+def normalize_phone(phone_input: str, country_code: str | None = None) -> PhoneResult:
+    """Normalise un numéro saisi ou dicté, avec l'indicatif pays éventuellement précisé
+
+    Mémorisé : un même numéro répété pendant l'identification n'est traité qu'une fois
+    """
+    digits = clean_number(phone_input)
+    if digits.startswith("+"):
+        split = _split_international(digits[1:])
+        if split is None:
+            return PhoneResult(success=False, error="parse_error")
+        result = _validate(*split) or _parse(digits)
+        return result or PhoneResult(success=False, error="invalid_number")
+
+    if country_code:
+        calling_code = calling_codes().get(_NOT_DIGIT.sub("", country_code).lstrip("0+"))
+        if calling_code is None:
+            return PhoneResult(success=False, error="unsupported_country")
+        result = _national(calling_code, digits)
+        return result or PhoneResult(success=False, error="invalid_number")
+
+    if digits.startswith("0"):
+        calling_code = calling_codes().get(default_calling_code())
+        result = _national(calling_code, digits) if calling_code else None
+        if result is not None:
+            return replace(result, assumed_country=True)
+    return PhoneResult(success=False, error="country_needed")
@@ -0,0 +1,227 @@
+"""
+Stockage des conversations par identifiant de session
+Permet à un client qui se reconnecte de reprendre sa conversation avec `/ws?session=<id>`
+sans renvoyer l'historique. L'historique est persisté en ajout seul, item par item
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+
+@dataclass
+class SessionState:
+    history: list = field(default_factory=list)
+    agent_name: str | None = None
+
+
+class SessionStore(ABC):
+    """Interface commune aux stockages de session"""
+
+    @abstractmethod
+    async def load(self, session_id: str) -> SessionState | None:
+        """Retourne l'état de la session, ou None si elle est inconnue"""
+
+    @abstractmethod
+    async def append(self, session_id: str, items: list, agent_name: str | None) -> None:
+        """Ajoute des items à la fin de l'historique et enregistre l'agent actif"""
+
+    @abstractmethod
+    async def replace(self, session_id: str, history: list, agent_name: str | None) -> None:
+        """Remplace tout l'historique (synchronisation ou remise à zéro par le client)"""
+
+    async def close(self) -> None:
+        pass
+
+
+class MemorySessionStore(SessionStore):
+    """Sessions en mémoire du processus, les moins récemment utilisées sont évincées"""
+
+    def __init__(self, maxsize: int = 1000):
+        self.maxsize = maxsize
+        self._sessions: OrderedDict[str, SessionState] = OrderedDict()
+
+    def _touch(self, session_id: str) -> SessionState:
+        state = self._sessions.setdefault(session_id, SessionState())
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.maxsize:
+            self._sessions.popitem(last=False)
+        return state
+
+    async def load(self, session_id: str) -> SessionState | None:
+        state = self._sessions.get(session_id)
+        if state is None:
+            return None
+        self._sessions.move_to_end(session_id)
+        return SessionState(list(state.history), state.agent_name)
+
+    async def append(self, session_id: str, items: list, agent_name: str | None) -> None:
+        state = self._touch(session_id)
+        state.history.extend(items)
+        state.agent_name = agent_name
+
+    async def replace(self, session_id: str, history: list, agent_name: str | None) -> None:
+        state = self._touch(session_id)
+        state.history = list(history)
+        state.agent_name = agent_name
+
+
+class SqliteSessionStore(SessionStore):
+    """Sessions dans un fichier SQLite local, partagé par les workers d'une même machine
+
+    Les requêtes tournent dans un thread pour ne pas bloquer la boucle asyncio
+
+    - `ttl` : secondes sans activité après lesquelles une session expire
+    - `maxsize` : nombre de sessions gardées, les moins récemment utilisées sont supprimées
+    - `prune_interval` : écart minimal entre deux purges, faites au démarrage puis à l'écriture
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sessions (
+            id TEXT PRIMARY KEY,
+            agent_name TEXT,
+            updated_at REAL NOT NULL,
+            expires_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS items (
+            session_id TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            item TEXT NOT NULL,
+            PRIMARY KEY (session_id, position)
+        );
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: float = 86400.0,
+        maxsize: int = 1000,
+        prune_interval: float = 60.0,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.prune_interval = prune_interval
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(self.SCHEMA)
+        self._migrate()
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at)"
+        )
+        self._lock = asyncio.Lock()
+        self._next_prune = 0.0
+        self._prune(time.time())
+
+    def _migrate(self):
+        # Les fichiers créés avant l'expiration reçoivent la colonne, comptée depuis leur
+        # dernière activité
+        with self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(sessions)")}
+            if "expires_at" not in columns:
+                self._db.execute(
+                    "ALTER TABLE sessions ADD COLUMN expires_at REAL NOT NULL DEFAULT 0"
+                )
+                self._db.execute("UPDATE sessions SET expires_at = updated_at + ?", (self.ttl,))
+
+    def _prune(self, now: float):
+        """Supprime les sessions expirées puis les plus anciennes au-delà de `maxsize`"""
+        if now < self._next_prune:
+            return
+        self._next_prune = now + self.prune_interval
+        with self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            self._db.execute(
+                "DELETE FROM sessions WHERE expires_at <= ? OR id IN ("
+                "SELECT id FROM sessions ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                (now, self.maxsize),
+            )
+            deleted = self._db.execute(
+                "DELETE FROM items WHERE session_id NOT IN (SELECT id FROM sessions)"
+            ).rowcount
+        if deleted:
+            logger.info("%d items de sessions expirées supprimés", deleted)
+
+    async def _run(self, fn, *args):
+        async with self._lock:
+            return await asyncio.to_thread(fn, *args)
+
+    def _load(self, session_id: str) -> SessionState | None:
+        now = time.time()
+        row = self._db.execute(
+            "SELECT agent_name FROM sessions WHERE id = ? AND expires_at > ?", (session_id, now)
+        ).fetchone()
+        if row is None:
+            return None
+        # Une session reprise repart pour un délai complet, comme dans le stockage mémoire
+        self._db.execute(
+            "UPDATE sessions SET updated_at = ?, expires_at = ? WHERE id = ?",
+            (now, now + self.ttl, session_id),
+        )
+        items = self._db.execute(
+            "SELECT item FROM items WHERE session_id = ? ORDER BY position", (session_id,)
+        ).fetchall()
+        return SessionState([json.loads(item) for (item,) in items], row[0])
+
+    def _write(self, session_id: str, items: list, agent_name: str | None, replace: bool):
+        now = time.time()
+        self._prune(now)
+        with self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            if replace:
+                self._db.execute("DELETE FROM items WHERE session_id = ?", (session_id,))
+                start = 0
+            else:
+                (start,) = self._db.execute(
+                    "SELECT COUNT(*) FROM items WHERE session_id = ?", (session_id,)
+                ).fetchone()
+            self._db.executemany(
+                "INSERT INTO items (session_id, position, item) VALUES (?, ?, ?)",
+                [
+                    (session_id, start + i, json.dumps(item, ensure_ascii=False))
+                    for i, item in enumerate(items)
+                ],
+            )
+            self._db.execute(
+                "INSERT INTO sessions (id, agent_name, updated_at, expires_at) "
+                "VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET agent_name = excluded.agent_name, "
+                "updated_at = excluded.updated_at, expires_at = excluded.expires_at",
+                (session_id, agent_name, now, now + self.ttl),
+            )
+
+    async def load(self, session_id: str) -> SessionState | None:
+        return await self._run(self._load, session_id)
+
+    async def append(self, session_id: str, items: list, agent_name: str | None) -> None:
+        await self._run(self._write, session_id, items, agent_name, False)
+
+    async def replace(self, session_id: str, history: list, agent_name: str | None) -> None:
+        await self._run(self._write, session_id, history, agent_name, True)
+
+    async def close(self) -> None:
+        await self._run(self._db.close)
+
+
+def create_session_store(spec: str | None = None) -> SessionStore:
+    """Crée le stockage décrit par `SESSION_STORE` : `memory` (défaut) ou `sqlite:<chemin>`"""
+    spec = spec or os.getenv("SESSION_STORE", "memory")
+    maxsize = int(os.getenv("SESSION_STORE_MAXSIZE", "1000"))
+    if spec.startswith("sqlite:"):
+        return SqliteSessionStore(
+            spec.removeprefix("sqlite:"),
+            ttl=float(os.getenv("SESSION_STORE_TTL", "86400")),
+            maxsize=maxsize,
+        )
+    if spec != "memory":
+        logger.warning("SESSION_STORE inconnu %r, repli sur la mémoire", spec)
+    return MemorySessionStore(maxsize)
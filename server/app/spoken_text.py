@@ -0,0 +1,91 @@
+"""
+Texte réellement entendu d'une réponse vocale interrompue
+Chaque segment envoyé au TTS est noté avec la durée de l'audio synthétisé ; à
+l'interruption, l'audio déjà lu par le client (app/outbound.py) donne les segments
+entendus, le dernier coupé au prorata. L'historique garde ce texte, pas toute la réponse
+générée que l'appelant n'a jamais entendue
+"""
+
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+
+from agents.voice import TTSModel, TTSModelSettings
+
+from .audio_buffer import SAMPLE_RATE
+
+# Débit de parole du TTS, pour estimer la durée d'un segment encore en synthèse
+SAMPLES_PER_CHAR = SAMPLE_RATE // 15
+
+
+@dataclass
+class _Segment:
+    text: str
+    samples: int = 0
+    done: bool = False
+
+
+def _cut_words(text: str, chars: int) -> str:
+    if chars >= len(text):
+        return text
+    # Le mot en cours de lecture n'est pas gardé
+    cut = text.rfind(" ", 0, chars + 1)
+    return text[:cut].rstrip(" ,;:") + "…" if cut > 0 else ""
+
+
+class SpokenText:
+    """Segments d'une réponse vocale dans l'ordre de lecture, avec la durée de leur audio"""
+
+    def __init__(self):
+        self.voiced = False
+        self._segments: list[_Segment] = []
+
+    def reset(self, voiced: bool) -> None:
+        """Début d'une réponse ; `voiced` est faux pour une réponse texte, entendue en entier"""
+        self.voiced = voiced
+        self._segments = []
+
+    def add(self, text: str) -> _Segment:
+        segment = _Segment(text)
+        self._segments.append(segment)
+        return segment
+
+    def heard(self, played_samples: int) -> str:
+        """Texte des segments couverts par `played_samples` échantillons lus"""
+        heard = []
+        for segment in self._segments:
+            if played_samples <= 0:
+                break
+            if segment.done and played_samples >= segment.samples:
+                heard.append(segment.text)
+                played_samples -= segment.samples
+                continue
+            total = segment.samples
+            if not segment.done:
+                total = max(total, len(segment.text) * SAMPLES_PER_CHAR, 1)
+            heard.append(_cut_words(segment.text, len(segment.text) * played_samples // total))
+            break
+        return " ".join(text for text in heard if text)
+
+
+class SpokenTTSModel(TTSModel):
+    """Modèle TTS d'une session qui note chaque segment synthétisé dans `spoken`
+
+    Le SDK démarre la synthèse des segments dans l'ordre du texte : l'ordre des appels à
+    `run` est l'ordre de lecture
+    """
+
+    def __init__(self, model: TTSModel, spoken: SpokenText):
+        self.model = model
+        self.spoken = spoken
+
+    @property
+    def model_name(self) -> str:
+        return self.model.model_name
+
+    async def run(self, text: str, settings: TTSModelSettings) -> AsyncIterator[bytes]:
+        segment = self.spoken.add(text)
+        async for chunk in self.model.run(text, settings):
+            # PCM16 : deux octets par échantillon
+            segment.samples += len(chunk) // 2
+            yield chunk
+        segment.done = True
@@ -0,0 +1,52 @@
+"""
+Exécution concurrente des outils d'une même réponse du modèle
+Le SDK lance en parallèle les appels d'outils d'une réponse ; les outils qui appellent le
+backend passent par une limite de concurrence propre à chaque session websocket, pour qu'un
+tour à plusieurs outils coûte max(latence) sans qu'une session sature le backend
+"""
+
+import asyncio
+import functools
+import os
+from collections.abc import Awaitable, Callable
+from contextvars import ContextVar
+from typing import ParamSpec, TypeVar
+
+from agents import ModelSettings
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+# Réglages des agents dont les outils sont indépendants : le modèle peut les appeler ensemble
+PARALLEL_TOOL_CALLS = ModelSettings(parallel_tool_calls=True)
+
+# Limite de la session websocket courante, héritée par les tâches du Runner
+_session_limit: ContextVar[asyncio.Semaphore | None] = ContextVar(
+    "tool_session_limit", default=None
+)
+
+
+def open_session(limit: int | None = None) -> asyncio.Semaphore:
+    """Installe la limite d'appels d'outils simultanés pour la session courante"""
+    semaphore = asyncio.Semaphore(
+        limit or int(os.getenv("TOOL_CONCURRENCY_PER_SESSION", "4"))
+    )
+    _session_limit.set(semaphore)
+    return semaphore
+
+
+def session_limited(fn: Callable[P, Awaitable[T]]) -> Callable[P, Awaitable[T]]:
+    """Décorateur pour les outils async, à placer sous `@function_tool`
+
+    `functools.wraps` garde la signature et la docstring dont le SDK tire le schéma de l'outil
+    """
+
+    @functools.wraps(fn)
+    async def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+        semaphore = _session_limit.get()
+        if semaphore is None:
+            return await fn(*args, **kwargs)
+        async with semaphore:
+            return await fn(*args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,113 @@
+"""
+Projection déclarative des résultats d'outils avant leur envoi au modèle
+Chaque outil déclare les champs utiles à l'agent ; le reste de la réponse backend ne devient
+jamais des tokens d'input, ni pour ce tour ni pour les suivants
+"""
+
+import json
+from dataclasses import dataclass
+from typing import Any
+
+from .history_compaction import CHARS_PER_TOKEN
+from .metrics import tool_tokens_saved
+
+
+@dataclass(frozen=True)
+class Projection:
+    """Forme gardée d'une valeur
+
+    - `fields` : pour un objet, les clés gardées et leur propre projection (None = telle quelle)
+    - `max_items` : pour une liste, nombre d'éléments gardés ; le total est ajouté à côté
+      sous `<clé>_total` quand la liste est tronquée
+    - `max_chars` : pour une chaîne, longueur maximale
+    """
+
+    fields: dict[str, "Projection | None"] | None = None
+    max_items: int | None = None
+    max_chars: int | None = None
+
+
+def keep(*names: str, **nested: "Projection") -> Projection:
+    return Projection(fields={**{name: None for name in names}, **nested})
+
+
+@dataclass(frozen=True)
+class ToolProjection:
+    result: Projection
+    # Plafond de la sortie JSON complète, les listes sont raccourcies pour le respecter
+    max_chars: int = 2000
+    list_keys: tuple[str, ...] = ()
+
+
+def apply_projection(value: Any, projection: Projection | None) -> Any:
+    if projection is None:
+        return value
+    if isinstance(value, list):
+        items = value[: projection.max_items] if projection.max_items is not None else value
+        item_projection = Projection(fields=projection.fields, max_chars=projection.max_chars)
+        return [apply_projection(item, item_projection) for item in items]
+    if isinstance(value, dict) and projection.fields is not None:
+        projected = {}
+        for key, child in projection.fields.items():
+            if key not in value:
+                continue
+            projected[key] = apply_projection(value[key], child)
+            if isinstance(value[key], list) and len(projected[key]) < len(value[key]):
+                projected[f"{key}_total"] = len(value[key])
+        return projected
+    if isinstance(value, str) and projection.max_chars is not None:
+        if len(value) > projection.max_chars:
+            return value[: projection.max_chars] + "…"
+    return value
+
+
+def _cap(result: dict, spec: ToolProjection) -> str:
+    text = json.dumps(result, ensure_ascii=False)
+    # Au-delà du plafond, les listes déclarées sont divisées par deux jusqu'à tenir
+    while len(text) > spec.max_chars:
+        lists = [
+            key for key in spec.list_keys if isinstance(result.get(key), list) and result[key]
+        ]
+        if not lists:
+            break
+        for key in lists:
+            total = result.get(f"{key}_total", len(result[key]))
+            result[key] = result[key][: len(result[key]) // 2]
+            result[f"{key}_total"] = total
+        text = json.dumps(result, ensure_ascii=False)
+    return text
+
+
+def project_tool_result(tool_name: str, result: dict) -> str:
+    """Sérialise le résultat d'un outil selon sa projection déclarée dans TOOL_PROJECTIONS"""
+    spec = TOOL_PROJECTIONS.get(tool_name)
+    if spec is None:
+        return json.dumps(result, ensure_ascii=False)
+    text = _cap(apply_projection(result, spec.result), spec)
+    raw_chars = len(json.dumps(result, ensure_ascii=False))
+    tool_tokens_saved.observe(max(0, raw_chars - len(text)) // CHARS_PER_TOKEN, tool=tool_name)
+    return text
+
+
+VENDOR = keep("name", "address", "city", "zip_code", "phone", "email", "website")
+SPORT = keep("id", "name", "sport_name")
+
+TOOL_PROJECTIONS: dict[str, ToolProjection] = {
+    # Accueil : seul le nom de l'école sert à personnaliser le salut
+    "welcome.get_vendor_info": ToolProjection(
+        keep("success", "vendor_name", "message", vendor_info=keep("name", "city"))
+    ),
+    "information_desk.get_vendor_info": ToolProjection(
+        keep("success", "message", vendor=VENDOR)
+    ),
+    # `sport_names` doublait les noms déjà présents dans `sports`
+    "information_desk.get_vendor_sports": ToolProjection(
+        keep(
+            "success",
+            "count",
+            "message",
+            sports=Projection(fields=SPORT.fields, max_items=30),
+        ),
+        list_keys=("sports",),
+    ),
+}
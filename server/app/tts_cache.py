@@ -0,0 +1,299 @@
+"""
+Cache de l'audio TTS des segments déjà synthétisés, clé (texte, modèle, voix, réglages)
+Seuls les segments des phrases fixes des agents et de `TTS_CACHE_PHRASES` sont gardés :
+sur disque, pré-rendus au démarrage, et en mémoire, dans une limite d'octets et de durée,
+quand le disque est désactivé ou pas encore écrit. Les segments dynamiques (noms, numéros,
+emails dictés) ne sont jamais mis en cache. Les fichiers sont lus par mmap : les workers
+d'une machine partagent les mêmes pages du cache système au lieu d'en garder chacun une copie
+"""
+
+import asyncio
+import hashlib
+import json
+import mmap
+import os
+import re
+import threading
+import time
+from collections.abc import AsyncIterator, Iterable
+from dataclasses import dataclass
+from logging import getLogger
+from pathlib import Path
+
+from agents.voice import TTSModel, TTSModelSettings
+
+from .cache import AsyncTTLCache
+from .metrics import tts_first_chunk_seconds
+from .tts_segmentation import TextSegmenter
+
+logger = getLogger(__name__)
+
+# Taille des morceaux rendus depuis le cache, comme le flux du modèle TTS OpenAI
+CHUNK_BYTES = 1024
+
+# Messages que les agents disent mot pour mot (instructions des agents), en début de
+# message : ils sont découpés en segments comme à la lecture puis pré-rendus
+PHRASES = (
+    "Parfait ! Je vais maintenant m'occuper de votre authentification. Pour commencer, "
+    "quel est votre numéro de téléphone ?",
+    "Quel est votre numéro de téléphone ?",
+    "Excellent ! Votre authentification est confirmée. Je vous transfère maintenant vers "
+    "notre Agent de Consultation Produits ResaSki.",
+    "Parfait ! Je vous transfère vers notre service d'identification.",
+    "Je vous transfère vers notre service d'information.",
+    "Parfait ! Je vous transfère maintenant vers notre agent de réservation pour commencer "
+    "votre authentification.",
+    "Parfait ! Maintenant que vous êtes identifié, voyons ensemble quelles activités vous "
+    "intéressent.",
+    "Un instant, je vérifie ces informations pour vous...",
+    "Souhaitez-vous que nous commencions ?",
+)
+
+_WORDS = re.compile(r"\S+\s*")
+
+
+@dataclass
+class TTSCacheSettings:
+    """Réglages du cache audio
+
+    - `memory_entries` / `memory_mb` : segments et octets d'audio gardés en mémoire, par processus
+    - `memory_ttl` : durée de vie d'un segment en mémoire, en secondes
+    - `directory` : dossier du cache disque, vide pour le désactiver
+    - `disk_mb` : taille maximale du dossier, les fichiers les moins récemment lus sont supprimés
+    - `phrases_file` : fichier de phrases supplémentaires à pré-rendre, une par ligne
+    """
+
+    memory_entries: int = 256
+    memory_mb: int = 16
+    memory_ttl: float = 3600.0
+    directory: str = ".tts_cache"
+    disk_mb: int = 512
+    phrases_file: str = ""
+
+    @classmethod
+    def from_env(cls) -> "TTSCacheSettings":
+        return cls(
+            memory_entries=int(os.getenv("TTS_CACHE_MEMORY_ENTRIES", cls.memory_entries)),
+            memory_mb=int(os.getenv("TTS_CACHE_MEMORY_MB", cls.memory_mb)),
+            memory_ttl=float(os.getenv("TTS_CACHE_MEMORY_TTL", cls.memory_ttl)),
+            directory=os.getenv("TTS_CACHE_DIR", cls.directory),
+            disk_mb=int(os.getenv("TTS_CACHE_DISK_MB", cls.disk_mb)),
+            phrases_file=os.getenv("TTS_CACHE_PHRASES", cls.phrases_file),
+        )
+
+
+def cache_key(text: str, model_name: str, settings: TTSModelSettings) -> str:
+    # transform_data, buffer_size et text_splitter ne changent pas l'audio synthétisé
+    fields = [
+        " ".join(text.split()),
+        model_name,
+        settings.voice,
+        settings.instructions,
+        settings.speed,
+    ]
+    return hashlib.sha256(json.dumps(fields, ensure_ascii=False).encode()).hexdigest()
+
+
+class AudioStore:
+    """Audio PCM16 des phrases configurées par clé, sur disque ou en mémoire"""
+
+    def __init__(self, settings: TTSCacheSettings | None = None):
+        self.settings = settings or TTSCacheSettings.from_env()
+        self.memory: AsyncTTLCache[bytes] = AsyncTTLCache(
+            ttl=self.settings.memory_ttl,
+            maxsize=self.settings.memory_entries,
+            maxweight=self.settings.memory_mb * 1024 * 1024,
+            weigh=len,
+        )
+        self._static: frozenset[str] | None = None
+        self.directory = Path(self.settings.directory) if self.settings.directory else None
+        self._disk_bytes: int | None = None
+        self._disk_lock = threading.Lock()
+        self._writes: dict[str, asyncio.Task] = {}
+
+    def _path(self, key: str) -> Path:
+        assert self.directory is not None
+        return self.directory / key[:2] / f"{key}.pcm"
+
+    def get(self, key: str) -> tuple[bytes | mmap.mmap, str] | None:
+        """Retourne l'audio et son niveau ("memory" ou "disk") ; un mmap est à fermer"""
+        audio = self.memory.get(key)
+        if audio is not None:
+            return audio, "memory"
+        if self.directory is None:
+            return None
+        path = self._path(key)
+        try:
+            with path.open("rb") as file:
+                audio = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            # La date de modification sert d'ordre LRU pour l'éviction
+            os.utime(path)
+        except (FileNotFoundError, ValueError):
+            return None
+        return audio, "disk"
+
+    def is_static(self, text: str) -> bool:
+        """Le segment fait partie d'une phrase configurée, sans donnée du client"""
+        if self._static is None:
+            self._static = frozenset(
+                " ".join(segment.split())
+                for phrase in configured_phrases(self.settings)
+                for segment in phrase_segments(phrase)
+            )
+        return " ".join(text.split()) in self._static
+
+    def put(self, key: str, audio: bytes, persist: bool = False) -> None:
+        """Réservé aux segments des phrases configurées, écrits sur disque avec `persist`"""
+        if not audio:
+            return
+        if persist and self.directory is not None:
+            self._persist(key, audio)
+        else:
+            self.memory.set(key, audio)
+
+    def _persist(self, key: str, audio: bytes) -> None:
+        if self.directory is None or key in self._writes:
+            return
+        task = asyncio.ensure_future(asyncio.to_thread(self._write, key, audio))
+        self._writes[key] = task
+        task.add_done_callback(lambda task: self._write_done(key, task))
+
+    def _write_done(self, key: str, task: asyncio.Task) -> None:
+        self._writes.pop(key, None)
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            logger.warning("Écriture du cache TTS échouée : %s", task.exception())
+            return
+        # Sur disque, le segment ne reste pas aussi en mémoire dans chaque worker
+        self.memory.invalidate(key)
+
+    def _write(self, key: str, audio: bytes) -> None:
+        path = self._path(key)
+        if path.exists():
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Écriture atomique : un autre worker peut lire le même fichier
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_bytes(audio)
+        os.replace(tmp, path)
+        with self._disk_lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(f.stat().st_size for f in self.directory.glob("*/*.pcm"))
+            else:
+                self._disk_bytes += len(audio)
+            if self._disk_bytes > self.settings.disk_mb * 1024 * 1024:
+                self._evict()
+
+    def _evict(self) -> None:
+        files = sorted(
+            ((f.stat(), f) for f in self.directory.glob("*/*.pcm")),
+            key=lambda entry: entry[0].st_mtime,
+        )
+        total = sum(stat.st_size for stat, _ in files)
+        # Redescend à 90 % de la limite pour ne pas évincer à chaque écriture
+        limit = self.settings.disk_mb * 1024 * 1024 * 0.9
+        for stat, file in files:
+            if total <= limit:
+                break
+            # Un worker qui lit encore le fichier garde son mmap valide
+            file.unlink(missing_ok=True)
+            total -= stat.st_size
+        self._disk_bytes = total
+
+    async def flush(self) -> None:
+        """Attend la fin des écritures sur disque en cours"""
+        if self._writes:
+            await asyncio.gather(*self._writes.values(), return_exceptions=True)
+
+
+class CachedTTSModel(TTSModel):
+    """Modèle TTS servi depuis le cache quand le segment a déjà été synthétisé"""
+
+    def __init__(self, model: TTSModel, store: AudioStore):
+        self.model = model
+        self.store = store
+
+    @property
+    def model_name(self) -> str:
+        return self.model.model_name
+
+    async def run(self, text: str, settings: TTSModelSettings) -> AsyncIterator[bytes]:
+        async for chunk in self._run(text, settings, persist=False):
+            yield chunk
+
+    async def _run(
+        self, text: str, settings: TTSModelSettings, persist: bool
+    ) -> AsyncIterator[bytes]:
+        start = time.perf_counter()
+        key = cache_key(text, self.model_name, settings)
+        cached = self.store.get(key)
+        if cached is not None:
+            audio, source = cached
+            tts_first_chunk_seconds.observe(time.perf_counter() - start, source=source)
+            try:
+                for offset in range(0, len(audio), CHUNK_BYTES):
+                    yield audio[offset : offset + CHUNK_BYTES]
+            finally:
+                if isinstance(audio, mmap.mmap):
+                    audio.close()
+            return
+
+        # Un segment dynamique peut contenir des données du client : jamais gardé
+        keep = persist or self.store.is_static(text)
+        chunks: list[bytes] = []
+        first = True
+        async for chunk in self.model.run(text, settings):
+            if first:
+                tts_first_chunk_seconds.observe(time.perf_counter() - start, source="model")
+                first = False
+            if keep:
+                chunks.append(chunk)
+            yield chunk
+        # Seul un segment synthétisé jusqu'au bout est gardé (pas un tour interrompu)
+        if keep:
+            self.store.put(key, b"".join(chunks), persist=persist)
+
+    async def prerender(self, text: str, settings: TTSModelSettings) -> bool:
+        """Synthétise un segment et l'écrit sur disque s'il n'est pas déjà en cache"""
+        key = cache_key(text, self.model_name, settings)
+        cached = self.store.get(key)
+        if cached is not None:
+            audio, source = cached
+            if isinstance(audio, mmap.mmap):
+                audio.close()
+            elif source == "memory":
+                # Déjà synthétisé pendant une session : la phrase passe sur disque
+                self.store.put(key, audio, persist=True)
+            return False
+        async for _ in self._run(text, settings, persist=True):
+            pass
+        return True
+
+
+def phrase_segments(phrase: str) -> list[str]:
+    """Segments d'un message tels que Workflow.run les envoie au TTS, mot à mot"""
+    segmenter = TextSegmenter()
+    segments = []
+    for word in _WORDS.findall(phrase):
+        segments.extend(segmenter.feed(word))
+    segments.extend(segmenter.flush())
+    return segments
+
+
+def configured_phrases(settings: TTSCacheSettings) -> list[str]:
+    phrases = list(PHRASES)
+    if settings.phrases_file:
+        lines = Path(settings.phrases_file).read_text(encoding="utf-8").splitlines()
+        phrases.extend(line.strip() for line in lines if line.strip())
+    return phrases
+
+
+async def prerender(
+    model: CachedTTSModel, settings: TTSModelSettings, phrases: Iterable[str]
+) -> int:
+    """Pré-rend les segments des phrases ; retourne le nombre de segments synthétisés"""
+    segments = list(dict.fromkeys(s for phrase in phrases for s in phrase_segments(phrase)))
+    rendered = await asyncio.gather(*(model.prerender(s, settings) for s in segments))
+    await model.store.flush()
+    return sum(rendered)
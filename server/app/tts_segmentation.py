@@ -0,0 +1,185 @@
+"""
+Découpage du texte streamé par le LLM en segments envoyés au TTS
+`Workflow.run` rend des segments prêts à être lus plutôt que les deltas bruts ; le SDK,
+réglé avec `pass_through_splitter`, lance la synthèse de chaque segment dès qu'il arrive,
+en parallèle des suivants, et restitue l'audio dans l'ordre. Le premier segment d'un tour
+est coupé court, à la première fin de proposition, pour réduire le temps jusqu'au premier
+octet audio ; les suivants sont des phrases complètes regroupées
+"""
+
+import os
+import re
+from dataclasses import dataclass
+
+# Le SDK n'envoie pas au TTS un segment plus court avant la fin du tour
+SDK_MIN_SEGMENT_CHARS = 20
+
+# Collé au dernier segment du tour par Workflow.run, ou seul quand le tour n'a plus de
+# texte : le SDK ne signale la fin du tour (turn_ended) que s'il lui reste du texte à
+# synthétiser quand le workflow se termine
+TURN_END = "\x03"
+
+# Abréviations suivies d'un point qui ne terminent pas la phrase : les titres précèdent
+# toujours un nom, les autres finissent la phrase quand une majuscule suit ("etc. Quel…")
+TITLES = frozenset({"m", "mm", "mme", "mmes", "mlle", "dr", "pr", "st", "ste"})
+ABBREVIATIONS = frozenset(
+    {"av", "bd", "cf", "env", "ex", "etc", "tél", "tel", "n", "no", "p", "pp", "réf", "min"}
+)
+
+# Ponctuation finale, guillemets ou parenthèses fermants, puis un blanc (espaces insécables
+# de la typographie française compris) ; ou un retour à la ligne (listes, titres)
+SENTENCE_END = re.compile(r"[.!?…]+[»\"')\]]*[\s  ]+|\n+")
+CLAUSE_END = re.compile(r"[,;:][\s  ]+|\s[–—-]\s+")
+LAST_WORD = re.compile(r"([^\W\d_]+)\.$")
+
+# Mise en forme markdown que le TTS lirait telle quelle
+MARKDOWN = re.compile(r"\*\*|__|`|^\s*#+\s*|^\s*[-*•]\s+|^\s*\d+\.\s+", re.MULTILINE)
+
+
+@dataclass
+class SegmentationSettings:
+    """Longueurs des segments, en caractères
+
+    - `first_min_chars` / `first_max_chars` : premier segment du tour, coupé à la première
+      fin de phrase ou de proposition après le minimum, ou sur un espace après le maximum
+    - `min_chars` / `max_chars` : segments suivants, faits de phrases entières ; une phrase
+      plus longue que le maximum est coupée à une fin de proposition
+    """
+
+    first_min_chars: int = 20
+    first_max_chars: int = 80
+    min_chars: int = 80
+    max_chars: int = 300
+
+    @classmethod
+    def from_env(cls) -> "SegmentationSettings":
+        return cls(
+            first_min_chars=max(
+                SDK_MIN_SEGMENT_CHARS,
+                int(os.getenv("TTS_FIRST_SEGMENT_MIN_CHARS", cls.first_min_chars)),
+            ),
+            first_max_chars=int(os.getenv("TTS_FIRST_SEGMENT_MAX_CHARS", cls.first_max_chars)),
+            min_chars=int(os.getenv("TTS_SEGMENT_MIN_CHARS", cls.min_chars)),
+            max_chars=int(os.getenv("TTS_SEGMENT_MAX_CHARS", cls.max_chars)),
+        )
+
+
+def speakable(text: str) -> str:
+    """Retire la mise en forme markdown ; chaque ligne d'une liste devient une phrase"""
+    lines = [line.strip() for line in MARKDOWN.sub("", text).splitlines()]
+    lines = [line for line in lines if line]
+    return " ".join(
+        line if i == len(lines) - 1 or line[-1] in ".!?…:;," else line + "."
+        for i, line in enumerate(lines)
+    )
+
+
+def pass_through_splitter(text_buffer: str) -> tuple[str, str]:
+    """`text_splitter` du SDK : les segments arrivent déjà découpés par `TextSegmenter`"""
+    if text_buffer.endswith(TURN_END):
+        # Dernier segment : gardé, le SDK le synthétise avec la fin du tour
+        return "", text_buffer[: -len(TURN_END)]
+    if len(text_buffer) < SDK_MIN_SEGMENT_CHARS:
+        return "", text_buffer
+    return text_buffer, ""
+
+
+def _is_abbreviation(text: str, end: int, next_char: str) -> bool:
+    match = LAST_WORD.search(text, 0, end)
+    if match is None:
+        return False
+    word = match.group(1)
+    # Initiale d'un prénom ("J. Dupont") ou titre ("M. Martin")
+    if (len(word) == 1 and word.isupper()) or word.lower() in TITLES:
+        return True
+    return word.lower() in ABBREVIATIONS and not next_char.isupper()
+
+
+def sentence_boundaries(text: str) -> list[int]:
+    """Positions où commence la phrase suivante"""
+    boundaries = []
+    for match in SENTENCE_END.finditer(text):
+        punctuation_end = match.start() + len(match.group().rstrip())
+        next_char = text[match.end() : match.end() + 1]
+        if text[match.start()] == "." and _is_abbreviation(text, punctuation_end, next_char):
+            continue
+        boundaries.append(match.end())
+    return boundaries
+
+
+def clause_boundaries(text: str) -> list[int]:
+    return [match.end() for match in CLAUSE_END.finditer(text)]
+
+
+def _last_space(text: str, start: int, end: int) -> int:
+    # Coupe après le dernier espace, ou au milieu d'un mot s'il n'y en a aucun
+    space = text.rfind(" ", start, end)
+    return space + 1 if space >= 0 else end
+
+
+class TextSegmenter:
+    """Découpe les deltas d'un tour ; `reset` au début de chaque tour rend le premier segment court"""
+
+    def __init__(self, settings: SegmentationSettings | None = None):
+        self.settings = settings or SegmentationSettings.from_env()
+        self._first = True
+        self._buffer = ""
+
+    def reset(self) -> None:
+        self._first = True
+        self._buffer = ""
+
+    def _cut(self, buffer: str, after: int = 0) -> int | None:
+        """Position de fin du prochain segment, au-delà de `after`"""
+        settings = self.settings
+        sentences = [b for b in sentence_boundaries(buffer) if b > after]
+        clauses = [b for b in clause_boundaries(buffer) if b > after]
+        if self._first:
+            # Au plus tôt : première fin de phrase ou de proposition après le minimum
+            cut = next((b for b in sorted(sentences + clauses) if b >= settings.first_min_chars), None)
+            limit = max(settings.first_max_chars, after + settings.first_min_chars)
+            if cut is None and len(buffer) > limit:
+                cut = _last_space(buffer, after + 1, limit)
+            return cut
+        # Ensuite : le plus de phrases entières possible, sans dépasser le maximum
+        limit = max(settings.max_chars, after + settings.min_chars)
+        fitting = [b for b in sentences if b <= limit]
+        if fitting and fitting[-1] >= settings.min_chars:
+            return fitting[-1]
+        if len(buffer) <= limit:
+            return None
+        if fitting:
+            return fitting[-1]
+        # Phrase plus longue que le maximum : dernière fin de proposition, sinon dernier espace
+        clauses = [b for b in clauses if b <= limit]
+        return clauses[-1] if clauses else _last_space(buffer, after + 1, limit)
+
+    def feed(self, delta: str) -> list[str]:
+        """Ajoute un delta du LLM et retourne les segments terminés"""
+        self._buffer += delta
+        segments = []
+        after = 0
+        # Coupé seulement devant du texte : il reste toujours un segment pour la fin du tour
+        while (cut := self._cut(self._buffer.rstrip(), after)) is not None:
+            segment = speakable(self._buffer[:cut])
+            if len(segment) < SDK_MIN_SEGMENT_CHARS:
+                # Trop court une fois nettoyé (titre markdown…) : coupure suivante
+                after = cut
+                continue
+            segments.append(segment)
+            self._buffer = self._buffer[cut:]
+            self._first = False
+            after = 0
+        return segments
+
+    def flush(self) -> list[str]:
+        """Fin du tour ou handoff : le texte restant, quelle que soit sa longueur
+
+        Un segment plus court que `SDK_MIN_SEGMENT_CHARS` est gardé par le SDK et collé au
+        suivant : il finit par une espace pour que les deux ne se touchent pas
+        """
+        segment = speakable(self._buffer)
+        self._buffer = ""
+        if segment and len(segment) < SDK_MIN_SEGMENT_CHARS:
+            segment += " "
+        return [segment] if segment else []
@@ -1,5 +1,9 @@
+import asyncio
 import base64
 import json
+import struct
+import zlib
+from logging import getLogger
 
 import numpy as np
 from agents import (
@@ -7,11 +11,19 @@ from agents import (
     RunItemStreamEvent,
     RawResponsesStreamEvent,
     AgentUpdatedStreamEvent,
+    RunResultStreaming,
 )
-from agents.voice import AudioInput, VoiceStreamEvent, VoiceStreamEventAudio
-from fastapi import WebSocket
+from agents.voice import AudioInput, StreamedAudioResult, VoiceStreamEvent, VoiceStreamEventAudio
+from fastapi import WebSocket, WebSocketDisconnect
 from openai.types.responses import ResponseTextDeltaEvent
 
+from .outbound import OutboundSender, SenderSettings
+from .session_store import SessionState, SessionStore
+from .spoken_text import SpokenText
+from .tts_segmentation import speakable
+
+logger = getLogger(__name__)
+
 
 def transform_data_to_events(audio_np: np.ndarray) -> dict:
     return {
@@ -25,16 +37,139 @@ def transform_data_to_events(audio_np: np.ndarray) -> dict:
     }
 
 
+HISTORY_PROTOCOLS = ("full", "delta")
+
+AUDIO_FORMATS = ("json", "binary")
+
+# Binary audio frames: 1 byte message type, 4 bytes little-endian sequence number, raw PCM16
+AUDIO_FRAME_HEADER = struct.Struct("<BI")
+AUDIO_FRAME_TYPES = {1: "input_audio_buffer.append", 2: "response.audio.delta"}
+AUDIO_FRAME_CODES = {name: code for code, name in AUDIO_FRAME_TYPES.items()}
+
+
+def pack_audio_frame(message_type: str, seq: int, audio_np: np.ndarray) -> bytes:
+    header = AUDIO_FRAME_HEADER.pack(AUDIO_FRAME_CODES[message_type], seq & 0xFFFFFFFF)
+    return header + audio_np.astype(np.int16, copy=False).tobytes()
+
+
+class InvalidMessageError(ValueError):
+    """A client message that cannot be decoded; the session goes on without it."""
+
+
+def unpack_audio_frame(frame: bytes) -> dict:
+    if len(frame) < AUDIO_FRAME_HEADER.size:
+        raise InvalidMessageError(f"Audio frame of {len(frame)} bytes has no complete header")
+    code, seq = AUDIO_FRAME_HEADER.unpack_from(frame)
+    if code not in AUDIO_FRAME_TYPES:
+        raise InvalidMessageError(f"Unknown audio frame type {code}")
+    if (len(frame) - AUDIO_FRAME_HEADER.size) % 2:
+        raise InvalidMessageError("Audio frame payload is not whole PCM16 samples")
+    return {
+        "type": AUDIO_FRAME_TYPES.get(code, "unknown"),
+        "seq": seq,
+        "pcm16": np.frombuffer(frame, dtype=np.int16, offset=AUDIO_FRAME_HEADER.size),
+    }
+
+
+def history_checksum(history: list) -> str:
+    # crc32 of the compact, key-sorted JSON encoding of the history
+    encoded = json.dumps(
+        history, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    ).encode("utf-8")
+    return f"{zlib.crc32(encoded):08x}"
+
+
+async def receive_message(websocket: WebSocket) -> dict:
+    # Control messages are JSON text frames, audio may come as binary frames
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+    if message.get("bytes") is not None:
+        return unpack_audio_frame(message["bytes"])
+    try:
+        data = json.loads(message["text"])
+    except json.JSONDecodeError as e:
+        raise InvalidMessageError(f"Invalid JSON message: {e}") from e
+    if not isinstance(data, dict) or not isinstance(data.get("type"), str):
+        raise InvalidMessageError("Messages must be JSON objects with a type")
+    validate_message(data)
+    return data
+
+
+def validate_message(data: dict):
+    # Checks the fields the handlers read, so a malformed message cannot crash the session
+    if data["type"] == "input_audio_buffer.append":
+        try:
+            audio = base64.b64decode(data.get("delta"), validate=True)
+        except (TypeError, ValueError) as e:
+            raise InvalidMessageError("Audio delta must be a base64 string") from e
+        if len(audio) % 2:
+            raise InvalidMessageError("Audio delta is not whole PCM16 samples")
+    elif data["type"] == "history.update":
+        inputs = data.get("inputs")
+        if not isinstance(inputs, list) or not all(isinstance(item, dict) for item in inputs):
+            raise InvalidMessageError("History inputs must be a list of objects")
+
+
 def is_new_output_item(event):
     return isinstance(event, RunItemStreamEvent)
 
 
+def is_agent_updated(event):
+    return isinstance(event, AgentUpdatedStreamEvent)
+
+
 def is_text_output(event):
     return event.type == "raw_response_event" and isinstance(
         event.data, ResponseTextDeltaEvent
     )
 
 
+async def cancel_run(result: RunResultStreaming):
+    """Cancels the background tasks of a streamed run and waits until they stopped.
+
+    openai-agents 0.0.7 has no `RunResultStreaming.cancel`: the run task (model stream
+    and tool calls) and the guardrail tasks are cancelled directly.
+    """
+    tasks = [
+        task
+        for task in (
+            result._run_impl_task,
+            result._input_guardrails_task,
+            result._output_guardrails_task,
+        )
+        if task is not None and not task.done()
+    ]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def cancel_audio_output(output: StreamedAudioResult):
+    """Cancels the text generation, TTS and dispatch tasks of a voice result and waits
+    until they stopped.
+
+    `StreamedAudioResult.stream` cancels them without waiting when it ends, and not at
+    all when its consumer is cancelled before reading it.
+    """
+    tasks = [
+        task
+        for task in (output.text_generation_task, output._dispatcher_task, *output._tasks)
+        if task is not None and not task.done()
+    ]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def message_text(item: dict) -> str:
+    # Output items carry a list of content parts, client messages a plain string
+    content = item.get("content")
+    if isinstance(content, str):
+        return content
+    return "".join(part.get("text", "") for part in content or [] if isinstance(part, dict))
+
+
 def is_sync_message(data):
     return data["type"] == "history.update" and (
         not data["inputs"] or data["inputs"][-1].get("role") != "user"
@@ -48,10 +183,18 @@ def is_new_text_message(data):
 
 
 def process_inputs(data, connection) -> str:
-    connection.history = data["inputs"][:-1]
+    connection.replace_history(data["inputs"][:-1])
     return data["inputs"][-1]["content"]
 
 
+def is_resync_request(data):
+    return data["type"] == "history.resync"
+
+
+def is_cancel_request(data):
+    return data["type"] == "response.cancel"
+
+
 def is_new_audio_chunk(data):
     return data["type"] == "input_audio_buffer.append"
 
@@ -61,22 +204,179 @@ def is_audio_complete(data):
 
 
 def extract_audio_chunk(data):
-    decoded_bytes = base64.b64decode(data["delta"])
-    audio_int16 = np.frombuffer(decoded_bytes, dtype=np.int16)
+    audio_int16 = extract_pcm16_chunk(data)
     audio_data = audio_int16.astype(np.float32) / 32768.0
     return audio_data
 
 
+def extract_pcm16_chunk(data):
+    # The transcription session sends PCM16 as is, so streamed chunks skip the float conversion
+    if "pcm16" in data:
+        return data["pcm16"]
+    return np.frombuffer(base64.b64decode(data["delta"]), dtype=np.int16)
+
+
 def concat_audio_chunks(chunks) -> AudioInput:
     return AudioInput(np.concatenate(chunks))
 
 
 class WebsocketHelper:
-    def __init__(self, websocket: WebSocket, history: list, initial_agent: Agent):
+    """Keeps the conversation state of one websocket and mirrors it to the client.
+
+    With the "full" protocol every update resends the whole history. With the
+    "delta" protocol only append-only changes are sent:
+
+    - `history.item.added`: one new history item and its index
+    - `history.text.delta`: new assistant tokens for a partial item id
+    - `history.commit`: end of turn with history length and checksum
+    - `history.snapshot`: the full history, every `snapshot_interval` turns
+      or when the client sends `history.resync`
+
+    Every delta message carries an increasing `seq` so clients can detect gaps.
+
+    With the "binary" audio format, audio goes out as binary frames (see
+    `pack_audio_frame`) instead of base64 inside JSON.
+
+    Everything is sent by one `OutboundSender` task per connection: JSON messages
+    go first, TTS audio is coalesced into fixed-length frames and paced to the
+    client's playback (see `app/outbound.py`).
+
+    When a response is interrupted, `response.cancelled` tells the client to stop
+    playback and the history keeps what the caller got of it: the text generated so
+    far for a text response, only the text whose audio was played for a voice
+    response (see `app/spoken_text.py`).
+
+    With a session `store`, every new history item is appended to the store as it
+    is added, and a history replaced by the client is rewritten in full.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        history: list,
+        initial_agent: Agent,
+        protocol: str = "full",
+        snapshot_interval: int = 10,
+        audio_format: str = "json",
+        store: SessionStore | None = None,
+        session_id: str | None = None,
+        sender_settings: SenderSettings | None = None,
+    ):
         self.websocket = websocket
+        self.sender = OutboundSender(websocket, self._encode_audio, sender_settings)
         self.history = history or []
         self.latest_agent = initial_agent
         self.partial_response = ""
+        self.protocol = protocol if protocol in HISTORY_PROTOCOLS else "full"
+        self.snapshot_interval = snapshot_interval
+        self._seq = 0
+        self._turns = 0
+        self._partial_id = 0
+        self.audio_format = audio_format if audio_format in AUDIO_FORMATS else "json"
+        self._audio_seq = 0
+        self.store = store
+        self.session_id = session_id
+        self._persisted = 0
+        self._turn_input_length = 0
+        self._history_replaced = bool(self.history)
+        self.spoken = SpokenText()
+        # Last interrupted voice turn, cut to the heard text: (start in history, kept items)
+        self._heard_cut: tuple[int, list] | None = None
+
+    def replace_history(self, history: list):
+        # Clients resend the whole history with every message, usually unchanged
+        history = self._keep_heard_cut(history)
+        if history != self.history:
+            self._history_replaced = True
+        self.history = history
+
+    def restore(self, state: SessionState, agent: Agent):
+        """Resumes a stored session, which is already up to date in the store."""
+        self.history = state.history
+        self.latest_agent = agent
+        self._persisted = len(self.history)
+        self._history_replaced = False
+
+    async def persist(self):
+        if self.store is None or self.session_id is None:
+            return
+        agent_name = self.latest_agent.name if self.latest_agent else None
+        try:
+            if self._history_replaced or self._persisted > len(self.history):
+                await self.store.replace(self.session_id, self.history, agent_name)
+            else:
+                await self.store.append(
+                    self.session_id, self.history[self._persisted :], agent_name
+                )
+        except Exception:
+            logger.exception("Could not persist session %s", self.session_id)
+            return
+        self._persisted = len(self.history)
+        self._history_replaced = False
+
+    @property
+    def is_delta(self) -> bool:
+        return self.protocol == "delta"
+
+    async def _send(self, payload: dict):
+        if self.is_delta:
+            self._seq += 1
+            payload["seq"] = self._seq
+        self.sender.send_json(payload)
+
+    async def _send_history(self, reason: str | None, inputs: list, **extra):
+        payload = {"type": "history.updated", "inputs": inputs}
+        if reason:
+            payload["reason"] = reason
+        payload.update(extra)
+        payload["agent_name"] = self.latest_agent.name
+        await self._send(payload)
+
+    async def _send_item_added(self, reason: str):
+        await self._send(
+            {
+                "type": "history.item.added",
+                "reason": reason,
+                "index": len(self.history) - 1,
+                "item": self.history[-1],
+                "agent_name": self.latest_agent.name,
+            }
+        )
+
+    async def send_snapshot(self, reason: str = "snapshot"):
+        await self._send(
+            {
+                "type": "history.snapshot",
+                "reason": reason,
+                "inputs": self.history,
+                "length": len(self.history),
+                "checksum": history_checksum(self.history),
+                "agent_name": self.latest_agent.name,
+            }
+        )
+
+    async def send_resumed(self):
+        # A reconnecting client gets the stored history instead of re-uploading it
+        if self.is_delta:
+            await self.send_snapshot("session.resumed")
+        else:
+            await self._send_history("session.resumed", self.history)
+
+    def _keep_heard_cut(self, history: list) -> list:
+        """A client that syncs before it got the cut history still holds the full
+        interrupted response; the server keeps the heard text over the client's copy."""
+        if self._heard_cut is None:
+            return history
+        start, kept = self._heard_cut
+        if len(history) < start or history[:start] != self.history[:start]:
+            # The client rewrote the conversation itself (reset, edit): its copy wins
+            return history
+        return history[:start] + kept
+
+    def start_response(self, voiced: bool):
+        self._heard_cut = None
+        self.spoken.reset(voiced)
+        self.sender.start_response()
 
     async def show_user_input(self, user_input: str):
         self.history.append(
@@ -86,39 +386,44 @@ class WebsocketHelper:
                 "content": user_input,
             }
         )
-        await self.websocket.send_text(
-            json.dumps(
-                {
-                    "type": "history.updated",
-                    "reason": "user.input",
-                    "inputs": self.history,
-                    "agent_name": self.latest_agent.name,
-                }
-            )
-        )
+        self._turn_input_length = len(self.history)
+        await self.persist()
+        if self.is_delta:
+            await self._send_item_added("user.input")
+        else:
+            await self._send_history("user.input", self.history)
         return (self.history, self.latest_agent)
 
     async def stream_response(self, new_tokens: str, is_text: bool = False):
         if is_text:
             return
 
-        self.partial_response += new_tokens
-        await self.websocket.send_text(
-            json.dumps(
+        if self.is_delta:
+            if not self.partial_response:
+                self._partial_id += 1
+            self.partial_response += new_tokens
+            await self._send(
                 {
-                    "type": "history.updated",
-                    "reason": "response.text.delta",
-                    "inputs": self.history
-                    + [
-                        {
-                            "type": "message",
-                            "role": "assistant",
-                            "content": self.partial_response,
-                        }
-                    ],
+                    "type": "history.text.delta",
+                    "item_id": f"partial-{self._partial_id}",
+                    "index": len(self.history),
+                    "delta": new_tokens,
                     "agent_name": self.latest_agent.name,
                 }
             )
+            return
+
+        self.partial_response += new_tokens
+        await self._send_history(
+            "response.text.delta",
+            self.history
+            + [
+                {
+                    "type": "message",
+                    "role": "assistant",
+                    "content": self.partial_response,
+                }
+            ],
         )
 
     async def handle_new_item(
@@ -126,53 +431,127 @@ class WebsocketHelper:
         event: RawResponsesStreamEvent | RunItemStreamEvent | AgentUpdatedStreamEvent,
     ):
         if is_new_output_item(event):
-            self.history.append(event.item.to_input_item())  # type: ignore
-
-            await self.websocket.send_text(
-                json.dumps(
-                    {
-                        "type": "history.updated",
-                        "reason": "response.input_item",
-                        "inputs": self.history,
-                        "agent_name": self.latest_agent.name,
-                    }
-                )
-            )
+            item = event.item.to_input_item()  # type: ignore
+            self.history.append(item)
+            await self.persist()
+            # The finished item replaces the partial one the client was building
+            self.partial_response = ""
+            if self.is_delta:
+                await self._send_item_added("response.input_item")
+            else:
+                await self._send_history("response.input_item", self.history)
         elif is_text_output(event):
             await self.stream_response(event.data.delta)  # type: ignore
 
     async def text_output_complete(self, output, is_done=False):
         if not is_done:
-            await self.websocket.send_text(
-                json.dumps(
-                    {
-                        "type": "history.updated",
-                        "inputs": self.history,
-                        "sync": True,
-                        "agent_name": self.latest_agent.name,
-                    }
-                )
-            )
+            if self.is_delta:
+                await self.send_snapshot("sync")
+            else:
+                await self._send_history(None, self.history, sync=True)
         else:
             self.partial_response = ""
             self.latest_agent = output.last_agent
-            self.history = output.to_input_list()
-            await self.websocket.send_text(
-                json.dumps(
+            # The model may have seen a compacted input, the history keeps every item
+            self.history = self.history[: self._turn_input_length] + [
+                item.to_input_item() for item in output.new_items
+            ]
+            await self.persist()
+            if not self.is_delta:
+                await self._send_history("response.done", self.history)
+                return
+
+            self._turns += 1
+            if self._turns % self.snapshot_interval == 0:
+                await self.send_snapshot("response.done")
+            else:
+                await self._send(
                     {
-                        "type": "history.updated",
-                        "inputs": self.history,
+                        "type": "history.commit",
                         "reason": "response.done",
+                        "length": len(self.history),
+                        "checksum": history_checksum(self.history),
                         "agent_name": self.latest_agent.name,
                     }
                 )
+
+    async def response_interrupted(self):
+        """Keeps what the caller got of a cancelled response and tells the client to stop playback."""
+        played = self.sender.played_samples()
+        # Audio still queued belongs to the interrupted response
+        self.sender.clear_audio()
+        if self.spoken.voiced:
+            # The history may lose text the client already shows, so it is resent in full
+            if self._keep_heard_text(self.spoken.heard(played)):
+                await self.persist()
+                if self.is_delta:
+                    await self.send_snapshot("response.interrupted")
+                else:
+                    await self._send_history("response.interrupted", self.history)
+        elif self.partial_response:
+            self.history.append(
+                {
+                    "type": "message",
+                    "role": "assistant",
+                    "content": self.partial_response,
+                }
             )
+            await self.persist()
+            if self.is_delta:
+                await self._send_item_added("response.interrupted")
+            else:
+                await self._send_history("response.interrupted", self.history)
+        self.partial_response = ""
+        await self._send({"type": "response.cancelled"})
+
+    def _keep_heard_text(self, heard: str) -> bool:
+        """Cuts the assistant messages of the current turn down to the `heard` text."""
+        turn = self.history[self._turn_input_length :]
+        items = turn
+        if self.partial_response:
+            items = turn + [
+                {"type": "message", "role": "assistant", "content": self.partial_response}
+            ]
+        kept = []
+        position = 0
+        for item in items:
+            if item.get("type", "message") != "message" or item.get("role") != "assistant":
+                # Tool calls and handoffs did happen, heard or not
+                kept.append(item)
+                continue
+            text = speakable(message_text(item))
+            rest = heard[position:].strip()
+            if position + len(text) <= len(heard):
+                kept.append(item)
+            elif rest:
+                kept.append({"type": "message", "role": "assistant", "content": rest})
+            position = min(len(heard), position + len(text) + 1)
+        if kept == turn:
+            return False
+        self.history = self.history[: self._turn_input_length] + kept
+        self._history_replaced = True
+        self._heard_cut = (self._turn_input_length, kept)
+        return True
+
+    def _encode_audio(self, frame: np.ndarray) -> str | bytes:
+        if self.audio_format == "binary":
+            self._audio_seq += 1
+            return pack_audio_frame("response.audio.delta", self._audio_seq, frame)
+        return json.dumps(transform_data_to_events(frame))
 
     async def send_audio_chunk(self, event: VoiceStreamEvent):
-        if isinstance(event, VoiceStreamEventAudio):
-            await self.websocket.send_text(
-                json.dumps(transform_data_to_events(event.data))  # type: ignore
-            )
+        if not isinstance(event, VoiceStreamEventAudio):
+            return
+        await self.sender.send_audio(event.data)  # type: ignore
+
+    async def send_error(self, message: str):
+        await self._send({"type": "error", "message": message})
 
     async def send_audio_done(self):
-        await self.websocket.send_text(json.dumps({"type": "audio.done"}))
+        await self.sender.end_audio({"type": "audio.done"})
+
+    async def drain(self):
+        await self.sender.drain()
+
+    async def close(self):
+        await self.sender.close()
@@ -0,0 +1,50 @@
+"""
+Données de référence du vendor (informations de l'école, catalogue des sports)
+Partagées par tous les agents et toutes les sessions via un cache TTL
+"""
+
+import os
+
+from .api_client import api_get
+from .cache import AsyncTTLCache
+
+_vendor_cache: AsyncTTLCache | None = None
+
+
+def vendor_cache() -> AsyncTTLCache:
+    # Créé à la première utilisation, après le chargement du .env par server.py
+    global _vendor_cache
+    if _vendor_cache is None:
+        _vendor_cache = AsyncTTLCache(
+            ttl=float(os.getenv("RESASKI_VENDOR_CACHE_TTL", "300")),
+            stale_ttl=float(os.getenv("RESASKI_VENDOR_CACHE_STALE", "3600")),
+            maxsize=int(os.getenv("RESASKI_VENDOR_CACHE_SIZE", "64")),
+        )
+    return _vendor_cache
+
+
+def default_vendor_id() -> int:
+    return int(os.getenv("NEXT_PUBLIC_VENDOR_ID", "4"))
+
+
+async def _load_json(path: str, params: dict | None = None):
+    response = await api_get(path, params=params)
+    # Les erreurs HTTP lèvent httpx.HTTPStatusError et ne sont jamais mises en cache
+    response.raise_for_status()
+    return response.json()
+
+
+async def get_vendor(vendor_id: int | None = None) -> dict:
+    """Informations de l'école (nom, adresse, contact...)"""
+    vendor_id = vendor_id or default_vendor_id()
+    return await vendor_cache().get_or_load(
+        ("vendor", vendor_id), lambda: _load_json(f"/vendors/{vendor_id}")
+    )
+
+
+async def get_vendor_sports(vendor_id: int | None = None) -> list:
+    """Catalogue des sports proposés par l'école"""
+    vendor_id = vendor_id or default_vendor_id()
+    return await vendor_cache().get_or_load(
+        ("sports", vendor_id), lambda: _load_json("/sports", {"vendor_id": vendor_id})
+    )
@@ -0,0 +1,208 @@
+"""
+Pipeline voix par session websocket
+Un seul client OpenAI et un seul fournisseur de modèles STT/TTS par processus, créés et
+fermés par le lifespan FastAPI de server.py ; chaque session garde son VoicePipeline
+d'un tour à l'autre et ne change que les réglages du tour. Le modèle TTS est servi depuis
+le cache audio du processus (app/tts_cache.py)
+"""
+
+import asyncio
+import os
+from dataclasses import replace
+from logging import getLogger
+from typing import Any
+
+from agents.voice import (
+    AudioInput,
+    OpenAIVoiceModelProvider,
+    STTModelSettings,
+    StreamedAudioInput,
+    StreamedAudioResult,
+    StreamedTranscriptionSession,
+    TTSModel,
+    TTSModelSettings,
+    VoiceModelProvider,
+    VoicePipeline,
+    VoicePipelineConfig,
+    VoiceWorkflowBase,
+)
+from openai import AsyncOpenAI
+
+from .metrics import TurnTimer
+from .spoken_text import SpokenText, SpokenTTSModel
+from .tts_cache import AudioStore, CachedTTSModel
+from .tts_segmentation import pass_through_splitter
+
+logger = getLogger(__name__)
+
+_client: AsyncOpenAI | None = None
+_provider: VoiceModelProvider | None = None
+# Fournisseur imposé à la place d'OpenAI (modèles locaux des benchmarks)
+_override: VoiceModelProvider | None = None
+_tts_model: CachedTTSModel | None = None
+# Survit au redémarrage du client : l'audio en cache ne dépend pas de la connexion
+_audio_store: AudioStore | None = None
+
+
+async def startup() -> VoiceModelProvider:
+    """Crée le client et le fournisseur partagés (appelé depuis le lifespan FastAPI)"""
+    await shutdown()
+    return get_model_provider()
+
+
+async def shutdown() -> None:
+    """Ferme le client partagé et ses connexions keep-alive"""
+    global _client, _provider, _tts_model
+    if _audio_store is not None:
+        await _audio_store.flush()
+    if _client is not None:
+        await _client.close()
+    _client = None
+    _provider = None
+    _tts_model = None
+
+
+def use_model_provider(provider: VoiceModelProvider | None) -> None:
+    """Remplace les modèles STT/TTS d'OpenAI pour tout le processus, None pour les rétablir"""
+    global _override, _provider, _tts_model
+    _override = _provider = provider
+    _tts_model = None
+
+
+def get_model_provider() -> VoiceModelProvider:
+    """Retourne le fournisseur partagé, créé à la première utilisation hors lifespan"""
+    global _client, _provider
+    if _provider is None and _override is not None:
+        _provider = _override
+    elif _provider is None:
+        _client = AsyncOpenAI()
+        _provider = OpenAIVoiceModelProvider(openai_client=_client)
+    return _provider
+
+
+def get_tts_model() -> CachedTTSModel:
+    """Retourne le modèle TTS partagé, derrière le cache audio"""
+    global _tts_model, _audio_store
+    if _tts_model is None:
+        if _audio_store is None:
+            _audio_store = AudioStore()
+        _tts_model = CachedTTSModel(get_model_provider().get_tts_model(None), _audio_store)
+    return _tts_model
+
+
+def session_tts_model(spoken: SpokenText | None = None) -> TTSModel:
+    """Modèle TTS partagé, qui note en plus les segments de la session dans `spoken`"""
+    if spoken is None:
+        return get_tts_model()
+    return SpokenTTSModel(get_tts_model(), spoken)
+
+
+def tts_buffer_size() -> int:
+    # Taille des morceaux lus sur le flux TTS ; les trames envoyées au client sont
+    # regroupées à part par app/outbound.py (AUDIO_FRAME_MS)
+    return int(os.getenv("TTS_BUFFER_SIZE", "512"))
+
+
+def default_tts_settings(**overrides: Any) -> TTSModelSettings:
+    # Le texte arrive déjà découpé en segments par Workflow.run (app/tts_segmentation.py)
+    return TTSModelSettings(
+        buffer_size=tts_buffer_size(), text_splitter=pass_through_splitter, **overrides
+    )
+
+
+class SessionPipeline:
+    """VoicePipeline créé une fois par websocket
+
+    Les modèles STT/TTS sont résolus à la création et réutilisés à chaque tour. `run`
+    accepte des réglages TTS propres au tour ; la préparation du tour, la transcription et le
+    premier octet audio sont marqués sur le `TurnTimer` du tour et gardés dans `timings`.
+    Avec `spoken`, chaque segment synthétisé y est noté (texte entendu à l'interruption).
+    En entrée streamée, `transcribe_stream` ouvre la session de transcription et chaque tour
+    transcrit passe par `run_transcript`, un tour à part entière qui peut être interrompu
+    """
+
+    def __init__(
+        self,
+        workflow: VoiceWorkflowBase,
+        stt_settings: STTModelSettings | None = None,
+        tts_settings: TTSModelSettings | None = None,
+        spoken: SpokenText | None = None,
+    ):
+        provider = get_model_provider()
+        self.tts_settings = tts_settings or default_tts_settings()
+        self.config = VoicePipelineConfig(
+            model_provider=provider,
+            stt_settings=stt_settings or STTModelSettings(),
+            tts_settings=self.tts_settings,
+        )
+        self.workflow = workflow
+        self.stt_model = provider.get_stt_model(None)
+        self.tts_model = session_tts_model(spoken)
+        self.pipeline = VoicePipeline(
+            workflow=workflow,
+            stt_model=self.stt_model,
+            tts_model=self.tts_model,
+            config=self.config,
+        )
+        self.timings: dict[str, float] = {}
+        self.turn: TurnTimer | None = None
+        self._first_byte_pending = False
+
+    def _transform_data(self, data):
+        if self._first_byte_pending:
+            self._first_byte_pending = False
+            if self.turn is not None:
+                self.timings["first_byte"] = self.turn.mark("tts_first_byte")
+        return data
+
+    def _start_turn(self, turn: TurnTimer, tts_overrides: dict[str, Any]) -> None:
+        self.turn = turn
+        self.timings = {}
+        self.config.tts_settings = replace(
+            self.tts_settings, transform_data=self._transform_data, **tts_overrides
+        )
+        self._first_byte_pending = True
+        self.timings["setup"] = self.turn.mark("pipeline_ready")
+
+    async def run(
+        self, audio_input: AudioInput, turn: TurnTimer | None = None, **tts_overrides: Any
+    ) -> StreamedAudioResult:
+        self._start_turn(turn or TurnTimer("audio"), tts_overrides)
+        output = await self.pipeline.run(audio_input)
+        # Pour un énoncé complet, pipeline.run attend la transcription
+        self.timings["transcription"] = self.turn.mark("stt_done") - self.timings["setup"]
+        return output
+
+    async def transcribe_stream(
+        self, audio_input: StreamedAudioInput
+    ) -> StreamedTranscriptionSession:
+        """Session de transcription de l'entrée streamée ; la VAD des réglages STT découpe
+        les tours"""
+        return await self.stt_model.create_session(
+            audio_input,
+            self.config.stt_settings,
+            self.config.trace_include_sensitive_data,
+            self.config.trace_include_sensitive_audio_data,
+        )
+
+    async def run_transcript(
+        self, text: str, turn: TurnTimer | None = None, **tts_overrides: Any
+    ) -> StreamedAudioResult:
+        """Tour dont la transcription est déjà faite (entrée streamée) : même déroulé que le
+        tour simple du SDK, le workflow puis le TTS, jusqu'à `session_ended`"""
+        self._start_turn(turn or TurnTimer("stream"), tts_overrides)
+        output = StreamedAudioResult(self.tts_model, self.config.tts_settings, self.config)
+
+        async def stream_events():
+            try:
+                async for text_event in self.workflow.run(text):
+                    await output._add_text(text_event)
+                await output._turn_done()
+                await output._done()
+            except Exception as e:
+                logger.error("Erreur du tour transcrit : %s", e)
+                await output._add_error(e)
+                raise
+
+        output._set_task(asyncio.create_task(stream_events()))
+        return output
@@ -0,0 +1,104 @@
+"""
+Préchauffage du serveur au démarrage
+Construit le graphe d'agents, les tables de normalisation des numéros, précharge les données
+du vendor et pré-rend l'audio des phrases fixes des agents, pour que le premier appelant après
+un déploiement ne paie aucun démarrage à froid
+"""
+
+import asyncio
+import time
+from logging import DEBUG, getLogger
+
+from agents import Agent
+
+from . import phone_normalization, tts_cache, vendor_data, voice_pipeline
+
+logger = getLogger(__name__)
+
+class Readiness:
+    """État de préparation du processus, exposé par /ready"""
+
+    def __init__(self):
+        self.ready = False
+        self.timings: dict[str, float] = {}
+        self.errors: dict[str, str] = {}
+
+    def as_dict(self) -> dict:
+        return {
+            "status": "ready" if self.ready else "warming_up",
+            "timings_ms": {step: round(ms, 1) for step, ms in self.timings.items()},
+            "errors": self.errors,
+        }
+
+
+readiness = Readiness()
+
+
+def collect_agents(starting_agent: Agent) -> list[Agent]:
+    """Parcourt le graphe des handoffs depuis l'agent de départ"""
+    seen: dict[str, Agent] = {}
+    pending = [starting_agent]
+    while pending:
+        agent = pending.pop()
+        if agent.name in seen:
+            continue
+        seen[agent.name] = agent
+        pending.extend(h for h in agent.handoffs if isinstance(h, Agent))
+    return list(seen.values())
+
+
+async def build_agent_graph(starting_agent: Agent) -> None:
+    for agent in collect_agents(starting_agent):
+        await agent.get_all_tools()
+        if agent.handoffs and logger.isEnabledFor(DEBUG):
+            logger.debug("Handoffs %s → %s", agent.name, [handoff.name for handoff in agent.handoffs])
+
+
+def load_phone_metadata() -> None:
+    # Charge les métadonnées de toutes les régions et construit les tables des indicatifs
+    phone_normalization.calling_codes()
+
+
+async def prefetch_vendor_data() -> None:
+    await asyncio.gather(vendor_data.get_vendor(), vendor_data.get_vendor_sports())
+
+
+async def prerender_phrases() -> None:
+    model = voice_pipeline.get_tts_model()
+    phrases = tts_cache.configured_phrases(model.store.settings)
+    rendered = await tts_cache.prerender(model, voice_pipeline.default_tts_settings(), phrases)
+    logger.info("Phrases fixes : %d segments synthétisés", rendered)
+
+
+async def _step(name: str, coro, required: bool = True) -> None:
+    start = time.perf_counter()
+    try:
+        await coro
+    except Exception as e:
+        if required:
+            raise
+        # Le backend peut être indisponible au démarrage : le cache se remplira au premier appel
+        readiness.errors[name] = str(e)
+        logger.warning("Préchauffage '%s' échoué : %s", name, e)
+    finally:
+        readiness.timings[name] = (time.perf_counter() - start) * 1000
+
+
+async def warm_up(starting_agent: Agent) -> Readiness:
+    """Exécute toutes les étapes puis marque le processus comme prêt"""
+    try:
+        await _step("agent_graph", build_agent_graph(starting_agent))
+        await _step("phone_metadata", asyncio.to_thread(load_phone_metadata))
+    except Exception as e:
+        # Le processus reste « non prêt » : le load balancer ne lui enverra pas d'appels
+        readiness.errors["warmup"] = str(e)
+        logger.exception("Préchauffage impossible")
+        return readiness
+    await asyncio.gather(
+        _step("vendor_data", prefetch_vendor_data(), required=False),
+        # Sans le cache disque déjà rempli, chaque phrase coûte un appel TTS
+        _step("tts_phrases", prerender_phrases(), required=False),
+    )
+    readiness.ready = True
+    logger.info("Serveur prêt : %s", readiness.timings)
+    return readiness
@@ -5,56 +5,41 @@ Gère l'accueil initial et oriente vers l'authentification
 
 import json
 import os
+from logging import getLogger
 from agents import Agent, function_tool
 from datetime import datetime
 from agents.extensions.handoff_prompt import RECOMMENDED_PROMPT_PREFIX
+from .logs import log_payload
+from .tool_concurrency import PARALLEL_TOOL_CALLS, session_limited
+from .tool_projection import project_tool_result
+from .vendor_data import get_vendor
+
+logger = getLogger(__name__)
 
 STYLE_INSTRUCTIONS = "Professionnel mais chaleureux et accueillant. Parler clairement et à un rythme modéré. Être patient et rassurer sur la simplicité du processus."
 
 @function_tool
-def get_vendor_info():
+@session_limited
+async def get_vendor_info():
     """Récupère les informations de base du vendeur (nom de l'école) pour personnaliser l'accueil"""
-    import requests
-    
     try:
-        base_url = os.getenv("NEXT_PUBLIC_API_BASE_URL")
         vendor_id = int(os.getenv("NEXT_PUBLIC_VENDOR_ID", "4"))
         
-        print(f'🔍 DEBUG - get_vendor_info called')
-        print(f'📥 Input vendor_id: {vendor_id}')
-        print(f'🏫 Fetching vendor info for ID: {vendor_id}')
-        
-        full_url = f"{base_url}/vendors/{vendor_id}"
-        print(f'🌐 Full URL: {full_url}')
-        
-        response = requests.get(
-            full_url,
-            headers={
-                'Accept': 'application/json',
-                'Content-Type': 'application/json',
-                'ngrok-skip-browser-warning': 'true'
-            },
-            timeout=30
-        )
+        logger.debug("get_vendor_info vendor_id=%s", vendor_id)
         
-        print(f'📡 Response status: {response.status_code}')
-        
-        if response.status_code != 200:
-            raise Exception(f"HTTP error! status: {response.status_code}")
-        
-        result = response.json()
-        print(f'📄 API response: {json.dumps(result, indent=2)}')
+        # Servi depuis le cache partagé, rechargé au plus une fois par TTL
+        result = await get_vendor(vendor_id)
+        log_payload(logger, "Réponse vendor", result)
         
         if result and result.get('name'):
-            print('✅ Vendor info retrieved successfully')
-            return json.dumps({
+            return project_tool_result("welcome.get_vendor_info", {
                 "success": True,
                 "vendor_name": result['name'],
                 "vendor_info": result,
                 "message": f"Informations récupérées pour l'école : {result['name']}"
             })
         else:
-            print('❌ No vendor name found in response')
+            logger.warning("Aucun nom d'école dans la réponse vendor %s", vendor_id)
             return json.dumps({
                 "success": False,
                 "vendor_name": "notre école",
@@ -62,7 +47,7 @@ def get_vendor_info():
             })
             
     except Exception as e:
-        print(f'💥 Error in get_vendor_info: {e}')
+        logger.warning("Erreur dans get_vendor_info : %s", e)
         return json.dumps({
             "success": False,
             "vendor_name": "notre école",
@@ -115,6 +100,7 @@ def transfer_to_information_desk_agent():
 welcome_agent = Agent(
     name="Agent d'Accueil ResaSki",
     model="gpt-4o-mini",
+    model_settings=PARALLEL_TOOL_CALLS,
     instructions=f"""
 # Identité et Mission
 Vous êtes l'agent d'accueil virtuel de notre école de ski/centre d'activités ResaSki. Vous représentez le premier contact avec nos clients.
@@ -125,12 +111,12 @@ Vous êtes l'agent d'accueil virtuel de notre école de ski/centre d'activités
 # COMPORTEMENT AU LANCEMENT - PROCÉDURE STRICTE :
 
 ## 1. RÉCUPÉRATION IMMÉDIATE DES INFOS
-- **APPELER IMMÉDIATEMENT** `get_vendor_info()` dès le début de la conversation
+- **APPELER IMMÉDIATEMENT** `get_vendor_info()` et `get_current_time()` ensemble, dans la même réponse, dès le début de la conversation
 - Récupérer le nom de l'école pour personnaliser l'accueil
 
 ## 2. ACCUEIL PERSONNALISÉ
-Une fois le nom de l'école obtenu :
-- Utiliser `get_current_time()` pour adapter le salut (Bonjour/Bonsoir)
+Une fois le nom de l'école et l'heure obtenus :
+- Adapter le salut à l'heure (Bonjour/Bonsoir)
 - Dire : "[Bonjour/Bonsoir] et bienvenue dans l'école [nom de l'école] ! Je suis l'assistant de réservation automatique."
 
 ## 3. PRÉSENTATION DU PROCESSUS DE RÉSERVATION
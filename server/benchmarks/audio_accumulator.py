@@ -0,0 +1,75 @@
+"""
+Benchmark de l'accumulation audio en mode "commit" : temps et pic mémoire selon la durée
+de l'énoncé, liste de morceaux float32 + np.concatenate contre AudioAccumulator
+
+Usage (depuis server/) : python -m benchmarks.audio_accumulator --lengths 1 5 15 30 60
+"""
+
+import argparse
+import base64
+import time
+import tracemalloc
+
+import numpy as np
+
+from app.audio_buffer import SAMPLE_RATE, AudioAccumulator
+from app.utils import concat_audio_chunks, extract_audio_chunk
+
+
+def messages(seconds: float, chunk_ms: int) -> list[dict]:
+    rng = np.random.default_rng(0)
+    size = SAMPLE_RATE * chunk_ms // 1000
+    return [
+        {
+            "type": "input_audio_buffer.append",
+            "delta": base64.b64encode(
+                rng.integers(-8000, 8000, size, dtype=np.int16).tobytes()
+            ).decode("utf-8"),
+        }
+        for _ in range(int(seconds * 1000 / chunk_ms))
+    ]
+
+
+def list_concat(chunks: list[dict]):
+    audio_buffer = []
+    for message in chunks:
+        audio_buffer.append(extract_audio_chunk(message))
+    return concat_audio_chunks(audio_buffer)
+
+
+def accumulator(chunks: list[dict], audio_buffer: AudioAccumulator):
+    for message in chunks:
+        audio_buffer.add_chunk(message)
+    return audio_buffer.to_audio_input()
+
+
+def measure(run) -> tuple[float, int]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main(args):
+    # Comme dans une session : l'accumulateur est réutilisé d'un tour à l'autre
+    audio_buffer = AudioAccumulator(max_seconds=max(args.lengths))
+    print(f"{'durée':>6} | {'liste ms':>9} | {'liste Mo':>9} | {'accu ms':>8} | {'accu Mo':>8}")
+    for seconds in args.lengths:
+        chunks = messages(seconds, args.chunk_ms)
+        accumulator(chunks, audio_buffer)  # premier tour : le tampon atteint sa taille
+        list_time, list_peak = measure(lambda: list_concat(chunks))
+        accu_time, accu_peak = measure(lambda: accumulator(chunks, audio_buffer))
+        print(
+            f"{seconds:>5.0f}s | {list_time * 1000:>9.2f} | {list_peak / 1e6:>9.2f} | "
+            f"{accu_time * 1000:>8.2f} | {accu_peak / 1e6:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lengths", type=float, nargs="+", default=[1, 5, 15, 30, 60])
+    parser.add_argument("--chunk-ms", type=int, default=100)
+    main(parser.parse_args())
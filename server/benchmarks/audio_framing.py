@@ -0,0 +1,146 @@
+"""
+Benchmark du transport audio : CPU serveur et octets envoyés par seconde d'audio, en mode
+"json" (PCM16 en base64 dans du JSON) et "binary" (trames PCM16 brutes avec en-tête), puis
+pour la sortie, un message par morceau TTS contre les trames regroupées par OutboundSender
+
+Usage (depuis server/) : python -m benchmarks.audio_framing --seconds 60 --tts-samples 512
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import time
+
+import numpy as np
+
+from app.outbound import OutboundSender, SenderSettings
+from app.utils import (
+    extract_audio_chunk,
+    pack_audio_frame,
+    transform_data_to_events,
+    unpack_audio_frame,
+)
+
+SAMPLE_RATE = 24000
+
+
+def audio_chunks(seconds: float, chunk_ms: int) -> list[np.ndarray]:
+    rng = np.random.default_rng(0)
+    size = SAMPLE_RATE * chunk_ms // 1000
+    count = int(seconds * 1000 / chunk_ms)
+    return [rng.integers(-8000, 8000, size, dtype=np.int16) for _ in range(count)]
+
+
+def client_frames(mode: str, chunks: list[np.ndarray]) -> list[str | bytes]:
+    # Ce que le client envoie : encodé hors mesure, seul le décodage serveur compte
+    if mode == "binary":
+        return [pack_audio_frame("input_audio_buffer.append", i, c) for i, c in enumerate(chunks)]
+    return [
+        json.dumps(
+            {
+                "type": "input_audio_buffer.append",
+                "delta": base64.b64encode(c.tobytes()).decode("utf-8"),
+            }
+        )
+        for c in chunks
+    ]
+
+
+def inbound(mode: str, frames: list[str | bytes]) -> float:
+    start = time.process_time()
+    for frame in frames:
+        message = unpack_audio_frame(frame) if mode == "binary" else json.loads(frame)  # type: ignore
+        extract_audio_chunk(message)
+    return time.process_time() - start
+
+
+def outbound(mode: str, chunks: list[np.ndarray]) -> tuple[float, int]:
+    sent = 0
+    start = time.process_time()
+    for seq, chunk in enumerate(chunks):
+        if mode == "binary":
+            sent += len(pack_audio_frame("response.audio.delta", seq, chunk))
+        else:
+            sent += len(json.dumps(transform_data_to_events(chunk)).encode("utf-8"))
+    return time.process_time() - start, sent
+
+
+class CountingWebsocket:
+    def __init__(self):
+        self.messages = 0
+        self.bytes_sent = 0
+
+    async def send_text(self, data: str):
+        self.messages += 1
+        self.bytes_sent += len(data.encode("utf-8"))
+
+    async def send_bytes(self, data: bytes):
+        self.messages += 1
+        self.bytes_sent += len(data)
+
+
+async def outbound_coalesced(
+    mode: str, chunks: list[np.ndarray], frame_ms: int
+) -> tuple[float, int, int]:
+    websocket = CountingWebsocket()
+
+    def encode(frame: np.ndarray) -> str | bytes:
+        if mode == "binary":
+            return pack_audio_frame("response.audio.delta", 0, frame)
+        return json.dumps(transform_data_to_events(frame))
+
+    # Sans rythme de lecture : seul le coût de l'envoi est mesuré
+    settings = SenderSettings(frame_ms=frame_ms, max_lead_ms=0)
+    sender = OutboundSender(websocket, encode, settings)  # type: ignore
+    start = time.process_time()
+    for chunk in chunks:
+        await sender.send_audio(chunk)
+    await sender.end_audio()
+    await sender.drain()
+    cpu = time.process_time() - start
+    await sender.close()
+    return cpu, websocket.bytes_sent, websocket.messages
+
+
+def main(args):
+    chunks = audio_chunks(args.seconds, args.chunk_ms)
+    print(f"{args.seconds:.0f}s d'audio PCM16 {SAMPLE_RATE} Hz, morceaux de {args.chunk_ms} ms")
+    print(f"{'mode':>7} | {'entrée µs/s':>12} | {'sortie µs/s':>12} | {'octets/s':>10}")
+    for mode in ("json", "binary"):
+        frames = client_frames(mode, chunks)
+        in_cpu = inbound(mode, frames)
+        out_cpu, sent = outbound(mode, chunks)
+        print(
+            f"{mode:>7} | {in_cpu / args.seconds * 1e6:>12.0f} | "
+            f"{out_cpu / args.seconds * 1e6:>12.0f} | {sent / args.seconds:>10.0f}"
+        )
+
+    # Sortie TTS : morceaux de --tts-samples échantillons, comme TTSModelSettings.buffer_size
+    tts_chunks = [
+        piece
+        for chunk in audio_chunks(args.seconds, 1000)
+        for piece in np.array_split(chunk, max(1, len(chunk) // args.tts_samples))
+    ]
+    print(f"\nsortie TTS, morceaux de {args.tts_samples} échantillons")
+    print(f"{'mode':>7} | {'trame':>8} | {'sortie µs/s':>12} | {'messages/s':>10} | {'octets/s':>10}")
+    for mode in ("json", "binary"):
+        cpu, sent = outbound(mode, tts_chunks)
+        print(
+            f"{mode:>7} | {'morceau':>8} | {cpu / args.seconds * 1e6:>12.0f} | "
+            f"{len(tts_chunks) / args.seconds:>10.1f} | {sent / args.seconds:>10.0f}"
+        )
+        cpu, sent, messages = asyncio.run(outbound_coalesced(mode, tts_chunks, args.frame_ms))
+        print(
+            f"{mode:>7} | {args.frame_ms:>6}ms | {cpu / args.seconds * 1e6:>12.0f} | "
+            f"{messages / args.seconds:>10.1f} | {sent / args.seconds:>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=60.0)
+    parser.add_argument("--chunk-ms", type=int, default=100)
+    parser.add_argument("--tts-samples", type=int, default=512)
+    parser.add_argument("--frame-ms", type=int, default=100)
+    main(parser.parse_args())
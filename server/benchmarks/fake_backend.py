@@ -0,0 +1,244 @@
+"""
+Faux backend ResaSki local pour les benchmarks
+Expose les routes utilisées par les outils avec des données reproductibles, une latence et
+un taux d'erreur configurables. Les clients synthétiques sont calculés à partir de leur
+numéro (aucun stockage) : la base peut compter des millions de clients ; un client sur
+vingt partage le numéro du précédent (comptes d'une même famille)
+
+Usage (depuis server/) : python -m benchmarks.fake_backend --port 8001 --customers 1000000
+puis NEXT_PUBLIC_API_BASE_URL=http://127.0.0.1:8001 pour y brancher le serveur
+"""
+
+import argparse
+import asyncio
+import random
+import socket
+import threading
+import time
+from dataclasses import dataclass
+
+import uvicorn
+from fastapi import FastAPI, Query, Request
+from fastapi.responses import JSONResponse
+
+VENDOR = {
+    "id": 4,
+    "name": "ESI De Métabief",
+    "address": "9 Place Xavier Authier",
+    "city": "Métabief",
+    "zip_code": "25370",
+    "phone": "+33381492511",
+    "email": "metabief@ecoledeski.fr",
+}
+
+SPORTS = [
+    {"id": i, "name": name, "vendor_id": 4}
+    for i, name in enumerate(
+        ["Ski Alpin", "Snowboard", "Ski Nordique", "Raquettes", "Biathlon", "Télémark"],
+        start=1,
+    )
+]
+
+CUSTOMER = {
+    "id": 42,
+    "first_name": "Camille",
+    "last_name": "MARTIN",
+    "email": "camille.martin@example.com",
+    "phone": "+33612345678",
+}
+
+FIRST_NAMES = (
+    "Camille", "Louis", "Emma", "Hugo", "Chloe", "Jules", "Lea", "Arthur", "Manon", "Lucas",
+    "Ines", "Gabriel", "Sarah", "Nathan", "Jade", "Paul", "Alice", "Tom", "Lina", "Noah",
+)
+LAST_NAMES = (
+    "Martin", "Bernard", "Dubois", "Thomas", "Robert", "Richard", "Petit", "Durand",
+    "Leroy", "Moreau", "Simon", "Laurent", "Lefebvre", "Michel", "Garcia", "David",
+    "Bertrand", "Roux", "Vincent", "Fournier", "Morel", "Girard", "Andre", "Mercier",
+)
+
+# Mobiles français valides +33 7 30 00 00 00 à +33 7 99 99 99 99 : le numéro donne l'indice
+PHONE_PREFIX = "+337"
+PHONE_BASE = 30_000_000
+FAMILY_SIZE = 20
+SYNTHETIC_ID_OFFSET = 100_000
+
+
+@dataclass
+class FakeBackendSettings:
+    """Réglages du faux backend
+
+    - `latency` : latence fixe de chaque réponse, en secondes
+    - `jitter` : latence supplémentaire moyenne, tirée selon une loi exponentielle (traîne)
+    - `error_rate` : part des requêtes qui échouent avec `error_status`
+    - `customers` : nombre de clients synthétiques
+    - `seed` : graine des noms des clients et des tirages de latence et d'erreurs
+    """
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = 503
+    customers: int = 10_000
+    seed: int = 0
+
+
+class CustomerBase:
+    """Clients synthétiques, plus le client de référence et ceux créés par POST /customers/"""
+
+    def __init__(self, size: int, seed: int = 0):
+        self.size = size
+        names = random.Random(seed)
+        self.first_names = names.sample(FIRST_NAMES, len(FIRST_NAMES))
+        self.last_names = names.sample(LAST_NAMES, len(LAST_NAMES))
+        self._next_id = SYNTHETIC_ID_OFFSET + size
+        self._phones: dict[str, list[dict]] = {}
+        self._emails: dict[str, dict] = {}
+        self._add(CUSTOMER)
+
+    def _add(self, customer: dict) -> None:
+        self._phones.setdefault(customer["phone"], []).append(customer)
+        self._emails[customer["email"]] = customer
+
+    @staticmethod
+    def phone(index: int) -> str:
+        # Le second client d'une famille partage le numéro du premier
+        if index % FAMILY_SIZE == 1:
+            index -= 1
+        return f"{PHONE_PREFIX}{PHONE_BASE + index}"
+
+    def customer(self, index: int) -> dict:
+        first_name = self.first_names[index % len(self.first_names)]
+        last_name = self.last_names[(index // len(self.first_names)) % len(self.last_names)]
+        return {
+            "id": SYNTHETIC_ID_OFFSET + index,
+            "first_name": first_name,
+            "last_name": last_name.upper(),
+            "email": f"{first_name}.{last_name}.{index}@example.com".lower(),
+            "phone": self.phone(index),
+        }
+
+    def by_phone(self, phone: str) -> list[dict]:
+        found = list(self._phones.get(phone, ()))
+        if phone.startswith(PHONE_PREFIX) and phone[len(PHONE_PREFIX) :].isdigit():
+            index = int(phone[len(PHONE_PREFIX) :]) - PHONE_BASE
+            if 0 <= index < self.size and index % FAMILY_SIZE != 1:
+                found.append(self.customer(index))
+                if index + 1 < self.size and (index + 1) % FAMILY_SIZE == 1:
+                    found.append(self.customer(index + 1))
+        return found
+
+    def by_email(self, email: str) -> dict | None:
+        if email in self._emails:
+            return self._emails[email]
+        local = email.partition("@")[0]
+        index = local.rpartition(".")[2]
+        if index.isdigit() and int(index) < self.size:
+            customer = self.customer(int(index))
+            if customer["email"] == email:
+                return customer
+        return None
+
+    def create(self, payload: dict) -> dict:
+        customer = {
+            **payload,
+            "id": self._next_id,
+            "phone": payload.get("phone_number", payload.get("phone")),
+        }
+        self._next_id += 1
+        self._add(customer)
+        return customer
+
+
+def create_app(settings: FakeBackendSettings | None = None) -> FastAPI:
+    settings = settings or FakeBackendSettings()
+    base = CustomerBase(settings.customers, settings.seed)
+    draws = random.Random(settings.seed)
+    app = FastAPI()
+    app.state.customers = base
+
+    @app.middleware("http")
+    async def inject_faults(request: Request, call_next):
+        delay = settings.latency
+        if settings.jitter:
+            delay += draws.expovariate(1 / settings.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        if settings.error_rate and draws.random() < settings.error_rate:
+            return JSONResponse({"detail": "Injected error"}, status_code=settings.error_status)
+        return await call_next(request)
+
+    @app.get("/vendors/{vendor_id}")
+    async def get_vendor(vendor_id: int):
+        return {**VENDOR, "id": vendor_id}
+
+    @app.get("/sports")
+    async def get_sports(vendor_id: int = Query(...)):
+        return SPORTS
+
+    @app.get("/customers/search-by-phone")
+    async def search_by_phone(vendor_id: int, phone: str):
+        customers = base.by_phone(phone)
+        if not customers:
+            return JSONResponse({"detail": "Not found"}, status_code=404)
+        return customers
+
+    @app.get("/customers/search-by-email")
+    async def search_by_email(vendor_id: int, email: str):
+        customer = base.by_email(email)
+        if customer is None:
+            return JSONResponse({"detail": "Not found"}, status_code=404)
+        return customer
+
+    @app.post("/customers/")
+    async def create_customer(payload: dict):
+        return {"customer": base.create(payload)}
+
+    return app
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_in_thread(settings: FakeBackendSettings | None = None) -> str:
+    """Démarre le faux backend dans un thread dédié et retourne son URL de base"""
+    port = _free_port()
+    config = uvicorn.Config(create_app(settings), host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}"
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Options du faux backend, partagées avec les benchmarks qui le démarrent"""
+    parser.add_argument("--latency", type=float, default=0.0, help="latence backend en secondes")
+    parser.add_argument("--jitter", type=float, default=0.0, help="latence de traîne moyenne")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--customers", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def settings_from_args(args) -> FakeBackendSettings:
+    return FakeBackendSettings(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        customers=args.customers,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    add_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_app(settings_from_args(args)), host=args.host, port=args.port)
@@ -0,0 +1,393 @@
+"""
+Modèles STT, TTS et LLM locaux et déterministes pour les benchmarks de bout en bout
+Ils remplacent les appels OpenAI avec des délais réglables, pour mesurer le seul travail du
+serveur : même énoncé, même transcription ; même transcription, même réponse
+
+- STT : une transcription choisie d'après la durée de l'énoncé ; en streaming
+  (`/ws?input=stream`), un tour se termine après le silence de la VAD
+- LLM : au premier message, appelle les outils de l'agent sans argument obligatoire (comme
+  `get_vendor_info` de l'accueil), puis stream une réponse type mot à mot
+- TTS : du PCM16 dont la durée suit la longueur du texte, produit plus vite que le temps réel
+"""
+
+import asyncio
+import json
+import os
+import re
+import time
+import zlib
+from collections.abc import AsyncIterator, Callable
+from dataclasses import dataclass
+
+import numpy as np
+from agents import (
+    AgentOutputSchema,
+    FunctionTool,
+    Handoff,
+    Model,
+    ModelSettings,
+    ModelTracing,
+    Tool,
+    TResponseInputItem,
+)
+from agents.items import ModelResponse
+from agents.usage import Usage
+from agents.voice import (
+    AudioInput,
+    STTModel,
+    STTModelSettings,
+    StreamedAudioInput,
+    StreamedTranscriptionSession,
+    TTSModel,
+    TTSModelSettings,
+    VoiceModelProvider,
+)
+from openai.types.responses import (
+    Response,
+    ResponseCompletedEvent,
+    ResponseContentPartAddedEvent,
+    ResponseCreatedEvent,
+    ResponseFunctionToolCall,
+    ResponseOutputItemAddedEvent,
+    ResponseOutputItemDoneEvent,
+    ResponseOutputMessage,
+    ResponseOutputText,
+    ResponseStreamEvent,
+    ResponseTextDeltaEvent,
+    ResponseUsage,
+)
+from openai.types.responses.response_usage import InputTokensDetails, OutputTokensDetails
+
+from benchmarks.tts_segmentation import ANSWERS
+
+SAMPLE_RATE = 24000
+FAKE_RESPONSE_ID = "__fake_response__"
+
+TRANSCRIPTS = (
+    "Bonjour, je voudrais réserver un cours de ski pour samedi.",
+    "Quelles activités proposez-vous cette semaine ?",
+    "Mon numéro est le zéro six douze trente-quatre cinquante-six soixante-dix-huit.",
+    "Où se trouve votre école exactement ?",
+    "Oui, je souhaite commencer la réservation.",
+)
+
+_WORDS = re.compile(r"\S+\s*")
+
+
+@dataclass
+class FakeModelSettings:
+    """Délais des modèles locaux, lus dans l'environnement pour valoir dans chaque worker
+
+    - `stt_seconds` : durée d'une transcription
+    - `llm_first_token_seconds` / `llm_tokens_per_second` : premier token puis débit du LLM
+    - `tts_first_byte_seconds` : délai avant le premier octet audio d'un segment
+    - `tts_speed` : audio produit par seconde de calcul (10 : dix fois le temps réel)
+    - `speech_chars_per_second` : débit de parole, donne la durée de l'audio d'un texte
+    """
+
+    stt_seconds: float = 0.15
+    llm_first_token_seconds: float = 0.3
+    llm_tokens_per_second: float = 60.0
+    tts_first_byte_seconds: float = 0.2
+    tts_speed: float = 10.0
+    speech_chars_per_second: float = 15.0
+
+    @classmethod
+    def from_env(cls) -> "FakeModelSettings":
+        return cls(
+            **{
+                name: float(os.getenv(f"FAKE_{name.upper()}", default))
+                for name, default in cls().__dict__.items()
+            }
+        )
+
+    def to_env(self) -> dict[str, str]:
+        return {f"FAKE_{name.upper()}": str(value) for name, value in self.__dict__.items()}
+
+
+def _pick(options, text: str):
+    # crc32 plutôt que hash() : le même choix dans tous les processus
+    return options[zlib.crc32(text.encode()) % len(options)]
+
+
+def transcript_for(samples: int) -> str:
+    # Au dixième de seconde : un énoncé rejoué donne toujours la même transcription
+    return TRANSCRIPTS[samples * 10 // SAMPLE_RATE % len(TRANSCRIPTS)]
+
+
+class FakeStreamedSession(StreamedTranscriptionSession):
+    """Session de transcription streaming simulée
+
+    Chaque morceau coûte `stt_rate` secondes par seconde d'audio, transcrit pendant que
+    l'utilisateur parle encore ; après `silence_ms` de silence, le tour est finalisé en
+    `finalize` secondes et `transcript` donne son texte d'après le nombre d'échantillons parlés
+    """
+
+    def __init__(
+        self,
+        audio: StreamedAudioInput,
+        stt_rate: float,
+        finalize: float,
+        silence_ms: int,
+        transcript: Callable[[int], str] = transcript_for,
+    ):
+        self.audio = audio
+        self.stt_rate = stt_rate
+        self.finalize = finalize
+        self.silence_samples = max(1, SAMPLE_RATE * silence_ms // 1000)
+        self.transcript = transcript
+
+    async def transcribe_turns(self) -> AsyncIterator[str]:
+        spoken = silent = 0
+        while True:
+            chunk = await self.audio.queue.get()
+            if chunk is None:
+                return
+            await asyncio.sleep(self.stt_rate * len(chunk) / SAMPLE_RATE)
+            if chunk.any():
+                spoken, silent = spoken + len(chunk), 0
+                continue
+            silent += len(chunk)
+            if spoken and silent >= self.silence_samples:
+                await asyncio.sleep(self.finalize)
+                yield self.transcript(spoken)
+                spoken = 0
+
+    async def close(self) -> None:
+        pass
+
+
+class FakeSTTModel(STTModel):
+    def __init__(self, settings: FakeModelSettings):
+        self.settings = settings
+
+    @property
+    def model_name(self) -> str:
+        return "fake-stt"
+
+    async def transcribe(
+        self,
+        input: AudioInput,
+        settings: STTModelSettings,
+        trace_include_sensitive_data: bool,
+        trace_include_sensitive_audio_data: bool,
+    ) -> str:
+        await asyncio.sleep(self.settings.stt_seconds)
+        return transcript_for(len(input.buffer) * SAMPLE_RATE // input.frame_rate)
+
+    async def create_session(
+        self,
+        input: StreamedAudioInput,
+        settings: STTModelSettings,
+        trace_include_sensitive_data: bool,
+        trace_include_sensitive_audio_data: bool,
+    ) -> StreamedTranscriptionSession:
+        # Le silence de fin de tour est celui de la VAD demandée par le serveur
+        turn_detection = settings.turn_detection or {}
+        silence_ms = int(turn_detection.get("silence_duration_ms", 500))
+        return FakeStreamedSession(input, 0.0, self.settings.stt_seconds, silence_ms)
+
+
+class FakeTTSModel(TTSModel):
+    def __init__(self, settings: FakeModelSettings):
+        self.settings = settings
+
+    @property
+    def model_name(self) -> str:
+        return "fake-tts"
+
+    async def run(self, text: str, settings: TTSModelSettings) -> AsyncIterator[bytes]:
+        seconds = len(text) / self.settings.speech_chars_per_second
+        samples = int(seconds * SAMPLE_RATE)
+        # Un signal propre à chaque texte, pour que le cache audio ne confonde rien
+        tone = 200 + zlib.crc32(text.encode()) % 400
+        audio = (np.sin(np.arange(samples) * (2 * np.pi * tone / SAMPLE_RATE)) * 8000).astype(
+            np.int16
+        )
+        data = audio.tobytes()
+        await asyncio.sleep(self.settings.tts_first_byte_seconds)
+        chunk = 1024
+        # Octets produits par seconde de calcul, au rythme réglé
+        pace = chunk / (SAMPLE_RATE * 2 * self.settings.tts_speed)
+        for offset in range(0, len(data), chunk):
+            yield data[offset : offset + chunk]
+            await asyncio.sleep(pace)
+
+
+class FakeVoiceModelProvider(VoiceModelProvider):
+    def __init__(self, settings: FakeModelSettings | None = None):
+        self.settings = settings or FakeModelSettings.from_env()
+
+    def get_stt_model(self, model_name: str | None) -> STTModel:
+        return FakeSTTModel(self.settings)
+
+    def get_tts_model(self, model_name: str | None) -> TTSModel:
+        return FakeTTSModel(self.settings)
+
+
+def _user_messages(input: str | list[TResponseInputItem]) -> list[str]:
+    if isinstance(input, str):
+        return [input]
+    return [
+        item["content"] if isinstance(item["content"], str) else json.dumps(item["content"])
+        for item in input
+        if isinstance(item, dict) and item.get("role") == "user"
+    ]
+
+
+def _tools_without_arguments(tools: list[Tool]) -> list[FunctionTool]:
+    return [
+        tool
+        for tool in tools
+        if isinstance(tool, FunctionTool) and not tool.params_json_schema.get("required")
+    ]
+
+
+class FakeLLM(Model):
+    """Modèle de langage local, au comportement déterministe"""
+
+    def __init__(self, settings: FakeModelSettings | None = None):
+        self.settings = settings or FakeModelSettings.from_env()
+
+    def _plan(
+        self, input: str | list[TResponseInputItem], tools: list[Tool]
+    ) -> tuple[list[ResponseFunctionToolCall], str]:
+        last = input[-1] if isinstance(input, list) and input else None
+        calls_tools = (
+            len(_user_messages(input)) == 1
+            and isinstance(last, dict)
+            and last.get("role") == "user"
+        )
+        if calls_tools:
+            calls = [
+                ResponseFunctionToolCall(
+                    arguments="{}",
+                    call_id=f"call_{i}",
+                    name=tool.name,
+                    type="function_call",
+                    id=FAKE_RESPONSE_ID,
+                    status="completed",
+                )
+                for i, tool in enumerate(_tools_without_arguments(tools))
+            ]
+            if calls:
+                return calls, ""
+        messages = _user_messages(input)
+        return [], _pick(list(ANSWERS.values()), messages[-1] if messages else "")
+
+    def _response(self, output: list, input: str | list[TResponseInputItem], text: str) -> Response:
+        input_tokens = len(json.dumps(input, ensure_ascii=False)) // 4
+        output_tokens = len(text) // 4
+        return Response(
+            id=FAKE_RESPONSE_ID,
+            created_at=time.time(),
+            model="fake-llm",
+            object="response",
+            output=output,
+            tool_choice="auto",
+            tools=[],
+            parallel_tool_calls=True,
+            usage=ResponseUsage(
+                input_tokens=input_tokens,
+                input_tokens_details=InputTokensDetails(cached_tokens=0),
+                output_tokens=output_tokens,
+                output_tokens_details=OutputTokensDetails(reasoning_tokens=0),
+                total_tokens=input_tokens + output_tokens,
+            ),
+        )
+
+    @staticmethod
+    def _message(text: str, status: str = "completed") -> ResponseOutputMessage:
+        return ResponseOutputMessage(
+            id=FAKE_RESPONSE_ID,
+            content=[ResponseOutputText(text=text, type="output_text", annotations=[])],
+            role="assistant",
+            type="message",
+            status=status,
+        )
+
+    async def get_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+    ) -> ModelResponse:
+        calls, text = self._plan(input, tools)
+        await asyncio.sleep(
+            self.settings.llm_first_token_seconds
+            + len(_WORDS.findall(text)) / self.settings.llm_tokens_per_second
+        )
+        output = calls or [self._message(text)]
+        usage = self._response(output, input, text).usage
+        return ModelResponse(
+            output=output,
+            usage=Usage(
+                requests=1,
+                input_tokens=usage.input_tokens,
+                output_tokens=usage.output_tokens,
+                total_tokens=usage.total_tokens,
+            ),
+            referenceable_id=None,
+        )
+
+    async def stream_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+    ) -> AsyncIterator[ResponseStreamEvent]:
+        calls, text = self._plan(input, tools)
+        yield ResponseCreatedEvent(
+            response=self._response([], input, ""), type="response.created"
+        )
+        await asyncio.sleep(self.settings.llm_first_token_seconds)
+
+        if calls:
+            for index, call in enumerate(calls):
+                yield ResponseOutputItemAddedEvent(
+                    item=call, output_index=index, type="response.output_item.added"
+                )
+                yield ResponseOutputItemDoneEvent(
+                    item=call, output_index=index, type="response.output_item.done"
+                )
+            yield ResponseCompletedEvent(
+                response=self._response(calls, input, ""), type="response.completed"
+            )
+            return
+
+        yield ResponseOutputItemAddedEvent(
+            item=self._message("", status="in_progress"),
+            output_index=0,
+            type="response.output_item.added",
+        )
+        yield ResponseContentPartAddedEvent(
+            content_index=0,
+            item_id=FAKE_RESPONSE_ID,
+            output_index=0,
+            part=ResponseOutputText(text="", type="output_text", annotations=[]),
+            type="response.content_part.added",
+        )
+        for word in _WORDS.findall(text):
+            yield ResponseTextDeltaEvent(
+                content_index=0,
+                delta=word,
+                item_id=FAKE_RESPONSE_ID,
+                output_index=0,
+                type="response.output_text.delta",
+            )
+            await asyncio.sleep(1 / self.settings.llm_tokens_per_second)
+        message = self._message(text)
+        yield ResponseOutputItemDoneEvent(
+            item=message, output_index=0, type="response.output_item.done"
+        )
+        yield ResponseCompletedEvent(
+            response=self._response([message], input, text), type="response.completed"
+        )
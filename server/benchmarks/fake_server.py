@@ -0,0 +1,34 @@
+"""
+server.py avec les modèles locaux de benchmarks/fake_models.py à la place d'OpenAI
+Les outils appellent le backend de FAKE_BACKEND_URL (benchmarks/fake_backend.py) ; sans
+FAKE_TTS_CACHE, le cache audio est désactivé pour que chaque segment passe par le TTS
+
+Usage (depuis server/) : FAKE_BACKEND_URL=http://127.0.0.1:8001 \
+                         uvicorn benchmarks.fake_server:app --port 4000 --workers 4
+"""
+
+import os
+
+from agents import set_tracing_disabled
+
+import server
+from app import voice_pipeline
+from app.agent_config import starting_agent
+from app.warmup import collect_agents
+from benchmarks.fake_models import FakeLLM, FakeVoiceModelProvider
+
+# server.py charge ../.env en écrasant l'environnement : les réglages du benchmark passent après
+os.environ["NEXT_PUBLIC_API_BASE_URL"] = os.getenv("FAKE_BACKEND_URL", "http://127.0.0.1:8001")
+os.environ["NEXT_PUBLIC_VENDOR_ID"] = "4"
+if not os.getenv("FAKE_TTS_CACHE"):
+    os.environ["TTS_CACHE_MEMORY_ENTRIES"] = "0"
+    os.environ["TTS_CACHE_DIR"] = ""
+
+# Aucune trace exportée vers OpenAI
+set_tracing_disabled(True)
+voice_pipeline.use_model_provider(FakeVoiceModelProvider())
+llm = FakeLLM()
+for agent in collect_agents(starting_agent):
+    agent.model = llm
+
+app = server.app
@@ -0,0 +1,88 @@
+"""
+Benchmark du protocole d'historique : octets envoyés et CPU par tour selon la longueur de
+l'historique, en mode "full" (historique complet à chaque token) et "delta" (ajouts seuls)
+
+Usage (depuis server/) : python -m benchmarks.history_protocol --tokens 150
+"""
+
+import argparse
+import asyncio
+import time
+from types import SimpleNamespace
+
+from agents import RunItemStreamEvent
+
+from app.utils import WebsocketHelper
+
+
+class CountingWebsocket:
+    def __init__(self):
+        self.bytes_sent = 0
+        self.messages = 0
+
+    async def send_text(self, data: str):
+        self.bytes_sent += len(data.encode("utf-8"))
+        self.messages += 1
+
+
+def synthetic_history(length: int) -> list:
+    items = []
+    for i in range(length):
+        if i % 4 == 2:
+            items.append(
+                {
+                    "type": "function_call_output",
+                    "call_id": f"call_{i}",
+                    "output": '{"success": true, "sports": ' + '["Ski Alpin"], ' * 40 + "}",
+                }
+            )
+        else:
+            items.append(
+                {
+                    "type": "message",
+                    "role": "user" if i % 2 == 0 else "assistant",
+                    "content": "Bonjour, je voudrais réserver un cours de ski pour deux enfants.",
+                }
+            )
+    return items
+
+
+async def run_turn(protocol: str, history_length: int, tokens: int) -> tuple[int, int, float]:
+    agent = SimpleNamespace(name="Agent d'Information ResaSki")
+    websocket = CountingWebsocket()
+    connection = WebsocketHelper(
+        websocket, synthetic_history(history_length), agent, protocol=protocol  # type: ignore
+    )
+
+    start = time.process_time()
+    await connection.show_user_input("Quels sports proposez-vous ?")
+    for _ in range(tokens):
+        await connection.stream_response("mot ")
+    answer = {"type": "message", "role": "assistant", "content": "mot " * tokens}
+    item = SimpleNamespace(to_input_item=lambda: answer)
+    await connection.handle_new_item(RunItemStreamEvent("message_output_created", item))  # type: ignore
+    # text_output_complete reconstruit le tour à partir des nouveaux items du run
+    output = SimpleNamespace(last_agent=agent, new_items=[item])
+    await connection.text_output_complete(output, is_done=True)
+    await connection.drain()
+    cpu = time.process_time() - start
+    await connection.close()
+
+    return websocket.bytes_sent, websocket.messages, cpu
+
+
+async def main(args):
+    print(f"{'history':>8} | {'mode':>5} | {'messages':>8} | {'bytes/turn':>12} | {'cpu ms/turn':>11}")
+    for length in args.lengths:
+        for protocol in ("full", "delta"):
+            bytes_sent, messages, cpu = await run_turn(protocol, length, args.tokens)
+            print(
+                f"{length:>8} | {protocol:>5} | {messages:>8} | {bytes_sent:>12,} | {cpu * 1000:>11.2f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tokens", type=int, default=150, help="tokens de texte par réponse")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[10, 50, 100, 200, 400])
+    asyncio.run(main(parser.parse_args()))
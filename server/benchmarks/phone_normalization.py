@@ -0,0 +1,112 @@
+"""
+Benchmark de la normalisation des numéros : temps par appel de l'ancienne chaîne
+(str.replace + phonenumbers.parse + is_valid_number + geocoder) contre le chemin rapide
+de app.phone_normalization, à froid et mémorisé
+
+--check vérifie le corpus de référence phone_corpus.json (saisies, transcriptions dictées,
+numéros invalides) et sort en erreur au premier écart
+
+Usage (depuis server/) : python -m benchmarks.phone_normalization --iterations 2000
+                         python -m benchmarks.phone_normalization --check
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import phonenumbers
+from phonenumbers import geocoder
+
+from app.phone_normalization import calling_codes, normalize_phone
+
+CORPUS = Path(__file__).with_name("phone_corpus.json")
+
+# Codes de l'ancienne table en dur, seuls pays acceptés sans "+"
+LEGACY_COUNTRIES = {"33", "41", "32", "39", "49", "34", "1", "44"}
+
+
+def load_corpus() -> list[dict]:
+    return json.loads(CORPUS.read_text(encoding="utf-8"))
+
+
+def legacy_normalize(phone_input: str, country_code: str | None = None) -> str | None:
+    clean = phone_input.replace(" ", "").replace("-", "").replace(".", "")
+    clean = clean.replace("(", "").replace(")", "")
+    if not clean.startswith("+"):
+        code = (country_code or "").replace("+", "")
+        if code in LEGACY_COUNTRIES:
+            clean = f"+{code}{clean}"
+        elif clean.startswith("0"):
+            clean = f"+33{clean[1:]}"
+        else:
+            return None
+    try:
+        parsed = phonenumbers.parse(clean, None)
+    except phonenumbers.NumberParseException:
+        return None
+    if not phonenumbers.is_valid_number(parsed):
+        return None
+    geocoder.description_for_number(parsed, "fr")
+    return phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
+
+
+def check() -> int:
+    corpus = load_corpus()
+    failures = 0
+    for case in corpus:
+        result = normalize_phone(case["input"], case.get("country_code"))
+        got = {
+            "normalized": result.normalized,
+            "error": result.error,
+            "assumed_country": result.assumed_country,
+        }
+        expected = {
+            "normalized": case.get("normalized"),
+            "error": case.get("error"),
+            "assumed_country": case.get("assumed_country", False),
+        }
+        if got != expected:
+            failures += 1
+            print(f"ÉCART {case['input']!r} : attendu {expected}, obtenu {got}")
+    print(f"{len(corpus) - failures}/{len(corpus)} cas conformes")
+    return 1 if failures else 0
+
+
+def timed(label: str, run, cases: list[dict], iterations: int) -> None:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for case in cases:
+            run(case["input"], case.get("country_code"))
+    per_call = (time.perf_counter() - start) / (iterations * len(cases))
+    print(f"{label:<22} {per_call * 1e6:>9.1f} µs/appel")
+
+
+def main(args) -> int:
+    if args.check:
+        return check()
+
+    start = time.perf_counter()
+    calling_codes()
+    print(f"construction des tables {(time.perf_counter() - start) * 1000:>6.1f} ms")
+
+    # Seules les saisies en chiffres : l'ancienne chaîne ne comprend pas les transcriptions
+    cases = [case for case in load_corpus() if not any(c.isalpha() for c in case["input"])]
+    legacy_normalize(cases[0]["input"])  # charge les données du géocodeur hors mesure
+
+    def cold(phone_input, country_code):
+        normalize_phone.cache_clear()
+        return normalize_phone(phone_input, country_code)
+
+    timed("ancienne chaîne", legacy_normalize, cases, args.iterations)
+    timed("chemin rapide", cold, cases, args.iterations)
+    timed("chemin rapide mémorisé", normalize_phone, cases, args.iterations)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--check", action="store_true")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,161 @@
+"""
+Benchmark de la latence au premier octet audio : mode "commit" (tampon puis transcription
+de tout l'énoncé) contre mode "stream" (StreamedAudioInput + VAD côté serveur)
+
+Les modèles STT/TTS sont simulés : la transcription coûte `--stt-rate` secondes par seconde
+d'audio, et la session streaming transcrit les morceaux au fil de l'eau. La latence est
+mesurée depuis le dernier morceau de parole envoyé par le client.
+
+Usage (depuis server/) : python -m benchmarks.stt_latency --speech 3 --turns 5
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from collections.abc import AsyncIterator
+
+import numpy as np
+from agents.voice import (
+    AudioInput,
+    STTModel,
+    STTModelSettings,
+    StreamedAudioInput,
+    StreamedTranscriptionSession,
+    TTSModel,
+    TTSModelSettings,
+    VoicePipeline,
+    VoicePipelineConfig,
+    VoiceStreamEventAudio,
+    VoiceWorkflowBase,
+)
+
+from benchmarks.fake_models import SAMPLE_RATE, FakeStreamedSession
+
+CHUNK_SECONDS = 0.1
+TRANSCRIPT = "Quels sports proposez-vous ?"
+
+
+class FakeSTTModel(STTModel):
+    def __init__(self, stt_rate: float, finalize: float, silence_ms: int):
+        self.stt_rate = stt_rate
+        self.finalize = finalize
+        self.silence_ms = silence_ms
+
+    @property
+    def model_name(self) -> str:
+        return "fake-stt"
+
+    async def transcribe(
+        self,
+        input: AudioInput,
+        settings: STTModelSettings,
+        trace_include_sensitive_data: bool,
+        trace_include_sensitive_audio_data: bool,
+    ) -> str:
+        await asyncio.sleep(self.stt_rate * len(input.buffer) / SAMPLE_RATE + self.finalize)
+        return TRANSCRIPT
+
+    async def create_session(
+        self,
+        input: StreamedAudioInput,
+        settings: STTModelSettings,
+        trace_include_sensitive_data: bool,
+        trace_include_sensitive_audio_data: bool,
+    ) -> StreamedTranscriptionSession:
+        return FakeStreamedSession(
+            input, self.stt_rate, self.finalize, self.silence_ms, lambda samples: TRANSCRIPT
+        )
+
+
+class FakeTTSModel(TTSModel):
+    @property
+    def model_name(self) -> str:
+        return "fake-tts"
+
+    async def run(self, text: str, settings: TTSModelSettings) -> AsyncIterator[bytes]:
+        for _ in range(4):
+            await asyncio.sleep(0)
+            yield np.zeros(1024, dtype=np.int16).tobytes()
+
+
+class EchoWorkflow(VoiceWorkflowBase):
+    async def run(self, transcription: str) -> AsyncIterator[str]:
+        yield "Nous proposons le ski alpin et le snowboard."
+
+
+def speech_chunks(seconds: float) -> list[np.ndarray]:
+    size = int(SAMPLE_RATE * CHUNK_SECONDS)
+    return [
+        np.full(size, 1000, dtype=np.int16) for _ in range(round(seconds / CHUNK_SECONDS))
+    ]
+
+
+def pipeline(args) -> VoicePipeline:
+    return VoicePipeline(
+        workflow=EchoWorkflow(),
+        stt_model=FakeSTTModel(args.stt_rate, args.finalize, args.silence_ms),
+        tts_model=FakeTTSModel(),
+        config=VoicePipelineConfig(stt_settings=STTModelSettings()),
+    )
+
+
+async def first_audio(output) -> float:
+    async for event in output.stream():
+        if isinstance(event, VoiceStreamEventAudio):
+            return time.perf_counter()
+    raise RuntimeError("aucun audio reçu")
+
+
+async def commit_turn(args) -> float:
+    buffer = []
+    for chunk in speech_chunks(args.speech):
+        await asyncio.sleep(CHUNK_SECONDS)
+        buffer.append(chunk)
+    speech_end = time.perf_counter()
+    output = await pipeline(args).run(AudioInput(np.concatenate(buffer)))
+    return await first_audio(output) - speech_end
+
+
+async def stream_turn(args) -> float:
+    audio = StreamedAudioInput()
+    output = await pipeline(args).run(audio)
+    first_byte = asyncio.create_task(first_audio(output))
+
+    for chunk in speech_chunks(args.speech):
+        await asyncio.sleep(CHUNK_SECONDS)
+        await audio.add_audio(chunk)
+    speech_end = time.perf_counter()
+    # Le client continue d'envoyer le micro : du silence jusqu'à ce que la VAD coupe le tour
+    while not first_byte.done():
+        await asyncio.sleep(CHUNK_SECONDS)
+        await audio.add_audio(np.zeros(int(SAMPLE_RATE * CHUNK_SECONDS), dtype=np.int16))
+
+    latency = first_byte.result() - speech_end
+    await audio.add_audio(None)  # type: ignore
+    if output.text_generation_task:
+        output.text_generation_task.cancel()
+    return latency
+
+
+async def main(args):
+    print(
+        f"Énoncé de {args.speech}s, STT à {args.stt_rate}s/s d'audio, "
+        f"finalisation {args.finalize * 1000:.0f} ms, silence VAD {args.silence_ms} ms"
+    )
+    for mode, run_turn in (("commit", commit_turn), ("stream", stream_turn)):
+        latencies = [await run_turn(args) for _ in range(args.turns)]
+        print(
+            f"{mode:>6} : premier octet audio en {statistics.median(latencies) * 1000:.0f} ms "
+            f"(médiane sur {args.turns} tours, max {max(latencies) * 1000:.0f} ms)"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--speech", type=float, default=3.0, help="durée de l'énoncé en secondes")
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--stt-rate", type=float, default=0.15, help="secondes de STT par seconde d'audio")
+    parser.add_argument("--finalize", type=float, default=0.1, help="coût fixe de fin de transcription")
+    parser.add_argument("--silence-ms", type=int, default=500, help="silence_duration_ms de la VAD")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,81 @@
+"""
+Test de charge : N sessions concurrentes appellent les outils ResaSki
+Vérifie qu'un appel backend lent ne bloque pas les autres sessions
+
+Usage (depuis server/) : python -m benchmarks.tool_concurrency --sessions 50 --latency 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+from agents import RunContextWrapper
+
+from benchmarks.fake_backend import CUSTOMER, FakeBackendSettings, start_in_thread
+
+
+async def run_session(tools, calls: int, durations: list[float]):
+    ctx = RunContextWrapper(context=None)
+    for i in range(calls):
+        tool, args = tools[i % len(tools)]
+        start = time.perf_counter()
+        output = json.loads(await tool.on_invoke_tool(ctx, json.dumps(args)))
+        durations.append(time.perf_counter() - start)
+        if output.get("error") or output.get("success") is False:
+            raise RuntimeError(f"{tool.name} a échoué : {output}")
+
+
+async def measure_loop_lag(stop: asyncio.Event, interval: float = 0.01) -> float:
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+async def main(args):
+    os.environ["NEXT_PUBLIC_API_BASE_URL"] = start_in_thread(
+        FakeBackendSettings(latency=args.latency)
+    )
+    os.environ["NEXT_PUBLIC_VENDOR_ID"] = "4"
+
+    from app.customer_authentification_agent import search_customers_by_phone
+    from app.information_desk_agent import get_vendor_info, get_vendor_sports
+
+    tools = [
+        (get_vendor_info, {}),
+        (get_vendor_sports, {}),
+        (search_customers_by_phone, {"phone_number": CUSTOMER["phone"]}),
+    ]
+
+    durations: list[float] = []
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(stop))
+
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(run_session(tools, args.calls, durations) for _ in range(args.sessions))
+    )
+    wall = time.perf_counter() - start
+    stop.set()
+    worst_lag = await lag_task
+
+    durations.sort()
+    serial = args.sessions * args.calls * args.latency
+    print(f"sessions={args.sessions} calls/session={args.calls} latency={args.latency * 1000:.0f}ms")
+    print(f"wall time        : {wall:.2f}s (serial would be >= {serial:.2f}s)")
+    print(f"call p50 / p95   : {statistics.median(durations) * 1000:.1f}ms / "
+          f"{durations[int(len(durations) * 0.95) - 1] * 1000:.1f}ms")
+    print(f"worst loop stall : {worst_lag * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--calls", type=int, default=6)
+    parser.add_argument("--latency", type=float, default=0.2, help="latence backend en secondes")
+    asyncio.run(main(parser.parse_args()))
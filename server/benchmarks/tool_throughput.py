@@ -0,0 +1,155 @@
+"""
+Débit et latence de traîne des outils ResaSki, sans réseau
+Des sessions concurrentes rejouent le parcours d'identification avec les vrais outils
+(infos vendor, normalisation du numéro, recherche par téléphone puis par email si le numéro
+est partagé, création du compte pour un nouvel appelant) contre le faux backend local, avec
+sa latence, ses erreurs injectées et sa base de clients synthétiques
+
+Usage (depuis server/) : python -m benchmarks.tool_throughput --sessions 100 --customers 1000000
+                         python -m benchmarks.tool_throughput --jitter 0.05 --error-rate 0.01
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections import defaultdict
+
+from agents import RunContextWrapper
+
+from benchmarks import fake_backend
+from benchmarks.fake_backend import CustomerBase
+
+
+def spoken_format(phone: str) -> str:
+    # Numéro national dicté par paires, comme le transcrit le STT : "07 30 00 01 23"
+    national = "0" + phone[3:]
+    return " ".join(national[i : i + 2] for i in range(0, len(national), 2))
+
+
+class Stats:
+    def __init__(self):
+        self.durations: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+
+    async def call(self, tool, **args) -> dict:
+        ctx = RunContextWrapper(context=None)
+        start = time.perf_counter()
+        output = json.loads(await tool.on_invoke_tool(ctx, json.dumps(args)))
+        self.durations[tool.name].append(time.perf_counter() - start)
+        if output.get("error") or output.get("success") is False:
+            self.errors[tool.name] += 1
+        return output
+
+
+async def run_session(tools, base: CustomerBase, args, rng: random.Random, stats: Stats):
+    from app import tool_concurrency
+
+    # Limite de concurrence des outils propre à la session, comme dans server.py
+    tool_concurrency.open_session()
+    for _ in range(args.flows):
+        await asyncio.gather(
+            stats.call(tools["get_vendor_info"]), stats.call(tools["get_vendor_sports"])
+        )
+        if rng.random() < args.new_callers:
+            index = base.size + rng.randrange(1_000_000)
+        else:
+            index = rng.randrange(base.size)
+        caller = base.customer(index)
+        normalized = await stats.call(
+            tools["normalize_phone_number"], phone_input=spoken_format(caller["phone"])
+        )
+        if not normalized.get("success"):
+            continue
+        found = await stats.call(
+            tools["search_customers_by_phone"], phone_number=normalized["normalized"]
+        )
+        if found.get("multiple_matches"):
+            await stats.call(tools["search_customer_by_email"], email=caller["email"])
+        elif found.get("found") is False:
+            await stats.call(tools["validate_email_format"], email=caller["email"])
+            await stats.call(
+                tools["create_customer"],
+                vendor_id=os.environ["NEXT_PUBLIC_VENDOR_ID"],
+                first_name=caller["first_name"],
+                last_name=caller["last_name"],
+                email=caller["email"],
+                phone_number=normalized["normalized"],
+                date_of_birth="1990-01-01",
+            )
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def main(args):
+    settings = fake_backend.settings_from_args(args)
+    os.environ["NEXT_PUBLIC_API_BASE_URL"] = fake_backend.start_in_thread(settings)
+    os.environ["NEXT_PUBLIC_VENDOR_ID"] = "4"
+
+    from app.customer_authentification_agent import (
+        create_customer,
+        normalize_phone_number,
+        search_customer_by_email,
+        search_customers_by_phone,
+        validate_email_format,
+    )
+    from app.information_desk_agent import get_vendor_info, get_vendor_sports
+
+    tools = {
+        tool.name: tool
+        for tool in (
+            get_vendor_info,
+            get_vendor_sports,
+            normalize_phone_number,
+            search_customers_by_phone,
+            search_customer_by_email,
+            validate_email_format,
+            create_customer,
+        )
+    }
+    # Même base que le faux backend : les appelants tirés y existent
+    base = CustomerBase(settings.customers, settings.seed)
+    stats = Stats()
+
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            run_session(tools, base, args, random.Random(args.seed + i), stats)
+            for i in range(args.sessions)
+        )
+    )
+    wall = time.perf_counter() - start
+
+    total = sum(len(durations) for durations in stats.durations.values())
+    print(
+        f"sessions={args.sessions} flows/session={args.flows} customers={args.customers} "
+        f"latency={args.latency * 1000:.0f}ms jitter={args.jitter * 1000:.0f}ms "
+        f"error_rate={args.error_rate:.1%}"
+    )
+    print(f"{total} appels en {wall:.2f}s : {total / wall:.0f} appels/s")
+    print(f"{'outil':>26} | {'appels':>7} | {'erreurs':>7} | {'p50 ms':>7} | {'p95 ms':>7} | "
+          f"{'p99 ms':>7} | {'max ms':>7}")
+    for name, durations in stats.durations.items():
+        durations.sort()
+        print(
+            f"{name:>26} | {len(durations):>7} | {stats.errors[name]:>7} | "
+            f"{percentile(durations, 0.5) * 1000:>7.1f} | "
+            f"{percentile(durations, 0.95) * 1000:>7.1f} | "
+            f"{percentile(durations, 0.99) * 1000:>7.1f} | {durations[-1] * 1000:>7.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--flows", type=int, default=10, help="parcours par session")
+    parser.add_argument(
+        "--new-callers", type=float, default=0.1, help="part d'appelants inconnus du backend"
+    )
+    fake_backend.add_arguments(parser)
+    parser.set_defaults(latency=0.05, jitter=0.02)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,95 @@
+"""
+Benchmark du découpage texte → TTS sur des réponses types en français : tokens attendus
+avant le premier segment (donc avant la première requête TTS), nombre et taille des
+segments, pour le découpeur par phrases du SDK et pour TextSegmenter
+
+Usage (depuis server/) : python -m benchmarks.tts_segmentation --tokens-per-second 60
+"""
+
+import argparse
+import re
+
+from agents.voice.utils import get_sentence_based_splitter
+
+from app.tts_segmentation import SegmentationSettings, TextSegmenter
+
+ANSWERS = {
+    "sports": """Nous proposons une large gamme d'activités de montagne, pour tous les niveaux :
+
+**Sports de glisse principaux :**
+- Ski Alpin (cours tous niveaux)
+- Snowboard (du débutant à l'expert)
+- Ski Nordique
+
+**Activités outdoor :**
+- Raquettes à neige
+- Randonnée Nordique
+- Trail et VTT
+
+Et bien d'autres activités ! Quel sport vous intéresse le plus ?""",
+    "localisation": (
+        "Notre école ESI De Métabief se situe au 9 Place Xavier Authier, à Métabief, "
+        "dans le Doubs. Nous sommes facilement accessibles depuis le centre station, "
+        "à deux minutes à pied des remontées mécaniques. Vous pouvez nous joindre au "
+        "03 81 49 25 11 ou par email, metabief@ecoledeski.fr, tous les jours de 9 h à 18 h."
+    ),
+    "accueil": (
+        "Bonsoir et bienvenue à l'ESI De Métabief ! Je suis votre assistant, je peux vous "
+        "renseigner sur nos activités ou vous aider à réserver un cours. Que puis-je faire "
+        "pour vous ?"
+    ),
+}
+
+
+def tokens(text: str) -> list[str]:
+    # Approximation des deltas du LLM : un mot et ses espaces par delta
+    return re.findall(r"\S+\s*|\s+", text)
+
+
+def sdk_segments(deltas: list[str]) -> list[tuple[int, str]]:
+    splitter = get_sentence_based_splitter()
+    buffer, segments = "", []
+    for i, delta in enumerate(deltas):
+        buffer += delta
+        combined, buffer = splitter(buffer)
+        # Même seuil que StreamedAudioResult._add_text
+        if len(combined) >= 20:
+            segments.append((i + 1, combined))
+    if buffer:
+        segments.append((len(deltas), buffer))
+    return segments
+
+
+def segmenter_segments(deltas: list[str], settings: SegmentationSettings) -> list[tuple[int, str]]:
+    segmenter = TextSegmenter(settings)
+    segments = []
+    for i, delta in enumerate(deltas):
+        segments.extend((i + 1, segment) for segment in segmenter.feed(delta))
+    segments.extend((len(deltas), segment) for segment in segmenter.flush())
+    return segments
+
+
+def main(args):
+    settings = SegmentationSettings.from_env()
+    print(f"{'réponse':>13} | {'découpeur':>10} | {'1er segment ms':>14} | {'segments':>8} | {'taille moy.':>11}")
+    for name, answer in ANSWERS.items():
+        deltas = tokens(answer)
+        for label, segments in (
+            ("SDK", sdk_segments(deltas)),
+            ("français", segmenter_segments(deltas, settings)),
+        ):
+            first_ms = segments[0][0] / args.tokens_per_second * 1000
+            average = sum(len(text) for _, text in segments) / len(segments)
+            print(
+                f"{name:>13} | {label:>10} | {first_ms:>14.0f} | {len(segments):>8} | {average:>11.0f}"
+            )
+            if args.verbose:
+                for index, text in segments:
+                    print(f"{'':>16}{index:>4} {text!r}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens-per-second", type=float, default=60.0)
+    parser.add_argument("--verbose", action="store_true")
+    main(parser.parse_args())
@@ -0,0 +1,197 @@
+"""
+Benchmark de montée en charge : appels par seconde et par cœur avec 1 puis N workers
+
+Le serveur de test reproduit le travail CPU d'un tour audio du vrai serveur, sans modèles :
+décodage des morceaux entrants, accumulation, conversion float32/PCM16 et envoi de la réponse
+audio via WebsocketHelper. Des processus clients enchaînent les appels pendant `--duration`.
+
+Usage (depuis server/) : python -m benchmarks.worker_scaling --workers 1 4 --clients 64
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import multiprocessing
+import os
+import queue
+import socket
+import time
+
+import numpy as np
+import uvicorn
+import websockets
+from agents.voice import VoiceStreamEventAudio
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+
+from app.audio_buffer import AudioAccumulator
+from app.outbound import SenderSettings
+from app.utils import (
+    WebsocketHelper,
+    is_audio_complete,
+    is_new_audio_chunk,
+    receive_message,
+)
+from benchmarks.fake_backend import _free_port
+
+SAMPLE_RATE = 24000
+RESPONSE_SECONDS = 3.0
+
+app = FastAPI()
+
+
+@app.websocket("/ws")
+async def echo_turns(websocket: WebSocket):
+    await websocket.accept()
+    # Sans cadence de lecture : la mesure porte sur le CPU, pas sur la durée de l'audio
+    connection = WebsocketHelper(
+        websocket, [], None, sender_settings=SenderSettings(max_lead_ms=0)  # type: ignore
+    )
+    audio_buffer = AudioAccumulator()
+    response = np.zeros(int(SAMPLE_RATE * RESPONSE_SECONDS), dtype=np.int16)
+    while True:
+        try:
+            message = await receive_message(websocket)
+        except WebSocketDisconnect:
+            return
+        if is_new_audio_chunk(message):
+            audio_buffer.add_chunk(message)
+        elif is_audio_complete(message):
+            audio = audio_buffer.to_audio_input()
+            # Ce que fait le modèle STT avant l'envoi : retour en PCM16
+            (np.clip(audio.buffer, -1.0, 1.0) * 32767).astype(np.int16)
+            for start in range(0, len(response), 2400):
+                await connection.send_audio_chunk(
+                    VoiceStreamEventAudio(data=response[start : start + 2400])
+                )
+            await connection.send_audio_done()
+
+
+def serve(port: int, workers: int):
+    uvicorn.run(
+        "benchmarks.worker_scaling:app",
+        host="127.0.0.1",
+        port=port,
+        workers=workers,
+        log_level="warning",
+    )
+
+
+async def client_session(url: str, utterance: list[str], deadline: float) -> int:
+    calls = 0
+    async with websockets.connect(url, max_size=None) as ws:
+        while time.perf_counter() < deadline:
+            for chunk in utterance:
+                await ws.send(chunk)
+            await ws.send(json.dumps({"type": "input_audio_buffer.commit"}))
+            while json.loads(await ws.recv())["type"] != "audio.done":
+                pass
+            calls += 1
+    return calls
+
+
+def wait_listening(port: int, timeout: float):
+    # Le port ouvert suffit : les connexions attendent ensuite dans la file d'écoute que
+    # les workers démarrent, au lieu d'être refusées
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1.0):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit(f"le serveur de test n'écoute pas sur le port {port}")
+
+
+def client_process(url: str, sessions: int, duration: float, results):
+    rng = np.random.default_rng(os.getpid())
+    utterance = [
+        json.dumps(
+            {
+                "type": "input_audio_buffer.append",
+                "delta": base64.b64encode(
+                    rng.integers(-8000, 8000, 2400, dtype=np.int16).tobytes()
+                ).decode("utf-8"),
+            }
+        )
+        for _ in range(30)
+    ]
+
+    async def run():
+        deadline = time.perf_counter() + duration
+        return sum(
+            await asyncio.gather(
+                *(client_session(url, utterance, deadline) for _ in range(sessions))
+            )
+        )
+
+    results.put(asyncio.run(run()))
+
+
+def measure(workers: int, args) -> float:
+    port = _free_port()
+    server = multiprocessing.Process(target=serve, args=(port, workers))
+    server.start()
+    wait_listening(port, args.startup)
+
+    results = multiprocessing.Queue()
+    per_process = max(1, args.clients // args.client_processes)
+    clients = [
+        multiprocessing.Process(
+            target=client_process,
+            args=(f"ws://127.0.0.1:{port}/ws", per_process, args.duration, results),
+        )
+        for _ in range(args.client_processes)
+    ]
+    for client in clients:
+        client.start()
+    calls, pending = 0, len(clients)
+    deadline = time.perf_counter() + args.duration + args.timeout
+    try:
+        while pending:
+            try:
+                calls += results.get(timeout=1.0)
+                pending -= 1
+                continue
+            except queue.Empty:
+                pass
+            # Un client mort (serveur pas prêt, connexion refusée) n'enverra jamais son total
+            failed = [client.exitcode for client in clients if client.exitcode not in (None, 0)]
+            if failed:
+                raise SystemExit(f"{len(failed)} processus client(s) en échec, codes {failed}")
+            if time.perf_counter() > deadline:
+                raise SystemExit(f"{pending} processus client(s) sans résultat à l'échéance")
+    finally:
+        for client in clients:
+            client.join(timeout=1.0)
+            if client.is_alive():
+                client.terminate()
+        server.terminate()
+        server.join()
+    return calls / args.duration
+
+
+def main(args):
+    print(
+        f"{args.clients} sessions, énoncé 3s / réponse {RESPONSE_SECONDS:.0f}s, "
+        f"{args.duration:.0f}s par mesure, {os.cpu_count()} cœurs"
+    )
+    print(f"{'workers':>7} | {'appels/s':>9} | {'appels/s/cœur':>13}")
+    for workers in args.workers:
+        rate = measure(workers, args)
+        print(f"{workers:>7} | {rate:>9.1f} | {rate / workers:>13.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--client-processes", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument(
+        "--startup", type=float, default=30.0, help="attente maximale du démarrage serveur"
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=30.0, help="attente des clients au-delà de --duration"
+    )
+    main(parser.parse_args())
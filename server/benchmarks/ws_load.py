@@ -0,0 +1,385 @@
+"""
+Test de charge de bout en bout du websocket /ws, avec les modèles locaux
+Démarre le faux backend et benchmarks.fake_server (server.py avec STT, TTS et LLM locaux
+et déterministes), puis des processus clients ouvrent des centaines de sessions qui
+enchaînent des tours audio (input_audio_buffer.append puis commit, en temps réel) et des
+tours texte (history.update) jusqu'à la fin de la mesure
+
+Rapporte les sessions par cœur serveur, les p50/p95/p99 du temps jusqu'au premier audio
+(depuis le commit) et au premier texte, le CPU et la mémoire résidente du serveur et de ses
+workers (lus dans /proc, Linux), et les octets échangés (charge utile des messages)
+
+Usage (depuis server/) : python -m benchmarks.ws_load --sessions 200 --workers 2
+                         python -m benchmarks.ws_load --utterance enregistrement.wav
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import time
+import wave
+from pathlib import Path
+
+import httpx
+import numpy as np
+import uvicorn
+import websockets
+
+from benchmarks import fake_backend
+from benchmarks.fake_backend import _free_port
+from benchmarks.fake_models import FakeModelSettings
+
+SAMPLE_RATE = 24000
+CHUNK_MS = 100
+TEXT_MESSAGES = (
+    "Quels sont vos horaires d'ouverture ?",
+    "Est-ce que vous proposez des cours pour enfants ?",
+    "Je voudrais des informations sur le snowboard.",
+)
+
+
+def load_utterances(paths: list[str]) -> list[np.ndarray]:
+    """Énoncés enregistrés en WAV PCM16 mono 24 kHz, ou énoncés de synthèse sans fichier"""
+    if not paths:
+        rng = np.random.default_rng(0)
+        utterances = []
+        for seconds in (1.6, 2.4, 3.2):
+            t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+            voice = np.sin(2 * np.pi * 180 * t) * (0.6 + 0.4 * np.sin(2 * np.pi * 3 * t))
+            noise = rng.normal(0, 0.05, len(t))
+            utterances.append(((voice + noise) * 6000).astype(np.int16))
+        return utterances
+    utterances = []
+    for path in paths:
+        with wave.open(path, "rb") as recording:
+            if (
+                recording.getframerate() != SAMPLE_RATE
+                or recording.getnchannels() != 1
+                or recording.getsampwidth() != 2
+            ):
+                raise SystemExit(f"{path} : PCM16 mono {SAMPLE_RATE} Hz attendu")
+            frames = recording.readframes(recording.getnframes())
+        utterances.append(np.frombuffer(frames, dtype=np.int16))
+    return utterances
+
+
+def append_messages(utterance: np.ndarray) -> list[str]:
+    samples = SAMPLE_RATE * CHUNK_MS // 1000
+    return [
+        json.dumps(
+            {
+                "type": "input_audio_buffer.append",
+                "delta": base64.b64encode(utterance[i : i + samples].tobytes()).decode(),
+            }
+        )
+        for i in range(0, len(utterance), samples)
+    ]
+
+
+# --- Processus serveur et mesures /proc -------------------------------------------------
+
+
+def run_backend(port: int, settings: fake_backend.FakeBackendSettings):
+    uvicorn.run(fake_backend.create_app(settings), host="127.0.0.1", port=port, log_level="warning")
+
+
+def run_server(port: int, workers: int, env: dict[str, str]):
+    os.environ.update(env)
+    uvicorn.run(
+        "benchmarks.fake_server:app",
+        host="127.0.0.1",
+        port=port,
+        workers=workers,
+        log_level="warning",
+    )
+
+
+def wait_ready(url: str, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f"{url} ne répond pas")
+
+
+def _children() -> dict[int, list[int]]:
+    children: dict[int, list[int]] = {}
+    for stat in Path("/proc").glob("[0-9]*/stat"):
+        try:
+            fields = stat.read_text().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        children.setdefault(int(fields[1]), []).append(int(stat.parent.name))
+    return children
+
+
+def process_tree(pid: int) -> list[int]:
+    """Le processus et tous ses descendants (workers uvicorn)"""
+    children = _children()
+    tree, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        tree.append(current)
+        pending.extend(children.get(current, ()))
+    return tree
+
+
+def cpu_seconds(pids: list[int]) -> float:
+    ticks = 0
+    for pid in pids:
+        try:
+            fields = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        # utime et stime, champs 14 et 15 de /proc/<pid>/stat
+        ticks += int(fields[11]) + int(fields[12])
+    return ticks / os.sysconf("SC_CLK_TCK")
+
+
+def rss_bytes(pids: list[int]) -> int:
+    total = 0
+    for pid in pids:
+        try:
+            total += int(Path(f"/proc/{pid}/statm").read_text().split()[1])
+        except OSError:
+            continue
+    return total * os.sysconf("SC_PAGE_SIZE")
+
+
+# --- Clients ----------------------------------------------------------------------------
+
+
+class Session:
+    """Une conversation : garde l'historique pour les tours texte et compte les octets"""
+
+    def __init__(self, ws, rng: random.Random):
+        self.ws = ws
+        self.rng = rng
+        self.history: list = []
+        self.sent = 0
+        self.received = 0
+
+    async def send(self, message: str):
+        self.sent += len(message)
+        await self.ws.send(message)
+
+    async def receive(self) -> dict | None:
+        """Message JSON suivant, None pour une trame audio binaire"""
+        message = await self.ws.recv()
+        self.received += len(message)
+        if isinstance(message, bytes):
+            return None
+        data = json.loads(message)
+        if "inputs" in data:
+            self.history = data["inputs"]
+        elif data["type"] == "history.item.added":
+            self.history[data["index"] :] = [data["item"]]
+        return data
+
+    async def audio_turn(self, appends: list[str], realtime: bool) -> tuple[float, float]:
+        for message in appends:
+            await self.send(message)
+            if realtime:
+                await asyncio.sleep(CHUNK_MS / 1000)
+        start = time.perf_counter()
+        await self.send(json.dumps({"type": "input_audio_buffer.commit"}))
+        first_audio = None
+        responded = audio_done = False
+        while not (responded and audio_done):
+            data = await self.receive()
+            if data is None or data["type"] == "response.audio.delta":
+                first_audio = first_audio or time.perf_counter() - start
+            elif data["type"] == "audio.done":
+                audio_done = True
+            elif data.get("reason") == "response.done":
+                responded = True
+        return first_audio or float("nan"), time.perf_counter() - start
+
+    async def text_turn(self, text: str) -> tuple[float, float]:
+        user = {"type": "message", "role": "user", "content": text}
+        start = time.perf_counter()
+        await self.send(json.dumps({"type": "history.update", "inputs": self.history + [user]}))
+        first_text = None
+        while True:
+            data = await self.receive()
+            if data is None:
+                continue
+            if data["type"] == "history.text.delta" or data.get("reason") == "response.text.delta":
+                first_text = first_text or time.perf_counter() - start
+            elif data.get("reason") == "response.done":
+                return first_text or float("nan"), time.perf_counter() - start
+
+
+async def client_session(url: str, index: int, args, utterances: list[list[str]], results: list):
+    rng = random.Random(args.seed + index)
+    deadline = time.perf_counter() + args.duration
+    # Démarrages étalés sur --ramp secondes
+    await asyncio.sleep(rng.uniform(0, args.ramp))
+    try:
+        async with websockets.connect(url, max_size=None) as ws:
+            session = Session(ws, rng)
+            while (await session.receive() or {}).get("type") != "session.started":
+                pass
+            while time.perf_counter() < deadline:
+                if rng.random() < args.text_ratio:
+                    kind = "text"
+                    first, total = await session.text_turn(rng.choice(TEXT_MESSAGES))
+                else:
+                    kind = "audio"
+                    first, total = await session.audio_turn(rng.choice(utterances), args.realtime)
+                results.append({"kind": kind, "first": first, "total": total})
+                await asyncio.sleep(rng.uniform(0.5, 1.5) * args.think)
+            results.append({"kind": "bytes", "sent": session.sent, "received": session.received})
+    except Exception as e:
+        results.append({"kind": "error", "error": repr(e)})
+
+
+def client_process(url: str, first_index: int, sessions: int, args, queue):
+    utterances = [append_messages(u) for u in load_utterances(args.utterance)]
+
+    async def run():
+        results: list = []
+        await asyncio.gather(
+            *(
+                client_session(url, first_index + i, args, utterances, results)
+                for i in range(sessions)
+            )
+        )
+        return results
+
+    queue.put(asyncio.run(run()))
+
+
+# --- Mesure -----------------------------------------------------------------------------
+
+
+def percentiles(values: list[float]) -> str:
+    values = sorted(v for v in values if v == v)
+    if not values:
+        return "-"
+    pick = lambda q: values[min(len(values) - 1, int(len(values) * q))] * 1000  # noqa: E731
+    return f"{pick(0.5):.0f} / {pick(0.95):.0f} / {pick(0.99):.0f} ms"
+
+
+def main(args):
+    backend_port, server_port = _free_port(), _free_port()
+    backend = multiprocessing.Process(
+        target=run_backend,
+        args=(backend_port, fake_backend.settings_from_args(args)),
+        daemon=True,
+    )
+    backend.start()
+
+    env = FakeModelSettings(
+        stt_seconds=args.stt_seconds,
+        llm_first_token_seconds=args.llm_first_token,
+        llm_tokens_per_second=args.llm_tokens_per_second,
+        tts_first_byte_seconds=args.tts_first_byte,
+    ).to_env()
+    env["FAKE_BACKEND_URL"] = f"http://127.0.0.1:{backend_port}"
+    if args.tts_cache:
+        env["FAKE_TTS_CACHE"] = "1"
+        env["TTS_CACHE_DIR"] = tempfile.mkdtemp(prefix="tts_cache_")
+    server = multiprocessing.Process(target=run_server, args=(server_port, args.workers, env))
+    server.start()
+    wait_ready(f"http://127.0.0.1:{server_port}/ready")
+
+    query = f"protocol={args.protocol}&audio={args.audio}"
+    url = f"ws://127.0.0.1:{server_port}/ws?{query}"
+    queue = multiprocessing.Queue()
+    per_process = -(-args.sessions // args.client_processes)
+    clients = []
+    for p in range(args.client_processes):
+        count = min(per_process, args.sessions - p * per_process)
+        if count > 0:
+            clients.append(
+                multiprocessing.Process(
+                    target=client_process, args=(url, p * per_process, count, args, queue)
+                )
+            )
+
+    pids = process_tree(server.pid)
+    cpu_start, start = cpu_seconds(pids), time.perf_counter()
+    peak_rss = 0
+    for client in clients:
+        client.start()
+    pending = len(clients)
+    results: list = []
+    while pending:
+        try:
+            results.extend(queue.get(timeout=1.0))
+            pending -= 1
+        except Exception:
+            pass
+        peak_rss = max(peak_rss, rss_bytes(process_tree(server.pid)))
+    wall = time.perf_counter() - start
+    cpu = cpu_seconds(process_tree(server.pid)) - cpu_start
+    for client in clients:
+        client.join()
+    server.terminate()
+    server.join()
+    backend.terminate()
+
+    turns = [r for r in results if r["kind"] in ("audio", "text")]
+    audio = [r for r in turns if r["kind"] == "audio"]
+    text = [r for r in turns if r["kind"] == "text"]
+    errors = [r for r in results if r["kind"] == "error"]
+    sent = sum(r["sent"] for r in results if r["kind"] == "bytes")
+    received = sum(r["received"] for r in results if r["kind"] == "bytes")
+    cores = cpu / wall
+
+    print(
+        f"{args.sessions} sessions, {args.workers} worker(s), {wall:.1f}s, "
+        f"{os.cpu_count()} cœurs machine (clients compris), protocole {args.protocol}, "
+        f"audio {args.audio}"
+    )
+    print(f"tours              : {len(audio)} audio, {len(text)} texte, {len(errors)} erreurs")
+    print(f"premier audio      : {percentiles([r['first'] for r in audio])} (p50 / p95 / p99)")
+    print(f"premier texte      : {percentiles([r['first'] for r in text])}")
+    if audio:
+        print(f"tour audio complet : {statistics.median(r['total'] for r in audio):.2f}s (médiane)")
+    print(f"CPU serveur        : {cores:.2f} cœur(s), {cpu / max(len(turns), 1) * 1000:.1f} ms/tour")
+    print(f"sessions par cœur  : {args.sessions / cores:.0f}" if cores else "sessions par cœur  : -")
+    print(f"RSS serveur max    : {peak_rss / 2**20:.0f} Mo")
+    print(
+        f"octets             : {sent / 2**20:.1f} Mo envoyés, {received / 2**20:.1f} Mo reçus, "
+        f"{(sent + received) / max(len(turns), 1) / 1024:.0f} Ko/tour"
+    )
+    for error in errors[:5]:
+        print(f"erreur : {error['error']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=30.0, help="durée de la mesure en secondes")
+    parser.add_argument("--ramp", type=float, default=5.0, help="étalement des connexions")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--client-processes", type=int, default=4)
+    parser.add_argument("--utterance", nargs="*", default=[], help="WAV PCM16 mono 24 kHz")
+    parser.add_argument("--text-ratio", type=float, default=0.3, help="part des tours texte")
+    parser.add_argument("--think", type=float, default=1.0, help="pause moyenne entre les tours")
+    parser.add_argument(
+        "--no-realtime", dest="realtime", action="store_false",
+        help="envoie l'énoncé d'un coup au lieu du rythme de la parole",
+    )
+    parser.add_argument("--protocol", choices=("full", "delta"), default="full")
+    parser.add_argument("--audio", choices=("json", "binary"), default="json")
+    parser.add_argument("--tts-cache", action="store_true", help="garde le cache audio TTS")
+    parser.add_argument("--stt-seconds", type=float, default=0.15)
+    parser.add_argument("--llm-first-token", type=float, default=0.3)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=60.0)
+    parser.add_argument("--tts-first-byte", type=float, default=0.2)
+    fake_backend.add_arguments(parser)
+    parser.set_defaults(latency=0.02)
+    main(parser.parse_args())
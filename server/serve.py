@@ -0,0 +1,74 @@
+"""
+Production entry point: runs the server in several worker processes, without auto-reload.
+
+Each websocket stays on the worker that accepted it. A client that reconnects to resume its
+session may land on another worker, so with more than one worker the session store defaults
+to a SQLite file shared by all of them (`SESSION_STORE`, see app/session_store.py). Two
+layouts are available:
+
+- `shared` (default): uvicorn workers share one listening port. The kernel spreads new
+  connections across workers.
+- `ports`: one worker per port, starting at `--port`, behind a load balancer.
+
+Usage (from server/): python serve.py --workers 4
+"""
+
+import argparse
+import multiprocessing
+import os
+
+import uvicorn
+
+DEFAULT_SHARED_STORE = "sqlite:.sessions.db"
+
+
+def run_worker(host: str, port: int, workers: int = 1):
+    uvicorn.run(
+        "server:app",
+        host=host,
+        port=port,
+        workers=workers,
+        lifespan="on",
+        proxy_headers=True,
+        timeout_graceful_shutdown=10,
+    )
+
+
+def main(args):
+    if args.workers > 1:
+        # Per-process memory sessions would be lost on a reconnect to another worker
+        os.environ.setdefault("SESSION_STORE", DEFAULT_SHARED_STORE)
+        if os.environ["SESSION_STORE"] == "memory":
+            print("SESSION_STORE=memory with several workers: resuming needs sticky routing")
+    if args.layout == "shared":
+        run_worker(args.host, args.port, args.workers)
+        return
+
+    processes = [
+        multiprocessing.Process(target=run_worker, args=(args.host, args.port + i), daemon=False)
+        for i in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    print(f"{args.workers} workers on ports {args.port}-{args.port + args.workers - 1}")
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "4000")))
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1))),
+    )
+    parser.add_argument("--layout", choices=("shared", "ports"), default="shared")
+    main(parser.parse_args())
@@ -1,38 +1,87 @@
+import asyncio
+import hashlib
+import os
+import secrets
 import time
-from collections.abc import AsyncIterator
+from collections.abc import AsyncIterator, Coroutine
+from contextlib import asynccontextmanager, suppress
 from logging import getLogger
 from typing import Any, Dict
 
-from agents import Runner, trace
+from agents import Runner, RunResultStreaming, trace
 from agents.voice import (
-    TTSModelSettings,
-    VoicePipeline,
-    VoicePipelineConfig,
+    AudioInput,
+    STTModelSettings,
+    StreamedAudioInput,
+    StreamedAudioResult,
     VoiceWorkflowBase,
 )
+from app import api_client, logs, tool_concurrency, voice_pipeline
 from app.agent_config import starting_agent
+from app.audio_buffer import AudioAccumulator
+from app.history_compaction import compact_history
+from app.metrics import (
+    TurnHooks,
+    TurnTimer,
+    audio_receive_seconds,
+    prompt_tokens,
+    render_metrics,
+)
+from app.voice_pipeline import SessionPipeline
+from app.session_store import create_session_store
+from app.tts_segmentation import TURN_END, TextSegmenter
+from app.warmup import collect_agents, readiness, warm_up
 from app.utils import (
+    InvalidMessageError,
     WebsocketHelper,
-    concat_audio_chunks,
-    extract_audio_chunk,
+    cancel_audio_output,
+    cancel_run,
+    extract_pcm16_chunk,
+    is_agent_updated,
     is_audio_complete,
+    is_cancel_request,
     is_new_audio_chunk,
     is_new_text_message,
+    is_resync_request,
     is_sync_message,
     is_text_output,
     process_inputs,
+    receive_message,
 )
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, HTMLResponse
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, PlainTextResponse
 
 
 from dotenv import load_dotenv
 
 # When .env file is present, it will override the environment variables
 load_dotenv(dotenv_path="../.env", override=True)
+# Leveled logging through a queue so the event loop never writes to stdout itself
+logs.configure_logging()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled keep-alive client to the ResaSki backend for the whole process
+    await api_client.startup()
+    # Same for the OpenAI client behind the STT/TTS models of every session pipeline
+    await voice_pipeline.startup()
+    # Conversations outlive their websocket so clients can resume with /ws?session=<id>
+    app.state.session_store = create_session_store()
+    # Warm up in the background so /ready can answer 503 until it is done
+    warmup_task = asyncio.create_task(warm_up(starting_agent))
+    try:
+        yield
+    finally:
+        warmup_task.cancel()
+        await api_client.shutdown()
+        await voice_pipeline.shutdown()
+        await app.state.session_store.close()
+        logs.shutdown_logging()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 logger = getLogger(__name__)
 
@@ -44,93 +93,379 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/ready")
+async def ready():
+    return JSONResponse(
+        readiness.as_dict(), status_code=200 if readiness.ready else 503
+    )
+
+
 class Workflow(VoiceWorkflowBase):
     def __init__(self, connection: WebsocketHelper):
         self.connection = connection
+        self.turn = TurnTimer("stream")
+        # Set by the caller when the turn started before run (audio commit, text message)
+        self.next_turn: TurnTimer | None = None
+        # Cuts the streamed text into segments the TTS can start on early
+        self.segmenter = TextSegmenter()
+        self.output: RunResultStreaming | None = None
 
     async def run(self, input_text: str) -> AsyncIterator[str]:
-        print(f"🔄 Workflow.run called with input: '{input_text}'")
+        self.turn = self.next_turn or TurnTimer("stream")
+        self.next_turn = None
+        self.segmenter.reset()
+        # Text turns are read in full, voice turns only as far as their audio was played
+        self.connection.start_response(voiced=self.turn.kind != "text")
+        logger.debug("Workflow.run input: %r", input_text)
         
         conversation_history, latest_agent = await self.connection.show_user_input(
             input_text
         )
         
-        print(f"🤖 Current agent: {latest_agent.name}")
-        # print(f"📝 Conversation history length: {len(conversation_history)}")
+        # The model gets a compacted copy, the connection keeps the full history
+        model_input, compaction = compact_history(conversation_history, latest_agent.name)
+        prompt_tokens.observe(compaction.tokens_before, agent=latest_agent.name, stage="raw")
+        prompt_tokens.observe(
+            compaction.tokens_after, agent=latest_agent.name, stage="compacted"
+        )
+        logger.debug(
+            "Current agent: %s, history length: %d, compaction: %s",
+            latest_agent.name,
+            len(conversation_history),
+            compaction,
+        )
 
-        output = Runner.run_streamed(
+        output = self.output = Runner.run_streamed(
             latest_agent,
-            conversation_history,
+            model_input,
+            hooks=TurnHooks(self.turn),
         )
 
-        async for event in output.stream_events():
-            # print(f"📤 Event type: {type(event).__name__}")
-            await self.connection.handle_new_item(event)
+        try:
+            async for event in output.stream_events():
+                self.turn.mark("llm_first_event", once=True)
+                await self.connection.handle_new_item(event)
 
-            if is_text_output(event):
-                yield event.data.delta  # type: ignore
+                if is_agent_updated(event):
+                    # A handoff starts a new message: its first segment is short again
+                    # and the agents' fixed phrases are cut as they were pre-rendered
+                    for segment in self.segmenter.flush():
+                        yield segment
+                    self.segmenter.reset()
+                elif is_text_output(event):
+                    for segment in self.segmenter.feed(event.data.delta):  # type: ignore
+                        yield segment
+            # stream_events swallows a cancellation received while it waits for an event
+            if asyncio.current_task().cancelling():  # type: ignore
+                raise asyncio.CancelledError
+            # The SDK keeps the last segment to end the turn with it (turn_ended); every
+            # turn ends with the marker, even one whose text was all sent before a handoff
+            yield "".join(self.segmenter.flush()) + TURN_END
+        finally:
+            # An interrupted turn must not keep generating tokens or calling tools
+            if not output.is_complete:
+                await cancel_run(output)
 
+        billed = sum(
+            response.usage.input_tokens for response in output.raw_responses if response.usage
+        )
+        prompt_tokens.observe(billed, agent=latest_agent.name, stage="billed")
         await self.connection.text_output_complete(output, is_done=True)
 
+    async def cancel(self):
+        """Stops the agent run of the current turn and waits for its model and tool calls.
+
+        The voice pipeline consumes `run` from its own task: when that task is cancelled
+        outside of the generator (while synthesizing a segment), the generator is left
+        suspended and its cleanup would only run once garbage collected.
+        """
+        if self.output is not None and not self.output.is_complete:
+            await cancel_run(self.output)
+
+
+def turn_detection_settings() -> dict[str, Any]:
+    # Voice activity detection runs in the transcription session and decides when a turn ends
+    settings: dict[str, Any] = {"type": os.getenv("VAD_TYPE", "server_vad")}
+    if settings["type"] == "server_vad":
+        settings.update(
+            threshold=float(os.getenv("VAD_THRESHOLD", "0.5")),
+            prefix_padding_ms=int(os.getenv("VAD_PREFIX_PADDING_MS", "300")),
+            silence_duration_ms=int(os.getenv("VAD_SILENCE_DURATION_MS", "500")),
+        )
+    return settings
+
+
+async def run_text_turn(workflow: Workflow, connection: WebsocketHelper, user_input: str):
+    workflow.next_turn = TurnTimer("text")
+    async for new_output_tokens in workflow.run(user_input):
+        await connection.stream_response(new_output_tokens, is_text=True)
+
+
+async def run_audio_turn(
+    pipeline: SessionPipeline,
+    workflow: Workflow,
+    connection: WebsocketHelper,
+    audio_input: AudioInput,
+):
+    turn = workflow.next_turn = TurnTimer("audio")
+    await play_response(connection, turn, await pipeline.run(audio_input, turn))
+
+
+async def run_transcribed_turn(
+    pipeline: SessionPipeline,
+    workflow: Workflow,
+    connection: WebsocketHelper,
+    transcript: str,
+):
+    turn = workflow.next_turn = TurnTimer("stream")
+    await play_response(connection, turn, await pipeline.run_transcript(transcript, turn))
+
+
+async def play_response(
+    connection: WebsocketHelper, turn: TurnTimer, output: StreamedAudioResult
+):
+    try:
+        async for event in output.stream():
+            await connection.send_audio_chunk(event)
+        # stream() swallows a cancellation received while it waits for audio
+        if asyncio.current_task().cancelling():  # type: ignore
+            raise asyncio.CancelledError
+        # Audio is sent at playback pace, the turn ends with its last frame and audio.done
+        await connection.send_audio_done()
+        await connection.drain()
+        turn.mark("tts_last_byte")
+    finally:
+        # Stops the LLM run and the TTS stream when the turn is interrupted
+        await cancel_audio_output(output)
+
+
+async def listen_streamed_turns(
+    pipeline: SessionPipeline,
+    workflow: Workflow,
+    connection: WebsocketHelper,
+    responses: "ResponseRunner",
+    audio_input: StreamedAudioInput,
+):
+    """Starts a response for every turn the transcription session ends (VAD).
+
+    Speech transcribed while the previous response still plays interrupts it through
+    `ResponseRunner`, like a new message in buffered mode.
+    """
+    session = await pipeline.transcribe_stream(audio_input)
+    try:
+        async for transcript in session.transcribe_turns():
+            if not transcript.strip():
+                continue
+            await responses.start(
+                run_transcribed_turn(pipeline, workflow, connection, transcript)
+            )
+    finally:
+        await session.close()
+
+
+class ResponseRunner:
+    """Runs one response at a time in the background so the receive loop keeps listening.
+
+    Starting a new response or calling `cancel` interrupts the running one: its
+    LLM run, tool calls and TTS stream are cancelled and the history keeps what the
+    caller got of it.
+    """
+
+    def __init__(self, connection: WebsocketHelper, workflow: Workflow):
+        self.connection = connection
+        self.workflow = workflow
+        self.task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    async def cancel(self):
+        if not self.running:
+            return
+        self.task.cancel()  # type: ignore
+        with suppress(asyncio.CancelledError):
+            await self.task
+        await self.workflow.cancel()
+        await self.connection.response_interrupted()
+
+    async def start(self, coro: Coroutine[Any, Any, None]):
+        await self.cancel()
+        self.task = asyncio.create_task(self._run(coro))
+
+    async def _run(self, coro: Coroutine[Any, Any, None]):
+        try:
+            await coro
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Response failed")
+
+
+def new_session_id() -> str:
+    # The id is all a client needs to resume a conversation, so it must not be guessable
+    return secrets.token_urlsafe(16)
+
+
+def session_log_id(session: str) -> str:
+    # Logs and traces get a stable digest of the id, never the resume credential itself
+    return hashlib.sha256(session.encode()).hexdigest()[:12]
+
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    with trace("Voice Agent Chat"):
+    # Sessions are issued by the server; /ws?session=<id> only resumes a stored one
+    requested_session = websocket.query_params.get("session")
+    session = requested_session or new_session_id()
+    # Every log line of this session, including its background tasks, carries this id
+    logs.session_id.set(session_log_id(session))
+    # Tool calls of one model response run concurrently, up to this session's limit
+    tool_concurrency.open_session()
+    with trace("Voice Agent Chat", group_id=session_log_id(session)):
         await websocket.accept()
-        connection = WebsocketHelper(websocket, [], starting_agent)
-        audio_buffer = []
+        store = websocket.app.state.session_store
+        state = None
+        if requested_session:
+            if len(requested_session) <= 64:
+                state = await store.load(requested_session)
+            if state is None:
+                logger.warning("Rejected unknown session id")
+                await websocket.send_json({"type": "error", "message": "Unknown session"})
+                await websocket.close(code=4404, reason="Unknown session")
+                return
+        else:
+            # Registered right away so the client can resume even before the first turn
+            await store.replace(session, [], starting_agent.name)
 
+        # The history wire protocol is negotiated per connection: /ws?protocol=delta
+        requested_protocol = websocket.query_params.get("protocol")
+        # Audio framing too: /ws?audio=binary sends raw PCM16 frames both ways
+        requested_audio = websocket.query_params.get("audio")
+        connection = WebsocketHelper(
+            websocket,
+            [],
+            starting_agent,
+            protocol=requested_protocol or "full",
+            audio_format=requested_audio or "json",
+            store=store,
+            session_id=session,
+        )
+        if requested_protocol:
+            await websocket.send_json(
+                {"type": "protocol.selected", "protocol": connection.protocol}
+            )
+        if requested_audio:
+            await websocket.send_json(
+                {"type": "audio.format.selected", "format": connection.audio_format}
+            )
+        await websocket.send_json(
+            {
+                "type": "session.resumed" if state else "session.started",
+                "session": session,
+            }
+        )
+        # A known session id resumes the stored conversation and its active agent
+        if state:
+            agents_by_name = {agent.name: agent for agent in collect_agents(starting_agent)}
+            connection.restore(state, agents_by_name.get(state.agent_name, starting_agent))
+            await connection.send_resumed()
+        audio_buffer = AudioAccumulator(
+            max_seconds=float(os.getenv("MAX_UTTERANCE_SECONDS", "60"))
+        )
+
+        # Audio input mode is negotiated per connection: /ws?input=stream pushes every
+        # chunk to the transcription session as it arrives and lets VAD end the turn
+        streamed = websocket.query_params.get("input") == "stream"
         workflow = Workflow(connection)
-        while True:
-            try:
-                message = await websocket.receive_json()
-            except WebSocketDisconnect:
-                print("Client disconnected")
-                return
+        pipeline = SessionPipeline(
+            workflow,
+            stt_settings=(
+                STTModelSettings(turn_detection=turn_detection_settings()) if streamed else None
+            ),
+            spoken=connection.spoken,
+        )
+        responses = ResponseRunner(connection, workflow)
+        streamed_audio = listen_task = None
+        if streamed:
+            streamed_audio = StreamedAudioInput()
+            listen_task = asyncio.create_task(
+                listen_streamed_turns(pipeline, workflow, connection, responses, streamed_audio)
+            )
 
-            # Handle text based messages
-            if is_sync_message(message):
-                connection.history = message["inputs"]
-                if message.get("reset_agent", False):
-                    connection.latest_agent = starting_agent
-            elif is_new_text_message(message):
-                user_input = process_inputs(message, connection)
-                async for new_output_tokens in workflow.run(user_input):
-                    await connection.stream_response(new_output_tokens, is_text=True)
-
-            # Handle a new audio chunk
-            elif is_new_audio_chunk(message):
-                audio_buffer.append(extract_audio_chunk(message))
-
-            # Send full audio to the agent
-            elif is_audio_complete(message):
-                start_time = time.perf_counter()
-
-                def transform_data(data):
-                    nonlocal start_time
-                    if start_time:
-                        print(
-                            f"Time taken to first byte: {time.perf_counter() - start_time}s"
-                        )
-                        start_time = None
-                    return data
-
-                audio_input = concat_audio_chunks(audio_buffer)
-                output = await VoicePipeline(
-                    workflow=workflow,
-                    config=VoicePipelineConfig(
-                        tts_settings=TTSModelSettings(
-                            buffer_size=512, transform_data=transform_data
-                        )
-                    ),
-                ).run(audio_input)
-                async for event in output.stream():
-                    await connection.send_audio_chunk(event)
+        try:
+            while True:
+                try:
+                    message = await receive_message(websocket)
+                except WebSocketDisconnect:
+                    logger.info("Client disconnected")
+                    return
+                except InvalidMessageError as e:
+                    # A malformed frame is dropped, the session goes on
+                    logger.warning("Invalid client message: %s", e)
+                    await connection.send_error(str(e))
+                    continue
+
+                # Any new input from the caller interrupts the response being spoken
+                if (
+                    is_sync_message(message)
+                    or is_new_text_message(message)
+                    or is_cancel_request(message)
+                    or (is_new_audio_chunk(message) and streamed_audio is None)
+                ):
+                    await responses.cancel()
+
+                # Handle text based messages
+                if is_sync_message(message):
+                    connection.replace_history(message["inputs"])
+                    if message.get("reset_agent", False):
+                        connection.latest_agent = starting_agent
+                    await connection.persist()
+                elif is_resync_request(message):
+                    await connection.send_snapshot("resync")
+                elif is_new_text_message(message):
+                    user_input = process_inputs(message, connection)
+                    await responses.start(run_text_turn(workflow, connection, user_input))
 
-                audio_buffer = []  # reset the audio buffer
+                # Stream the chunk straight to the transcription session
+                elif is_new_audio_chunk(message) and streamed_audio is not None:
+                    await streamed_audio.add_audio(extract_pcm16_chunk(message))
+
+                # Handle a new audio chunk
+                elif is_new_audio_chunk(message):
+                    audio_buffer.add_chunk(message)
+
+                # Send full audio to the agent (in streaming mode VAD decides instead)
+                elif is_audio_complete(message) and streamed_audio is None:
+                    if not len(audio_buffer):
+                        # Nothing was appended since the last commit, there is nothing to hear
+                        await connection.send_error("Audio buffer is empty")
+                        continue
+                    if audio_buffer.started_at is not None:
+                        audio_receive_seconds.observe(
+                            time.perf_counter() - audio_buffer.started_at
+                        )
+                    audio_input = audio_buffer.to_audio_input()  # also resets the buffer
+                    await responses.start(
+                        run_audio_turn(pipeline, workflow, connection, audio_input)
+                    )
+        finally:
+            # The socket is gone, so drop the running response without notifying anyone
+            for task in (listen_task, responses.task):
+                if task is not None:
+                    task.cancel()
+                    with suppress(asyncio.CancelledError):
+                        await task
+            await workflow.cancel()
+            await connection.close()
 
 
 if __name__ == "__main__":
     import uvicorn
 
+    # Development server with auto-reload, see serve.py for the multi-worker entry point
     uvicorn.run("server:app", host="0.0.0.0", port=4000, reload=True)
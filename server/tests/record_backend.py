@@ -0,0 +1,29 @@
+"""
+Enregistre les réponses du backend utilisées par tests/test_tool_projection.py
+À relancer quand l'API change, pour que les projections soient testées sur sa forme réelle
+
+Usage (depuis server/) : python -m tests.record_backend
+"""
+
+import asyncio
+import json
+from pathlib import Path
+
+from app import vendor_data
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+async def main():
+    recordings = {
+        "backend_vendor.json": await vendor_data.get_vendor(),
+        "backend_sports.json": await vendor_data.get_vendor_sports(),
+    }
+    for name, payload in recordings.items():
+        path = FIXTURES / name
+        path.write_text(json.dumps(payload, ensure_ascii=False, indent=2) + "\n")
+        print(f"{path} enregistré")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
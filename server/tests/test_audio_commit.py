@@ -0,0 +1,46 @@
+"""Mode "commit" : un commit sans audio ajouté ne part pas en transcription"""
+
+from agents import set_tracing_disabled
+from fastapi.testclient import TestClient
+
+import server
+from app import voice_pipeline
+from app.session_store import MemorySessionStore
+from benchmarks.fake_models import FakeModelSettings, FakeVoiceModelProvider
+
+set_tracing_disabled(True)
+
+
+class CountingProvider(FakeVoiceModelProvider):
+    def __init__(self):
+        super().__init__(FakeModelSettings(stt_seconds=0))
+        self.transcriptions = 0
+
+    def get_stt_model(self, model_name):
+        model = super().get_stt_model(model_name)
+        transcribe = model.transcribe
+
+        async def counted(*args, **kwargs):
+            self.transcriptions += 1
+            return await transcribe(*args, **kwargs)
+
+        model.transcribe = counted
+        return model
+
+
+def test_empty_commit_is_answered_with_an_error():
+    provider = CountingProvider()
+    voice_pipeline.use_model_provider(provider)
+    # Sans lifespan : ni backend ni warm-up, seul le store de sessions est nécessaire
+    server.app.state.session_store = MemorySessionStore()
+    try:
+        with TestClient(server.app).websocket_connect("/ws") as websocket:
+            assert websocket.receive_json()["type"] == "session.started"
+            websocket.send_json({"type": "input_audio_buffer.commit"})
+            assert websocket.receive_json() == {
+                "type": "error",
+                "message": "Audio buffer is empty",
+            }
+        assert provider.transcriptions == 0
+    finally:
+        voice_pipeline.use_model_provider(None)
@@ -0,0 +1,79 @@
+"""Trames audio binaires : aller-retour, et rejet des trames et messages JSON mal formés"""
+
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+from app.utils import (
+    AUDIO_FRAME_HEADER,
+    InvalidMessageError,
+    pack_audio_frame,
+    receive_message,
+    unpack_audio_frame,
+)
+
+
+class FakeWebSocket:
+    def __init__(self, message: dict):
+        self.message = message
+
+    async def receive(self):
+        return {"type": "websocket.receive", "text": json.dumps(self.message)}
+
+
+def test_round_trip():
+    audio = np.arange(-5, 5, dtype=np.int16)
+    message = unpack_audio_frame(pack_audio_frame("input_audio_buffer.append", 7, audio))
+    assert message["type"] == "input_audio_buffer.append"
+    assert message["seq"] == 7
+    assert np.array_equal(message["pcm16"], audio)
+
+
+@pytest.mark.parametrize(
+    "frame",
+    [
+        b"",
+        b"\x01\x00\x00",
+        AUDIO_FRAME_HEADER.pack(9, 1) + b"\x00\x00",
+        AUDIO_FRAME_HEADER.pack(1, 1) + b"\x00\x00\x00",
+    ],
+    ids=["empty", "truncated header", "unknown type", "odd payload"],
+)
+def test_malformed_frames_are_rejected(frame):
+    with pytest.raises(InvalidMessageError):
+        unpack_audio_frame(frame)
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        {"type": "input_audio_buffer.append", "delta": "pas du base64 !"},
+        {"type": "input_audio_buffer.append"},
+        {"type": "input_audio_buffer.append", "delta": 12},
+        {"type": "input_audio_buffer.append", "delta": "AAAA"},
+        {"type": "history.update"},
+        {"type": "history.update", "inputs": {"role": "user", "content": "Bonjour"}},
+        {"type": "history.update", "inputs": ["Bonjour"]},
+    ],
+    ids=[
+        "bad base64",
+        "missing delta",
+        "delta not a string",
+        "odd delta",
+        "missing inputs",
+        "inputs not a list",
+        "inputs items not objects",
+    ],
+)
+def test_malformed_messages_are_rejected(message):
+    with pytest.raises(InvalidMessageError):
+        asyncio.run(receive_message(FakeWebSocket(message)))
+
+
+def test_valid_messages_are_accepted():
+    append = {"type": "input_audio_buffer.append", "delta": "AAABAA=="}
+    update = {"type": "history.update", "inputs": [{"role": "user", "content": "Bonjour"}]}
+    assert asyncio.run(receive_message(FakeWebSocket(append))) == append
+    assert asyncio.run(receive_message(FakeWebSocket(update))) == update
@@ -0,0 +1,230 @@
+"""
+Interruption d'une réponse (barge-in) : le run du SDK s'arrête avec la réponse, et
+l'historique ne garde que ce que l'appelant a reçu
+"""
+
+import asyncio
+import json
+from contextlib import suppress
+
+import numpy as np
+from agents import Agent, Model, set_tracing_disabled
+from agents.voice import StreamedAudioInput, STTModelSettings
+from openai.types.responses import ResponseTextDeltaEvent
+
+import server
+from app import voice_pipeline
+from app.utils import WebsocketHelper
+from benchmarks.fake_models import FakeModelSettings, FakeVoiceModelProvider
+
+set_tracing_disabled(True)
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+    async def send_bytes(self, data):
+        self.sent.append(data)
+
+
+class SlowModel(Model):
+    """Stream un mot toutes les 20 ms, sans jamais finir avant d'être interrompu"""
+
+    def __init__(self):
+        self.task: asyncio.Task | None = None
+        self.deltas = 0
+        self.streaming = asyncio.Event()
+
+    async def get_response(self, *args, **kwargs):
+        raise NotImplementedError
+
+    async def stream_response(self, *args, **kwargs):
+        self.task = asyncio.current_task()
+        for _ in range(500):
+            self.deltas += 1
+            self.streaming.set()
+            yield ResponseTextDeltaEvent(
+                content_index=0,
+                delta="mot, ",
+                item_id="fake",
+                output_index=0,
+                type="response.output_text.delta",
+            )
+            await asyncio.sleep(0.02)
+
+
+def test_interrupting_a_turn_cancels_the_run():
+    async def scenario():
+        model = SlowModel()
+        connection = WebsocketHelper(FakeWebSocket(), [], Agent(name="Test", model=model))
+        workflow = server.Workflow(connection)
+        responses = server.ResponseRunner(connection, workflow)
+
+        await responses.start(server.run_text_turn(workflow, connection, "Bonjour"))
+        await model.streaming.wait()
+        await asyncio.sleep(0.1)
+        await responses.cancel()
+
+        assert model.task is not None and model.task.cancelled()
+        produced = model.deltas
+        await asyncio.sleep(0.1)
+        assert model.deltas == produced
+        # Réponse texte : tout ce qui a été streamé au client est gardé
+        sent = connection.websocket.sent
+        streamed = [m for m in sent if m.get("reason") == "response.text.delta"][-1]
+        assert connection.history[-1] == streamed["inputs"][-1]
+        assert sent[-1] == {"type": "response.cancelled"}
+        await connection.close()
+
+    asyncio.run(scenario())
+
+
+def test_interrupting_a_turn_during_synthesis_cancels_the_run():
+    async def scenario():
+        model = SlowModel()
+        connection = WebsocketHelper(FakeWebSocket(), [], Agent(name="Test", model=model))
+        workflow = server.Workflow(connection)
+        responses = server.ResponseRunner(connection, workflow)
+
+        async def voice_turn():
+            # Comme le pipeline voix : le générateur attend pendant la synthèse d'un segment
+            async for _ in workflow.run("Bonjour"):
+                await asyncio.sleep(10)
+
+        await responses.start(voice_turn())
+        await asyncio.sleep(0.3)
+        await responses.cancel()
+
+        assert model.task is not None and model.task.cancelled()
+        produced = model.deltas
+        await asyncio.sleep(0.1)
+        assert model.deltas == produced
+        await connection.close()
+
+    asyncio.run(scenario())
+
+
+def test_interrupted_voice_turn_keeps_only_the_heard_text():
+    async def scenario():
+        connection = WebsocketHelper(FakeWebSocket(), [], Agent(name="Test"))
+        connection.start_response(voiced=True)
+        await connection.show_user_input("Bonjour")
+        connection.history.append(
+            {
+                "type": "message",
+                "role": "assistant",
+                "content": [
+                    {
+                        "type": "output_text",
+                        "text": "Bonjour et bienvenue chez nous. "
+                        "Nous proposons du ski alpin et du snowboard tout l'hiver.",
+                        "annotations": [],
+                    }
+                ],
+            }
+        )
+        for text in (
+            "Bonjour et bienvenue chez nous.",
+            "Nous proposons du ski alpin et du snowboard tout l'hiver.",
+        ):
+            segment = connection.spoken.add(text)
+            segment.samples, segment.done = 24000, True
+        # Le premier segment et la moitié du second ont été lus
+        connection.sender.played_samples = lambda: 36000
+
+        await connection.response_interrupted()
+
+        assert connection.history[-1] == {
+            "type": "message",
+            "role": "assistant",
+            "content": "Bonjour et bienvenue chez nous. Nous proposons du ski alpin…",
+        }
+        await connection.close()
+
+    asyncio.run(scenario())
+
+
+def test_client_sync_after_an_interruption_keeps_the_heard_text():
+    async def scenario():
+        connection = WebsocketHelper(FakeWebSocket(), [], Agent(name="Test"))
+        connection.start_response(voiced=True)
+        await connection.show_user_input("Bonjour")
+        answer = {
+            "type": "message",
+            "role": "assistant",
+            "content": [
+                {"type": "output_text", "text": "Bonjour et bienvenue chez nous.", "annotations": []}
+            ],
+        }
+        connection.history.append(answer)
+        # Le client a reçu toute la réponse en texte, mais n'en a entendu que le début
+        client_history = [dict(item) for item in connection.history]
+        segment = connection.spoken.add("Bonjour et bienvenue chez nous.")
+        segment.samples, segment.done = 24000, True
+        connection.sender.played_samples = lambda: 12000
+        await connection.response_interrupted()
+        heard = connection.history[-1]
+
+        # Comme le frontend avant chaque message audio : synchronisation avec sa copie
+        connection.replace_history(client_history)
+        assert connection.history[-1] == heard
+        assert heard["content"] == "Bonjour et…"
+
+        # Une conversation réécrite par le client (réinitialisation) reste la sienne
+        connection.replace_history([])
+        assert connection.history == []
+        await connection.close()
+
+    asyncio.run(scenario())
+
+
+def test_new_speech_in_streamed_mode_interrupts_the_response():
+    voice_pipeline.use_model_provider(FakeVoiceModelProvider(FakeModelSettings(stt_seconds=0)))
+
+    async def speak(audio: StreamedAudioInput):
+        for _ in range(5):
+            await audio.add_audio(np.full(2400, 1000, dtype=np.int16))
+        for _ in range(6):
+            await audio.add_audio(np.zeros(2400, dtype=np.int16))
+
+    async def scenario():
+        model = SlowModel()
+        connection = WebsocketHelper(FakeWebSocket(), [], Agent(name="Test", model=model))
+        workflow = server.Workflow(connection)
+        pipeline = voice_pipeline.SessionPipeline(
+            workflow,
+            stt_settings=STTModelSettings(turn_detection={"silence_duration_ms": 500}),
+            spoken=connection.spoken,
+        )
+        responses = server.ResponseRunner(connection, workflow)
+        audio = StreamedAudioInput()
+        listener = asyncio.create_task(
+            server.listen_streamed_turns(pipeline, workflow, connection, responses, audio)
+        )
+
+        await speak(audio)
+        await model.streaming.wait()
+        first = model.task
+        await asyncio.sleep(0.2)
+        await speak(audio)
+        for _ in range(100):
+            if model.task is not first:
+                break
+            await asyncio.sleep(0.02)
+
+        assert first is not None and first.cancelled()
+        assert {"type": "response.cancelled"} in connection.websocket.sent
+        listener.cancel()
+        with suppress(asyncio.CancelledError):
+            await listener
+        await responses.cancel()
+        await connection.close()
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        voice_pipeline.use_model_provider(None)
@@ -0,0 +1,26 @@
+"""Caches partagés : réglés par l'environnement lu à la première utilisation, après le
+chargement du .env par server.py, et non à l'import"""
+
+from app import customer_lookup, vendor_data
+
+
+def test_vendor_cache_reads_env_after_import(monkeypatch):
+    monkeypatch.setattr(vendor_data, "_vendor_cache", None)
+    monkeypatch.setenv("RESASKI_VENDOR_CACHE_TTL", "42")
+    monkeypatch.setenv("RESASKI_VENDOR_CACHE_SIZE", "7")
+    cache = vendor_data.vendor_cache()
+    assert (cache.ttl, cache.maxsize) == (42.0, 7)
+    assert vendor_data.vendor_cache() is cache
+
+
+def test_customer_caches_read_env_after_import(monkeypatch):
+    monkeypatch.setattr(customer_lookup, "_customer_cache", None)
+    monkeypatch.setattr(customer_lookup, "_miss_cache", None)
+    monkeypatch.setenv("RESASKI_CUSTOMER_CACHE_TTL", "42")
+    monkeypatch.setenv("RESASKI_CUSTOMER_MISS_TTL", "5")
+    monkeypatch.setenv("RESASKI_CUSTOMER_CACHE_SIZE", "7")
+    found, missed = customer_lookup.customer_cache(), customer_lookup.miss_cache()
+    assert (found.ttl, found.maxsize) == (42.0, 7)
+    assert (missed.ttl, missed.maxsize) == (5.0, 7)
+    assert customer_lookup.customer_cache() is found
+    assert customer_lookup.miss_cache() is missed
@@ -0,0 +1,69 @@
+"""Compactage de l'historique : les identifiants survivent, seuls les vrais transferts comptent"""
+
+import json
+
+from app.history_compaction import CompactionSettings, compact_history
+
+SETTINGS = CompactionSettings(keep_tool_turns=1, default_budget=100_000)
+
+
+def user(text: str) -> dict:
+    return {"type": "message", "role": "user", "content": text}
+
+
+def call(call_id: str, name: str) -> dict:
+    return {"type": "function_call", "call_id": call_id, "name": name, "arguments": "{}"}
+
+
+def output(call_id: str, value) -> dict:
+    text = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+    return {"type": "function_call_output", "call_id": call_id, "output": text}
+
+
+FOUND = {
+    "found": True,
+    "single_match": True,
+    "customer": {"id": 42, "first_name": "Camille", "email": "camille@example.com"},
+    "message": "Client trouvé: Camille MARTIN",
+}
+
+
+def test_customer_id_survives_summaries_and_handoffs():
+    history = [
+        user("Mon numéro est le 06 12 34 56 78"),
+        call("search", "search_customers_by_phone"),
+        output("search", FOUND),
+        call("phone", "normalize_phone_number"),
+        output("phone", {"success": True, "normalized": "+33612345678"}),
+        call("handoff", "transfer_to_agent_de_consultation_produits_resaski"),
+        output("handoff", "{'assistant': 'Agent de Consultation Produits ResaSki'}"),
+        user("Quels cours me proposez-vous ?"),
+    ]
+
+    compacted, stats = compact_history(history, "Agent de Consultation Produits ResaSki", SETTINGS)
+
+    outputs = {item["call_id"]: item["output"] for item in compacted if "output" in item}
+    assert json.loads(outputs["search"]) == {
+        "found": True,
+        "message": "Client trouvé: Camille MARTIN",
+        "customer": {"id": 42},
+        "compacted": True,
+    }
+    # Sans identifiant, l'appel antérieur au transfert est retiré avec sa sortie
+    assert "phone" not in outputs
+    assert stats.dropped_tool_items == 2
+
+
+def test_function_tools_named_like_handoffs_are_not_handoffs():
+    history = [
+        user("Je voudrais réserver"),
+        call("lookup", "search_customers_by_phone"),
+        output("lookup", {"found": False, "message": "Aucun client trouvé"}),
+        call("transfer", "transfer_to_customer_authentification_agent"),
+        output("transfer", {"transfer": True, "handoff": True}),
+    ]
+
+    compacted, stats = compact_history(history, "Agent d'Information ResaSki", SETTINGS)
+
+    assert compacted == history
+    assert stats.dropped_tool_items == 0
@@ -0,0 +1,19 @@
+"""Normalisation des numéros : chaque cas du corpus de référence donne le résultat attendu"""
+
+import pytest
+
+from app.phone_normalization import normalize_phone
+from benchmarks.phone_normalization import load_corpus
+
+CORPUS = load_corpus()
+
+
+@pytest.mark.parametrize(
+    "case", CORPUS, ids=[f"{case['input']!r} {case.get('country_code') or ''}" for case in CORPUS]
+)
+def test_corpus(case):
+    result = normalize_phone(case["input"], case.get("country_code"))
+    assert result.normalized == case.get("normalized")
+    assert result.error == case.get("error")
+    assert result.assumed_country == case.get("assumed_country", False)
+    assert result.success == (case.get("normalized") is not None)
@@ -0,0 +1,99 @@
+"""Identifiants de session : émis par le serveur, seuls ceux qu'il connaît reprennent une
+conversation, tant que le stockage ne les a pas évincés ou laissés expirer
+"""
+
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+import server
+from app.session_store import MemorySessionStore, SqliteSessionStore
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv("SESSION_STORE", "memory")
+    # Aucun appel à OpenAI : le client est seulement créé au démarrage
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    with TestClient(server.app) as client:
+        yield client
+
+
+def test_new_sessions_get_a_server_issued_id(client):
+    with client.websocket_connect("/ws") as websocket:
+        started = websocket.receive_json()
+    assert started["type"] == "session.started"
+    assert len(started["session"]) >= 22
+
+    with client.websocket_connect(f"/ws?session={started['session']}") as websocket:
+        assert websocket.receive_json() == {
+            "type": "session.resumed",
+            "session": started["session"],
+        }
+
+
+def test_unknown_session_ids_are_rejected(client):
+    with client.websocket_connect("/ws?session=guessed-id") as websocket:
+        assert websocket.receive_json() == {"type": "error", "message": "Unknown session"}
+        with pytest.raises(WebSocketDisconnect) as closed:
+            websocket.receive_json()
+    assert closed.value.code == 4404
+
+
+def test_memory_store_evicts_the_least_recently_used_sessions():
+    async def scenario():
+        store = MemorySessionStore(maxsize=2)
+        await store.replace("a", [{"role": "user", "content": "A"}], None)
+        await store.replace("b", [], None)
+        await store.load("a")
+        await store.replace("c", [], None)
+        return [await store.load(session) for session in ("a", "b", "c")]
+
+    a, b, c = asyncio.run(scenario())
+    assert a.history == [{"role": "user", "content": "A"}]
+    assert b is None and c is not None
+
+
+def test_sqlite_store_evicts_the_least_recently_used_sessions(tmp_path):
+    async def scenario():
+        store = SqliteSessionStore(str(tmp_path / "sessions.db"), maxsize=2, prune_interval=0)
+        await store.replace("a", [{"role": "user", "content": "A"}], None)
+        await store.replace("b", [], None)
+        await store.load("a")
+        await store.replace("c", [], None)
+        # Purgé à l'écriture suivante, et ses items avec lui
+        await store.append("c", [{"role": "user", "content": "C"}], None)
+        loaded = [await store.load(session) for session in ("a", "b", "c")]
+        (items,) = store._db.execute("SELECT COUNT(*) FROM items").fetchone()
+        await store.close()
+        return loaded, items
+
+    (a, b, c), items = asyncio.run(scenario())
+    assert a.history == [{"role": "user", "content": "A"}]
+    assert b is None and c.history == [{"role": "user", "content": "C"}]
+    assert items == 2
+
+
+def test_sqlite_sessions_expire_and_are_pruned_at_startup(tmp_path, monkeypatch):
+    path = str(tmp_path / "sessions.db")
+
+    async def write():
+        store = SqliteSessionStore(path, ttl=60)
+        await store.replace("old", [{"role": "user", "content": "Bonjour"}], None)
+        await store.close()
+
+    async def reopen():
+        store = SqliteSessionStore(path, ttl=60)
+        rows = store._db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        items = store._db.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+        state = await store.load("old")
+        await store.close()
+        return rows, items, state
+
+    asyncio.run(write())
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert asyncio.run(reopen()) == (0, 0, None)
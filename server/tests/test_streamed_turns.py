@@ -0,0 +1,54 @@
+"""Entrée streamée : chaque tour se termine par audio.done, même sans texte à dire"""
+
+import asyncio
+import json
+
+from agents import Agent, set_tracing_disabled
+
+import server
+from app import voice_pipeline
+from app.utils import WebsocketHelper
+from benchmarks.fake_models import FakeLLM, FakeModelSettings, FakeVoiceModelProvider
+
+set_tracing_disabled(True)
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+    async def send_bytes(self, data):
+        self.sent.append(data)
+
+
+class SilentLLM(FakeLLM):
+    """Répond par un message vide"""
+
+    def _plan(self, input, tools):
+        return [], ""
+
+
+def test_turn_without_text_ends_with_audio_done():
+    async def scenario():
+        settings = FakeModelSettings(stt_seconds=0, llm_first_token_seconds=0)
+        model = SilentLLM(settings)
+        connection = WebsocketHelper(FakeWebSocket(), [], Agent(name="Test", model=model))
+        workflow = server.Workflow(connection)
+        pipeline = voice_pipeline.SessionPipeline(workflow, spoken=connection.spoken)
+        await asyncio.wait_for(
+            server.run_transcribed_turn(pipeline, workflow, connection, "Bonjour"), 5
+        )
+        sent = connection.websocket.sent
+        await connection.close()
+        return sent
+
+    voice_pipeline.use_model_provider(FakeVoiceModelProvider(FakeModelSettings(stt_seconds=0)))
+    try:
+        sent = asyncio.run(scenario())
+    finally:
+        voice_pipeline.use_model_provider(None)
+    assert sent[-1] == {"type": "audio.done"}
+    assert not any(isinstance(message, bytes) for message in sent)
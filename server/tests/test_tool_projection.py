@@ -0,0 +1,80 @@
+"""
+Projections des outils vendor sur des réponses enregistrées du backend
+(tests/fixtures, mises à jour par tests/record_backend.py) : un champ renommé côté API
+ne doit pas disparaître silencieusement de ce que voit l'agent
+"""
+
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+from agents import RunContextWrapper
+
+from app import information_desk_agent, welcome_agent
+from app.tool_projection import SPORT, VENDOR
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+# Champs dont les agents ont besoin pour répondre (adresse, contact, catalogue)
+VENDOR_NEEDED = ("name", "address", "city", "zip_code", "phone", "email")
+
+
+def recorded(name: str):
+    return json.loads((FIXTURES / name).read_text())
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    vendor, sports = recorded("backend_vendor.json"), recorded("backend_sports.json")
+
+    async def get_vendor(vendor_id=None):
+        return vendor
+
+    async def get_vendor_sports(vendor_id=None):
+        return sports
+
+    monkeypatch.setattr(information_desk_agent.vendor_data, "get_vendor", get_vendor)
+    monkeypatch.setattr(information_desk_agent.vendor_data, "get_vendor_sports", get_vendor_sports)
+    monkeypatch.setattr(welcome_agent, "get_vendor", get_vendor)
+    return vendor, sports
+
+
+def call(tool) -> dict:
+    output = asyncio.run(tool.on_invoke_tool(RunContextWrapper(context=None), "{}"))
+    return json.loads(output)
+
+
+def test_recorded_payloads_have_the_projected_fields(backend):
+    vendor, sports = backend
+    assert set(VENDOR_NEEDED) <= set(vendor) & set(VENDOR.fields)
+    for sport in sports:
+        assert "id" in sport
+        assert {"name", "sport_name"} & set(sport) & set(SPORT.fields)
+
+
+def test_vendor_info_keeps_what_the_agent_needs(backend):
+    vendor, _ = backend
+    output = call(information_desk_agent.get_vendor_info)
+    assert output["success"] is True
+    assert {key: output["vendor"][key] for key in VENDOR_NEEDED} == {
+        key: vendor[key] for key in VENDOR_NEEDED
+    }
+    assert all(output["vendor"][key] for key in VENDOR_NEEDED)
+
+
+def test_vendor_sports_keeps_ids_and_names(backend):
+    _, sports = backend
+    output = call(information_desk_agent.get_vendor_sports)
+    assert output["success"] is True
+    assert output["count"] == len(sports)
+    assert [sport["id"] for sport in output["sports"]] == [sport["id"] for sport in sports]
+    assert all(sport.get("name") or sport.get("sport_name") for sport in output["sports"])
+    assert "sport_names" not in output
+
+
+def test_welcome_keeps_the_school_name(backend):
+    vendor, _ = backend
+    output = call(welcome_agent.get_vendor_info)
+    assert output["vendor_name"] == vendor["name"]
+    assert output["vendor_info"] == {"name": vendor["name"], "city": vendor["city"]}
@@ -0,0 +1,86 @@
+"""Cache audio TTS : seules les phrases configurées sont gardées, sur disque ou en mémoire"""
+
+import asyncio
+import time
+
+from agents.voice import TTSModel, TTSModelSettings
+
+from app.tts_cache import AudioStore, CachedTTSModel, TTSCacheSettings
+
+
+class CountingTTSModel(TTSModel):
+    def __init__(self, samples: int = 2400):
+        self.calls = 0
+        self.samples = samples
+
+    @property
+    def model_name(self) -> str:
+        return "fake-tts"
+
+    async def run(self, text, settings):
+        self.calls += 1
+        yield b"\x01\x00" * self.samples
+
+
+def cached_model(tmp_path):
+    store = AudioStore(TTSCacheSettings(directory=str(tmp_path)))
+    return CachedTTSModel(CountingTTSModel(), store)
+
+
+async def play(model, text):
+    return b"".join([chunk async for chunk in model.run(text, TTSModelSettings())])
+
+
+def test_dynamic_segment_is_never_cached(tmp_path):
+    async def scenario():
+        model = cached_model(tmp_path)
+        text = "Votre numéro est le 07 30 00 01 23."
+        first = await play(model, text)
+        assert await play(model, text) == first
+        await model.store.flush()
+        assert model.model.calls == 2
+        assert len(model.store.memory) == 0
+
+    asyncio.run(scenario())
+    assert not list(tmp_path.glob("*/*.pcm"))
+
+
+def test_memory_tier_is_bounded_in_bytes_and_time(monkeypatch):
+    # 400 Ko par segment : deux tiennent dans le budget de 1 Mo, pas trois
+    store = AudioStore(TTSCacheSettings(directory="", memory_mb=1, memory_ttl=60))
+    model = CachedTTSModel(CountingTTSModel(samples=200_000), store)
+    phrases = [
+        "Souhaitez-vous que nous commencions ?",
+        "Quel est votre numéro de téléphone ?",
+        "Je vous transfère vers notre service d'information.",
+    ]
+
+    async def scenario():
+        for text in phrases:
+            await play(model, text)
+        assert store.memory.weight == 800_000
+        await play(model, phrases[-1])
+        assert model.model.calls == 3
+        await play(model, phrases[0])
+        assert model.model.calls == 4
+
+    asyncio.run(scenario())
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 61)
+    assert len(store.memory) == 2
+    assert all(store.memory.get(key) is None for key in list(store.memory._entries))
+
+
+def test_prerendered_phrase_is_written_to_disk(tmp_path):
+    async def scenario():
+        model = cached_model(tmp_path)
+        text = "Souhaitez-vous que nous commencions ?"
+        await play(model, text)
+        # Une phrase configurée déjà synthétisée en session passe aussi sur disque
+        assert await model.prerender(text, TTSModelSettings()) is False
+        await model.store.flush()
+        assert await model.prerender("Quel est votre numéro de téléphone ?", TTSModelSettings())
+        await model.store.flush()
+
+    asyncio.run(scenario())
+    assert len(list(tmp_path.glob("*/*.pcm"))) == 2
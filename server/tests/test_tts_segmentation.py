@@ -0,0 +1,30 @@
+"""Découpage pour le TTS : le dernier segment d'un tour part avec la fin du tour"""
+
+from app.tts_segmentation import TURN_END, TextSegmenter, pass_through_splitter
+
+
+def test_segmenter_keeps_a_tail_for_the_end_of_turn():
+    segmenter = TextSegmenter()
+    text = "Bonjour et bienvenue à l'école de ski. Que puis-je faire pour vous aujourd'hui ? "
+    segments = [s for word in text.split(" ") for s in segmenter.feed(word + " ")]
+    tail = segmenter.flush()
+    assert segments and tail
+    assert " ".join(segments + tail) == text.strip()
+
+
+def test_splitter_holds_the_last_segment():
+    segment = "Que puis-je faire pour vous aujourd'hui ?"
+    assert pass_through_splitter(segment) == (segment, "")
+    assert pass_through_splitter(segment + TURN_END) == ("", segment)
+
+
+def test_short_segments_flushed_at_a_handoff_are_not_glued_to_the_next():
+    segmenter = TextSegmenter()
+    segmenter.feed("Un instant.")
+    (flushed,) = segmenter.flush()
+    segmenter.reset()
+    (first,) = segmenter.feed("Bonjour, je suis l'agent d'information de l'école. Que voulez-vous ? ")
+    # Trop court, le segment reste dans le tampon du SDK qui lui ajoute le suivant
+    sent, kept = pass_through_splitter(flushed)
+    assert sent == ""
+    assert pass_through_splitter(kept + first) == ("Un instant. " + first, "")